@@ -1,15 +1,31 @@
+import startup_profile
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk
-import pandas as pd
 import os
 import subprocess
 import platform
 import sys
 import datetime
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+import multiprocessing
+import queue
+import threading
+from typing import TYPE_CHECKING
 
+from run_metrics import STAGE_FIELDS, TRACED_FIELD
+
+# pandas, matplotlib and PIL are imported where they are first needed, and the
+# pandas-based engine is warmed up on a background thread after the window has
+# painted, so the window appears without waiting for them.
+if TYPE_CHECKING:
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from source_cache import SourceCache
+    from stats_chart import RateChart
+    from stats_store import StatsStore
+
+# Pre-sized copy of the logo, loaded by Tk directly (no PIL resize at startup).
+LOGO_FILENAME = "logo_on_shelf_bold_80.png"
+
+startup_profile.mark("imports")
 
 def resource_path(relative_path):
     try:
@@ -38,11 +54,11 @@ TEXT = {
     "en": {
         "title": "Grounding Discrepancy Checker 2.0",
         "grounding": "Please choose Grounding.xlsx (Optional)",
-        "inbound": "Please choose InboundRecordFile.xlsx (Optional)",
-        "export": "Please choose ExportCustomRecordsFile.xlsx (Optional)",
+        "inbound": "Please choose InboundRecordFile.xlsx / .csv (Optional)",
+        "export": "Please choose ExportCustomRecordsFile.xlsx / .csv (Optional)",
         "cancel": "Please choose Cancel Order.xlsx (Optional)",
-        "transfer": "Please choose Transfer Order.xlsx (Optional)",
-        "history": "Please choose historical.xlsx (Optional cumulative file)",
+        "transfer": "Please choose Transfer Order.xlsx / .csv (Optional)",
+        "history": "Please choose historical.xlsx / .db (Optional cumulative file)",
         "browse": "📂 Browse",
         "not_selected": "Not Selected",
         "run_button": "🚀 Check Discrepancy",
@@ -64,24 +80,50 @@ TEXT = {
         "home_add": "➕ Add Record",
         "home_export": "💾 Export to Excel",
         "home_chart": "📊 Generate Chart",
+        "home_filter": "🔍 Filter Table",
         "home_start_date": "Start Date (YYYY-MM-DD)",
         "home_end_date": "End Date (YYYY-MM-DD)",
         "home_chart_type": "Chart Type",
         "home_chart_bar": "Bar",
         "home_chart_line": "Line",
+        "home_resolution": "Group By",
+        "home_resolutions": ["Day", "Week", "Month"],
         "stats_file_label": "Stats history file:",
         "stats_auto_hint": "Tip: Total UPC is auto-filled from today's files when available.",
         "stats_no_file": "none",
         "stats_load_error": "Error loading stats history file: ",
+        "cancel_button": "⏹ Cancel",
+        "status_idle": "Ready",
+        "status_start": "Starting check...",
+        "status_load": "Loaded {source}",
+        "status_merge": "Merged sources",
+        "status_classify": "Classified discrepancies",
+        "status_history": "Merged historical file",
+        "status_export": "Report exported",
+        "status_cancelling": "Cancelling after the current step...",
+        "status_cancelled": "Check cancelled.",
+        "status_done": "Done.",
+        "status_error": "Check failed.",
+        "use_cache": "Reuse parsed files when unchanged",
+        "clear_cache_button": "🧹 Clear Cache",
+        "cache_cleared": "Parsed-file cache cleared.",
+        "cache_report": "Source cache: ",
+        "profile_next": "Profile next run",
+        "profile_written": "Profile: ",
+        "run_details": "Run details",
+        "run_details_columns": ["Stage", "Wall s", "CPU s", "Rows in", "Rows out", "RSS MB", "Peak MB", "Traced MB",
+                                "Status"],
+        "run_log": "Run log: ",
+        "error_stage": "Failed in {stage}: ",
     },
     "zh": {
         "title": "地面入库差异检查工具 2.0",
         "grounding": "请选择 Grounding.xlsx（可选）",
-        "inbound": "请选择 InboundRecordFile.xlsx（可选）",
-        "export": "请选择 ExportCustomRecordsFile.xlsx（可选）",
+        "inbound": "请选择 InboundRecordFile.xlsx / .csv（可选）",
+        "export": "请选择 ExportCustomRecordsFile.xlsx / .csv（可选）",
         "cancel": "请选择 Cancel Order.xlsx（可选）",
-        "transfer": "请选择 Transfer Order.xlsx（可选）",
-        "history": "请选择 historical.xlsx（历史累计表，可选）",
+        "transfer": "请选择 Transfer Order.xlsx / .csv（可选）",
+        "history": "请选择 historical.xlsx / .db（历史累计表，可选）",
         "browse": "📂 浏览",
         "not_selected": "未选择",
         "run_button": "🚀 执行差异核查",
@@ -103,15 +145,40 @@ TEXT = {
         "home_add": "➕ 添加记录",
         "home_export": "💾 导出 Excel",
         "home_chart": "📊 生成图表",
+        "home_filter": "🔍 筛选表格",
         "home_start_date": "开始日期（YYYY-MM-DD）",
         "home_end_date": "结束日期（YYYY-MM-DD）",
         "home_chart_type": "图表类型",
         "home_chart_bar": "柱状图",
         "home_chart_line": "折线图",
+        "home_resolution": "汇总方式",
+        "home_resolutions": ["按日", "按周", "按月"],
         "stats_file_label": "统计历史文件：",
         "stats_auto_hint": "小提示：当日入库 UPC 数量会在有数据时自动填入。",
         "stats_no_file": "无",
         "stats_load_error": "读取统计历史文件出错：",
+        "cancel_button": "⏹ 取消",
+        "status_idle": "就绪",
+        "status_start": "正在开始核查……",
+        "status_load": "已读取 {source}",
+        "status_merge": "已合并数据源",
+        "status_classify": "已完成差异分类",
+        "status_history": "已合并历史累计表",
+        "status_export": "报告已导出",
+        "status_cancelling": "当前步骤完成后取消……",
+        "status_cancelled": "核查已取消。",
+        "status_done": "完成。",
+        "status_error": "核查失败。",
+        "use_cache": "文件未变化时复用解析结果",
+        "clear_cache_button": "🧹 清空缓存",
+        "cache_cleared": "解析缓存已清空。",
+        "cache_report": "解析缓存：",
+        "profile_next": "下次核查时进行性能分析",
+        "profile_written": "性能分析：",
+        "run_details": "运行详情",
+        "run_details_columns": ["步骤", "耗时 s", "CPU s", "输入行", "输出行", "内存 MB", "峰值 MB", "追踪峰值 MB", "状态"],
+        "run_log": "运行日志：",
+        "error_stage": "失败步骤 {stage}：",
     },
 }
 
@@ -119,10 +186,24 @@ file_paths: dict[str, str] = {}
 status_labels: dict[str, tk.Label] = {}
 label_refs: dict[str, tk.Label] = {}
 
-STATS_HISTORY_FILENAME = "discrepancy_stats.xlsx"
-
-stats_df = pd.DataFrame(columns = ["Date", "Source", "MismatchCount", "TotalUPC", "Rate"])
-chart_canvas: FigureCanvasTkAgg | None = None
+stats_store: "StatsStore | None" = None
+
+# Statistics table: only the pages loaded so far live in the Treeview; more rows
+# are fetched from the store as the user scrolls, sorts or filters.
+STATS_PAGE_SIZE = 200
+stats_view = {
+    "offset": 0,
+    "exhausted": False,
+    "sort": None,
+    "descending": False,
+    "start": None,
+    "end": None,
+    "sources": None,
+}
+chart_canvas: "FigureCanvasTkAgg | None" = None
+rate_chart: "RateChart | None" = None
+# Keys of stats_chart.RESOLUTIONS in the order the resolution box lists them.
+RESOLUTION_KEYS = ["day", "week", "month"]
 
 today_source_upc_counts = {
     "Inbound": 0,
@@ -134,9 +215,30 @@ today_source_upc_counts = {
 # Source filter options for chart
 source_filter_vars = {}
 
+# Background check job: the worker thread posts messages to check_queue,
+# the Tk main thread drains it with root.after.
+CHECK_POLL_MS = 100
+check_queue: queue.Queue = queue.Queue()
+check_cancel_event: threading.Event | None = None
+# Stage records of the last check, shown in the collapsible run details panel.
+RUN_DETAIL_COLUMNS = ("stage", *STAGE_FIELDS, TRACED_FIELD, "status")
+run_details_open = False
+
+# Sources that can also be selected as CSV exports (source_readers.CSV_SOURCES).
+CSV_FILE_TYPES = ("Inbound", "Export", "Transfer")
+
+# Startup warm-up: the worker thread posts its result to startup_queue.
+startup_queue: queue.Queue = queue.Queue()
+
 
 def select_file(file_type: str):
-    path = filedialog.askopenfilename(filetypes = [("Excel files", "*.xlsx")])
+    filetypes = [("Excel files", "*.xlsx")]
+    if file_type in CSV_FILE_TYPES:
+        filetypes = [("Excel or CSV files", "*.xlsx *.csv *.csv.gz"), ("Excel files", "*.xlsx"),
+                     ("CSV files", "*.csv *.csv.gz")]
+    if file_type == "History":
+        filetypes = [("History files", "*.xlsx *.db"), ("Excel files", "*.xlsx"), ("History ledger", "*.db")]
+    path = filedialog.askopenfilename(filetypes = filetypes)
     if path:
         file_paths[file_type] = path
         if file_type in status_labels:
@@ -148,6 +250,8 @@ def select_file(file_type: str):
 
 
 def auto_load_files():
+    from discrepancy_engine import find_default_files
+
     file_paths.clear()
     for key, lbl in status_labels.items():
         lbl.config(
@@ -156,393 +260,332 @@ def auto_load_files():
             font = ("Arial", 9)
         )
 
-    default_files = {
-        "Grounding": "Grounding.xlsx",
-        "Inbound": "InboundRecordFile.xlsx",
-        "Export": "ExportCustomRecordsFile.xlsx",
-        "Cancel": "Cancel Order.xlsx",
-        "Transfer": "Transfer Order.xlsx",
-        "History": "historical.xlsx",
-    }
-
-    exe_dir = get_exe_dir()
-    for key, filename in default_files.items():
-        path = os.path.join(exe_dir, filename)
-        if os.path.exists(path):
-            file_paths[key] = path
-            if key in status_labels:
-                status_labels[key].config(
-                    text = filename,
-                    fg = "green",
-                    font = ("Arial", 9, "bold")
-                )
-
-
-def save_stats_history():
-    if stats_df is None:
-        return
-    exe_dir = get_exe_dir()
-    path = os.path.join(exe_dir, STATS_HISTORY_FILENAME)
+    for key, path in find_default_files(get_exe_dir()).items():
+        file_paths[key] = path
+        if key in status_labels:
+            status_labels[key].config(
+                text = os.path.basename(path),
+                fg = "green",
+                font = ("Arial", 9, "bold")
+            )
+
+
+def load_logo():
     try:
-        df_to_save = stats_df.copy()
-        if not df_to_save.empty:
-            df_to_save["Date"] = df_to_save["Date"].astype(str)
-        df_to_save.to_excel(path, index=False)
-        stats_file_label.config(
-            text = f"{TEXT[language]['stats_file_label']} {STATS_HISTORY_FILENAME}"
-        )
+        return tk.PhotoImage(file=resource_path(LOGO_FILENAME))
+    except tk.TclError:
+        pass
+    # Older builds only ship the full-size logo.
+    try:
+        from PIL import Image, ImageTk
+
+        img = Image.open(resource_path("logo_on_shelf_bold.jfif"))
+        return ImageTk.PhotoImage(img.resize((80, 80), Image.Resampling.LANCZOS))
+    except Exception:
+        return None
+
+
+def on_first_paint():
+    root.update_idletasks()
+    startup_profile.mark("first_paint")
+    load_stats_history()
+
+
+# Runs on a background thread: imports the pandas-based modules and opens the stats
+# store (migrating a legacy workbook if needed). Never touches Tk widgets.
+def warm_up_worker(folder: str):
+    try:
+        import discrepancy_engine  # noqa: F401
+        from stats_store import open_stats
+
+        startup_queue.put(("stats", open_stats(folder)))
     except Exception as e:
-        messagebox.showerror(TEXT[language]["error_title"], str(e))
+        startup_queue.put(("error", str(e)))
 
 
 def load_stats_history():
-    global stats_df
-    exe_dir = get_exe_dir()
-    path = os.path.join(exe_dir, STATS_HISTORY_FILENAME)
+    threading.Thread(target=warm_up_worker, args=(get_exe_dir(),), daemon=True).start()
+    root.after(CHECK_POLL_MS, poll_startup_queue)
 
-    if not os.path.exists(path):
-        stats_df = pd.DataFrame(columns = ["Date", "Source", "MismatchCount", "TotalUPC", "Rate"])
-        stats_file_label.config(
-            text = f"{TEXT[language]['stats_file_label']} {TEXT[language]['stats_no_file']}"
-        )
-        return
 
-    try:
-        df = pd.read_excel(path)
-        expected_cols = ["Date", "Source", "MismatchCount", "TotalUPC", "Rate"]
-        for c in expected_cols:
-            if c not in df.columns:
-                if c == "Date":
-                    df[c] = datetime.date.today()
-                else:
-                    df[c] = 0
-        df = df[expected_cols]
+def poll_startup_queue():
+    global stats_store
 
-        try:
-            df["Date"] = pd.to_datetime(df["Date"]).dt.date
-        except Exception:
-            df["Date"] = datetime.date.today()
-
-        stats_df = df
-
-        for _, row in stats_df.iterrows():
-            dt = row["Date"]
-            if isinstance(dt, str):
-                try:
-                    dt = datetime.datetime.strptime(dt, "%Y-%m-%d").date()
-                except Exception:
-                    dt = datetime.date.today()
-            rate_val = row["Rate"] if pd.notna(row["Rate"]) else 0.0
-            rate_str = f"{rate_val * 100:.1f}%" if rate_val != 0 else "0.0%"
-            stats_tree.insert(
-                "",
-                "end",
-                values = (
-                    dt.strftime("%Y-%m-%d"),
-                    row["Source"],
-                    int(row["MismatchCount"]),
-                    int(row["TotalUPC"]),
-                    rate_str,
-                ),
-            )
+    try:
+        msg = startup_queue.get_nowait()
+    except queue.Empty:
+        root.after(CHECK_POLL_MS, poll_startup_queue)
+        return
 
+    if msg[0] == "stats":
+        stats_store = msg[1]
+        reload_stats_view()
         stats_file_label.config(
-            text=f"{TEXT[language]['stats_file_label']} {STATS_HISTORY_FILENAME}"
+            text=f"{TEXT[language]['stats_file_label']} {os.path.basename(stats_store.path)}"
         )
-
-    except Exception as e:
+    else:
         messagebox.showerror(
             TEXT[language]["error_title"],
-            TEXT[language]["stats_load_error"] + str(e),
+            TEXT[language]["stats_load_error"] + msg[1],
         )
-        stats_df = pd.DataFrame(columns=["Date", "Source", "MismatchCount", "TotalUPC", "Rate"])
+        stats_store = None
         stats_file_label.config(
             text=f"{TEXT[language]['stats_file_label']} {TEXT[language]['stats_no_file']}"
         )
 
+    auto_load_files()
+    startup_profile.mark("stats_loaded")
+    if startup_profile.write_report():
+        root.destroy()
+
+
+def reload_stats_view():
+    stats_tree.delete(*stats_tree.get_children())
+    stats_view["offset"] = 0
+    stats_view["exhausted"] = False
+    fetch_stats_page()
+
+
+def fetch_stats_page():
+    if stats_store is None or stats_view["exhausted"]:
+        return
+    rows = stats_store.page(
+        stats_view["offset"],
+        STATS_PAGE_SIZE,
+        stats_view["sort"],
+        stats_view["descending"],
+        stats_view["start"],
+        stats_view["end"],
+        stats_view["sources"],
+    )
+    for values in rows:
+        stats_tree.insert("", "end", values=values)
+    stats_view["offset"] += len(rows)
+    stats_view["exhausted"] = len(rows) < STATS_PAGE_SIZE
+
+
+# Scrolled near the bottom of the loaded rows: fetch the next page.
+def on_stats_scroll(first, last):
+    stats_scrollbar.set(first, last)
+    if float(last) >= 0.9 and not stats_view["exhausted"]:
+        root.after_idle(fetch_stats_page)
+
+
+def sort_stats_by(column: str):
+    if stats_view["sort"] == column:
+        stats_view["descending"] = not stats_view["descending"]
+    else:
+        stats_view["sort"] = column
+        stats_view["descending"] = False
+    reload_stats_view()
+
+
+# Show only the rows in the date range and sources selected below the table.
+def filter_stats_table():
+    start_str = start_date_entry.get().strip()
+    end_str = end_date_entry.get().strip()
+    try:
+        stats_view["start"] = datetime.datetime.strptime(start_str, "%Y-%m-%d").date() if start_str else None
+        stats_view["end"] = datetime.datetime.strptime(end_str, "%Y-%m-%d").date() if end_str else None
+    except ValueError:
+        messagebox.showerror(TEXT[language]["error_title"], "Date format should be YYYY-MM-DD.")
+        return
+    selected = [src for src, var in source_filter_vars.items() if var.get()]
+    stats_view["sources"] = selected if selected and len(selected) < len(source_filter_vars) else None
+    reload_stats_view()
+
 
 def run_check():
-    global today_source_upc_counts
+    from discrepancy_engine import SOURCE_KEYS, default_cache_dir
+    from discrepancy_rules import RULES_FILENAME, load_rules
+    from report_writers import REPORT_FILETYPES
+    from source_cache import SourceCache
 
-    if not any(k in file_paths for k in ["Grounding", "Inbound", "Export", "Cancel", "Transfer"]):
+    global check_cancel_event
+
+    if check_cancel_event is not None:
+        return
+
+    if not any(k in file_paths for k in SOURCE_KEYS):
         messagebox.showerror(TEXT[language]["error_title"], TEXT[language]["error_missing_all"])
         return
 
-    filetypes = [("Excel files", "*.xlsx"), ("CSV files", "*.csv")]
-    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=filetypes)
+    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=REPORT_FILETYPES)
     if not save_path:
         return
 
     try:
-        grounding_exists = "Grounding" in file_paths
-        inbound_exists = "Inbound" in file_paths
-        export_exists = "Export" in file_paths
-        cancel_exists = "Cancel" in file_paths
-        transfer_exists = "Transfer" in file_paths
-        history_path = file_paths.get("History", None)
-
-        if grounding_exists:
-            grounding_df = pd.read_excel(file_paths["Grounding"])
-            records = []
-            for i in range(0, len(grounding_df), 3):
-                group = grounding_df.iloc[i:i + 3]
-                if len(group) == 3:
-                    upc = str(group.iloc[0, 0])
-                    product_name = str(group.iloc[1, 0])
-                    grounding_num = group.iloc[2, 1]
-                    try:
-                        grounding_num = int(float(grounding_num))
-                    except Exception:
-                        grounding_num = 0
-                    records.append({
-                        "UPC": upc,
-                        "Product Name": product_name,
-                        "Grounding Qty": grounding_num
-                    })
-            df_final_grounding = pd.DataFrame(records)
-            grounding_summary = df_final_grounding.groupby("UPC", as_index=False)["Grounding Qty"].sum()
-        else:
-            df_final_grounding = pd.DataFrame(columns=["UPC", "Product Name", "Grounding Qty"])
-            grounding_summary = pd.DataFrame(columns=["UPC", "Grounding Qty"])
-
-        if inbound_exists:
-            inbound_df = pd.read_excel(file_paths["Inbound"])
-            inbound_summary = inbound_df.groupby("UPC", as_index=False)["Inbound Qty"].sum()
-        else:
-            inbound_summary = pd.DataFrame(columns=["UPC", "Inbound Qty"])
-
-        if export_exists:
-            export_df_raw = pd.read_excel(file_paths["Export"])
-            valueadd_df = export_df_raw[export_df_raw["Outbound SN"].isna()]
-            valueadd_summary = valueadd_df.groupby("UPC after value-added", as_index=False)["Value-added Num."].sum()
-            valueadd_summary.rename(
-                columns={"UPC after value-added": "UPC", "Value-added Num.": "Value-add Qty"},
-                inplace=True
-            )
-        else:
-            valueadd_summary = pd.DataFrame(columns=["UPC", "Value-add Qty"])
-
-        if cancel_exists:
-            cancel_df_raw = pd.read_excel(file_paths["Cancel"], header=None)
-            cancel_df_raw = cancel_df_raw.iloc[1:].reset_index(drop=True)
-            col0 = cancel_df_raw[0].tolist()
-            cancel_records = []
-            i = 0
-            while i < len(col0):
-                upc = str(col0[i]).strip()
-                if i + 1 >= len(col0):
-                    break
-                product_name = str(col0[i + 1]).strip()
-                if i + 2 >= len(col0):
-                    break
-                next_line = str(col0[i + 2]).strip()
-                if next_line.isnumeric():
-                    shelf_code = None
-                    canceled_qty = int(float(next_line))
-                    i += 3
-                else:
-                    shelf_code = next_line
-                    if i + 3 < len(col0):
-                        canceled_qty_str = str(col0[i + 3]).strip()
-                        try:
-                            canceled_qty = int(float(canceled_qty_str))
-                        except Exception:
-                            canceled_qty = 0
-                    else:
-                        canceled_qty = 0
-                    i += 4
-                cancel_records.append({
-                    "UPC": upc,
-                    "Product Name": product_name,
-                    "Shelf Code": shelf_code,
-                    "Canceled Qty": canceled_qty
-                })
-            cancel_df = pd.DataFrame(cancel_records)
-            cancel_df = cancel_df[(cancel_df["Shelf Code"].isna()) | (cancel_df["Shelf Code"] == "CUSTOM0")]
-            cancel_summary = cancel_df.groupby("UPC", as_index=False)["Canceled Qty"].sum()
-        else:
-            cancel_summary = pd.DataFrame(columns=["UPC", "Canceled Qty"])
-
-        if transfer_exists:
-            transfer_df = pd.read_excel(file_paths["Transfer"])
-            transfer_summary = transfer_df.groupby("UPC", as_index=False)["transfer Num."].sum()
-            transfer_summary.rename(columns={"transfer Num.": "Transfer Qty"}, inplace=True)
-        else:
-            transfer_summary = pd.DataFrame(columns=["UPC", "Transfer Qty"])
-
-        for df in [grounding_summary, inbound_summary, valueadd_summary, cancel_summary, transfer_summary]:
-            if not df.empty:
-                df["UPC"] = df["UPC"].astype(str)
-
-        today_source_upc_counts = {
-            "Inbound": int((inbound_summary["Inbound Qty"] > 0).sum()) if not inbound_summary.empty else 0,
-            "Value-Add": int((valueadd_summary["Value-add Qty"] > 0).sum()) if not valueadd_summary.empty else 0,
-            "Cancel": int((cancel_summary["Canceled Qty"] > 0).sum()) if not cancel_summary.empty else 0,
-            "Transfer": int((transfer_summary["Transfer Qty"] > 0).sum()) if not transfer_summary.empty else 0,
-        }
-
-        all_upcs = set()
-        for df in [grounding_summary, inbound_summary, valueadd_summary, cancel_summary, transfer_summary]:
-            if not df.empty:
-                all_upcs.update(df["UPC"].unique())
-
-        if not all_upcs:
-            messagebox.showerror(TEXT[language]["error_title"], "No data rows found in selected files.")
-            return
+        rules = load_rules(os.path.join(get_exe_dir(), RULES_FILENAME))
+    except Exception as e:
+        messagebox.showerror(TEXT[language]["error_title"], f"{RULES_FILENAME}: {e}")
+        return
 
-        merged = pd.DataFrame({"UPC": list(all_upcs)})
-        merged = merged.merge(grounding_summary, on="UPC", how="left")
-        merged = merged.merge(inbound_summary, on="UPC", how="left")
-        merged = merged.merge(valueadd_summary, on="UPC", how="left")
-        merged = merged.merge(cancel_summary, on="UPC", how="left")
-        merged = merged.merge(transfer_summary, on="UPC", how="left")
-
-        for col in ["Grounding Qty", "Inbound Qty", "Value-add Qty", "Canceled Qty", "Transfer Qty"]:
-            if col in merged.columns:
-                merged[col] = merged[col].fillna(0).astype(int)
-            else:
-                merged[col] = 0
-
-        merged["Total Inbound Qty"] = (
-            merged["Inbound Qty"]
-            + merged["Value-add Qty"]
-            + merged["Canceled Qty"]
-            + merged["Transfer Qty"]
-        )
+    cache = SourceCache(default_cache_dir()) if use_cache_var.get() else None
+    # Profiling is for a single run.
+    profile = profile_var.get()
+    profile_var.set(False)
+
+    check_cancel_event = threading.Event()
+    run_button.config(state="disabled")
+    cancel_button.config(state="normal")
+    progress_bar.config(value=0, maximum=1)
+    status_var.set(TEXT[language]["status_start"])
+
+    worker = threading.Thread(
+        target=check_worker,
+        args=(dict(file_paths), save_path, check_cancel_event, cache, rules, profile),
+        daemon=True
+    )
+    worker.start()
+    root.after(CHECK_POLL_MS, poll_check_queue)
 
-        if not df_final_grounding.empty:
-            product_map = df_final_grounding[["UPC", "Product Name"]].drop_duplicates("UPC")
-        else:
-            product_map = pd.DataFrame(columns=["UPC", "Product Name"])
-        merged = merged.merge(product_map, on="UPC", how="left")
-
-        def check_issue(row):
-            if row["Total Inbound Qty"] == 0 and row["Grounding Qty"] > 0:
-                return "Missing Inbound"
-            if row["Grounding Qty"] == 0 and row["Total Inbound Qty"] > 0:
-                return "Missing Grounding"
-            if row["Total Inbound Qty"] != row["Grounding Qty"]:
-                return "Quantity Mismatch"
-            return None
-
-        merged["Issue"] = merged.apply(check_issue, axis=1)
-        today_result = merged[merged["Issue"].notna()][[
-            "UPC",
-            "Product Name",
-            "Inbound Qty",
-            "Value-add Qty",
-            "Canceled Qty",
-            "Transfer Qty",
-            "Total Inbound Qty",
-            "Grounding Qty",
-            "Issue"
-        ]]
-
-        export_df = today_result.copy()
-
-        if history_path is not None:
-            try:
-                if os.path.exists(history_path):
-                    hist_df = pd.read_excel(history_path)
-                else:
-                    hist_df = pd.DataFrame(columns=today_result.columns)
-
-                cols = [
-                    "UPC",
-                    "Product Name",
-                    "Inbound Qty",
-                    "Value-add Qty",
-                    "Canceled Qty",
-                    "Transfer Qty",
-                    "Total Inbound Qty",
-                    "Grounding Qty",
-                    "Issue"
-                ]
-                for c in cols:
-                    if c not in hist_df.columns:
-                        hist_df[c] = pd.NA
-                hist_df = hist_df[cols]
-
-                numeric_cols = [
-                    "Inbound Qty",
-                    "Value-add Qty",
-                    "Canceled Qty",
-                    "Transfer Qty",
-                    "Total Inbound Qty",
-                    "Grounding Qty"
-                ]
-
-                for df_tmp in (hist_df, today_result):
-                    if not df_tmp.empty:
-                        df_tmp["UPC"] = df_tmp["UPC"].astype(str)
-                        for col in numeric_cols:
-                            df_tmp[col] = pd.to_numeric(df_tmp[col], errors="coerce").fillna(0).astype(int)
-
-                combined = pd.merge(
-                    hist_df,
-                    today_result,
-                    on="UPC",
-                    how="outer",
-                    suffixes=("_hist", "_today")
-                )
-
-                combined["Product Name"] = combined["Product Name_today"].combine_first(combined["Product Name_hist"])
-
-                for col in numeric_cols:
-                    col_hist = f"{col}_hist"
-                    col_today = f"{col}_today"
-                    if col_hist not in combined.columns:
-                        combined[col_hist] = 0
-                    if col_today not in combined.columns:
-                        combined[col_today] = 0
-                    combined[col] = (
-                        combined[col_hist].fillna(0).astype(int)
-                        + combined[col_today].fillna(0).astype(int)
-                    )
-
-                def check_issue_cumulative(row):
-                    if row["Total Inbound Qty"] == 0 and row["Grounding Qty"] > 0:
-                        return "Missing Inbound"
-                    if row["Grounding Qty"] == 0 and row["Total Inbound Qty"] > 0:
-                        return "Missing Grounding"
-                    if row["Total Inbound Qty"] != row["Grounding Qty"]:
-                        return "Quantity Mismatch"
-                    return None
-
-                combined["Issue"] = combined.apply(check_issue_cumulative, axis=1)
-
-                cumulative_unresolved = combined[combined["Issue"].notna()].copy()
-
-                history_to_save = cumulative_unresolved[cols]
-
-                export_df = history_to_save.copy()
-
-
-            except Exception as e:
-                messagebox.showerror(TEXT[language]["error_title"], f"Error updating historical.xlsx: {e}")
-                export_df = today_result.copy()
-
-        if export_df.empty:
-            messagebox.showinfo(TEXT[language]["success_title"], "No discrepancy found. Export file may be empty.")
-        if save_path.endswith(".csv"):
-            export_df.to_csv(save_path, index=False, encoding="utf-8-sig")
-        else:
-            export_df.to_excel(save_path, index=False)
-
-        msg = TEXT[language]["success"] + f"\n\n{save_path}"
-        msg += "\n\nToday UPC counts by source:\n"
-        msg += f"Inbound: {today_source_upc_counts['Inbound']}, "
-        msg += f"Value-Add: {today_source_upc_counts['Value-Add']}, "
-        msg += f"Cancel: {today_source_upc_counts['Cancel']}, "
-        msg += f"Transfer: {today_source_upc_counts['Transfer']}"
-
-        messagebox.showinfo(TEXT[language]["success_title"], msg)
-        open_file_location(save_path)
 
-        on_source_change()
+# Runs on the worker thread: never touch Tk widgets here, only post to check_queue.
+def check_worker(paths: dict, save_path: str, cancel_event: threading.Event, cache: "SourceCache | None",
+                 rules, profile: bool):
+    import discrepancy_engine as engine
+    from run_metrics import RunMetrics, stage_label
+
+    def report(done, total, stage, source=None):
+        check_queue.put(("progress", done, total, stage, source))
 
+    metrics = RunMetrics()
+    try:
+        result = engine.run_check(
+            paths,
+            paths.get("History", None),
+            save_path=save_path,
+            progress=report,
+            cancel=cancel_event,
+            cache=cache,
+            rules=rules,
+            metrics=metrics,
+            profile=profile
+        )
+        check_queue.put(("done", result, save_path))
+    except engine.CheckCancelled:
+        check_queue.put(("cancelled", metrics.stages))
     except Exception as e:
-        messagebox.showerror(TEXT[language]["error_title"], str(e))
+        failed = metrics.failed_stage()
+        stage = stage_label(failed) if failed else None
+        check_queue.put(("error", str(e), stage, metrics.stages))
+
+
+def clear_source_cache():
+    from discrepancy_engine import default_cache_dir
+    from source_cache import SourceCache
+
+    SourceCache(default_cache_dir()).clear()
+    status_var.set(TEXT[language]["cache_cleared"])
+
+
+def cancel_check():
+    if check_cancel_event is not None:
+        check_cancel_event.set()
+        cancel_button.config(state="disabled")
+        status_var.set(TEXT[language]["status_cancelling"])
+
+
+def finish_check():
+    global check_cancel_event
+    check_cancel_event = None
+    run_button.config(state="normal")
+    cancel_button.config(state="disabled")
+
+
+def poll_check_queue():
+    while True:
+        try:
+            msg = check_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        kind = msg[0]
+        if kind == "progress":
+            _, done, total, stage, source = msg
+            progress_bar.config(value=done, maximum=total)
+            if not check_cancel_event.is_set():
+                status_var.set(TEXT[language][f"status_{stage}"].format(source=source))
+        elif kind == "done":
+            finish_check()
+            status_var.set(TEXT[language]["status_done"])
+            show_run_details(msg[1].metrics.stages, msg[1].run_log)
+            show_check_result(*msg[1:])
+            return
+        elif kind == "cancelled":
+            finish_check()
+            progress_bar.config(value=0)
+            status_var.set(TEXT[language]["status_cancelled"])
+            show_run_details(msg[1])
+            return
+        elif kind == "error":
+            _, error, stage, stages = msg
+            finish_check()
+            status_var.set(TEXT[language]["status_error"])
+            show_run_details(stages)
+            if stage:
+                error = TEXT[language]["error_stage"].format(stage=stage) + error
+            messagebox.showerror(TEXT[language]["error_title"], error)
+            return
+
+    root.after(CHECK_POLL_MS, poll_check_queue)
+
+
+def show_check_result(result, save_path: str):
+    global today_source_upc_counts
+    today_source_upc_counts = result.source_upc_counts
+
+    if result.history_error:
+        messagebox.showerror(TEXT[language]["error_title"], result.history_error)
+    if result.report.empty:
+        messagebox.showinfo(TEXT[language]["success_title"], "No discrepancy found. Export file may be empty.")
+
+    msg = TEXT[language]["success"] + f"\n\n{save_path}"
+    msg += "\n\nToday UPC counts by source:\n"
+    msg += f"Inbound: {today_source_upc_counts['Inbound']}, "
+    msg += f"Value-Add: {today_source_upc_counts['Value-Add']}, "
+    msg += f"Cancel: {today_source_upc_counts['Cancel']}, "
+    msg += f"Transfer: {today_source_upc_counts['Transfer']}"
+    if result.cache_report:
+        msg += "\n\n" + TEXT[language]["cache_report"] + result.cache_report
+    for path in result.profile_paths:
+        msg += "\n" + TEXT[language]["profile_written"] + path
+
+    messagebox.showinfo(TEXT[language]["success_title"], msg)
+    open_file_location(save_path)
+
+    on_source_change()
+
+
+def show_run_details(stages: list[dict], log_path: str | None = None):
+    from run_metrics import format_value, stage_fields, stage_label
+
+    run_details_tree.delete(*run_details_tree.get_children())
+    # The tracemalloc column only for traced runs, as in the CLI table.
+    run_details_tree.config(displaycolumns=["stage", *stage_fields(stages), "status"])
+    for record in stages:
+        status = record.get("cache") or record["status"]
+        if record.get("error"):
+            status += f": {record['error']}"
+        values = [stage_label(record)] + [format_value(record.get(k)) for k in RUN_DETAIL_COLUMNS[1:-1]] + [status]
+        run_details_tree.insert("", "end", values=values)
+    run_log_var.set(TEXT[language]["run_log"] + log_path if log_path else "")
+
+
+def toggle_run_details():
+    global run_details_open
+    run_details_open = not run_details_open
+    if run_details_open:
+        run_details_frame.pack(padx=20, pady=5, fill="x")
+    else:
+        run_details_frame.pack_forget()
+    refresh_run_details_header()
+
+
+def refresh_run_details_header():
+    run_details_button.config(text=("▾ " if run_details_open else "▸ ") + TEXT[language]["run_details"])
+    for column, heading in zip(RUN_DETAIL_COLUMNS, TEXT[language]["run_details_columns"]):
+        run_details_tree.heading(column, text=heading)
 
 
 def switch_language(lang: str):
@@ -560,7 +603,14 @@ def refresh_ui():
     for key, label in label_refs.items():
         label.config(text=TEXT[language].get(key, label.cget("text")))
     run_button.config(text=TEXT[language]["run_button"])
+    cancel_button.config(text=TEXT[language]["cancel_button"])
     refresh_button.config(text=TEXT[language]["refresh_button"])
+    use_cache_check.config(text=TEXT[language]["use_cache"])
+    clear_cache_button.config(text=TEXT[language]["clear_cache_button"])
+    profile_check.config(text=TEXT[language]["profile_next"])
+    refresh_run_details_header()
+    if check_cancel_event is None:
+        status_var.set(TEXT[language]["status_idle"])
 
     notebook.tab(checker_frame, text=TEXT[language]["tab_home"])
     notebook.tab(home_frame, text=TEXT[language]["tab_checker"])
@@ -574,11 +624,16 @@ def refresh_ui():
     add_record_button.config(text=TEXT[language]["home_add"])
     export_stats_button.config(text=TEXT[language]["home_export"])
     chart_button.config(text=TEXT[language]["home_chart"])
+    filter_button.config(text=TEXT[language]["home_filter"])
     start_date_label.config(text=TEXT[language]["home_start_date"])
     end_date_label.config(text=TEXT[language]["home_end_date"])
     chart_type_label.config(text=TEXT[language]["home_chart_type"])
     bar_radio.config(text=TEXT[language]["home_chart_bar"])
     line_radio.config(text=TEXT[language]["home_chart_line"])
+    resolution_label.config(text=TEXT[language]["home_resolution"])
+    resolution_index = resolution_combo.current()
+    resolution_combo.config(values=TEXT[language]["home_resolutions"])
+    resolution_combo.current(resolution_index)
     stats_file_label.config(text=TEXT[language]["stats_file_label"])
     stats_hint_label.config(text=TEXT[language]["stats_auto_hint"])
 
@@ -596,7 +651,10 @@ def create_file_selector(master, label_key: str, file_type: str, row: int):
 
 
 def add_stats_record():
-    global stats_df
+    if stats_store is None:
+        messagebox.showerror(TEXT[language]["error_title"], TEXT[language]["stats_load_error"])
+        return
+
     date_str = date_entry.get().strip()
     if not date_str:
         date_val = datetime.date.today()
@@ -629,163 +687,90 @@ def add_stats_record():
 
     rate_val = mismatch_val / total_val if total_val > 0 else 0.0
 
-    stats_df.loc[len(stats_df)] = [date_val, source_val, mismatch_val, total_val, rate_val]
-
-    rate_str = f"{rate_val * 100:.1f}%"
-    stats_tree.insert("", "end", values=(
-        date_val.strftime("%Y-%m-%d"),
-        source_val,
-        mismatch_val,
-        total_val,
-        rate_str
-    ))
+    try:
+        stats_store.append(date_val, source_val, mismatch_val, total_val, rate_val)
+    except Exception as e:
+        messagebox.showerror(TEXT[language]["error_title"], str(e))
+        return
 
-    save_stats_history()
+    # New records have the highest id, so in insertion order they are picked up by the
+    # next page fetch; any other ordering is reloaded from the first page.
+    if stats_view["sort"] is None and not stats_view["descending"]:
+        stats_view["exhausted"] = False
+        fetch_stats_page()
+    else:
+        reload_stats_view()
 
     count_entry.delete(0, tk.END)
     total_upc_entry.delete(0, tk.END)
 
 
 def export_stats():
-    if stats_df.empty:
+    from report_writers import REPORT_FILETYPES, write_report
+
+    if stats_store is None or stats_store.count() == 0:
         messagebox.showerror(TEXT[language]["error_title"], "No statistics data to export.")
         return
-    filetypes = [("Excel files", "*.xlsx"), ("CSV files", "*.csv")]
-    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=filetypes)
+    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=REPORT_FILETYPES)
     if not save_path:
         return
     try:
-        df_to_save = stats_df.copy()
+        df_to_save = stats_store.query()
         df_to_save["Date"] = df_to_save["Date"].astype(str)
-        if save_path.endswith(".csv"):
-            df_to_save.to_csv(save_path, index=False, encoding="utf-8-sig")
-        else:
-            df_to_save.to_excel(save_path, index=False)
+        write_report(df_to_save, save_path)
         messagebox.showinfo(TEXT[language]["success_title"], TEXT[language]["success"] + f"\n\n{save_path}")
         open_file_location(save_path)
     except Exception as e:
         messagebox.showerror(TEXT[language]["error_title"], str(e))
 
 
-
 def generate_chart():
-    global chart_canvas
+    global chart_canvas, rate_chart
 
-    if stats_df.empty:
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from stats_chart import RateChart, chart_series
+
+    if stats_store is None or stats_store.count() == 0:
         messagebox.showerror(TEXT[language]["error_title"], "No statistics data to plot.")
         return
 
-    # Copy and apply date range filter
-    df_plot = stats_df.copy()
+    # Apply date range filter in the store query
     start_str = start_date_entry.get().strip()
     end_str = end_date_entry.get().strip()
     try:
-        if start_str:
-            start_date = datetime.datetime.strptime(start_str, "%Y-%m-%d").date()
-            df_plot = df_plot[df_plot["Date"] >= start_date]
-        if end_str:
-            end_date = datetime.datetime.strptime(end_str, "%Y-%m-%d").date()
-            df_plot = df_plot[df_plot["Date"] <= end_date]
+        start_date = datetime.datetime.strptime(start_str, "%Y-%m-%d").date() if start_str else None
+        end_date = datetime.datetime.strptime(end_str, "%Y-%m-%d").date() if end_str else None
     except ValueError:
         messagebox.showerror(TEXT[language]["error_title"], "Date format should be YYYY-MM-DD.")
         return
 
+    # Apply source filter (if user checked any source)
+    selected_sources = [src for src, var in source_filter_vars.items() if var.get()]
+    df_plot = stats_store.query(start_date, end_date, selected_sources or None)
+
     if df_plot.empty:
-        messagebox.showerror(TEXT[language]["error_title"], "No data in the selected date range.")
+        messagebox.showerror(TEXT[language]["error_title"], "No data for the selected source(s) and date range.")
         return
 
-    # Apply source filter (if user checked any source)
-    if source_filter_vars:
-        selected_sources = [src for src, var in source_filter_vars.items() if var.get()]
-    else:
-        selected_sources = sorted(df_plot["Source"].unique().tolist())
-
     if not selected_sources:
         # If nothing is selected, fall back to all sources in the data
         selected_sources = sorted(df_plot["Source"].unique().tolist())
         for src in source_filter_vars:
             source_filter_vars[src].set(True)
 
-    df_plot = df_plot[df_plot["Source"].isin(selected_sources)]
+    resolution = RESOLUTION_KEYS[resolution_combo.current()]
+    series = chart_series(df_plot, selected_sources, resolution)
 
-    if df_plot.empty:
-        messagebox.showerror(TEXT[language]["error_title"], "No data for the selected source(s) and date range.")
-        return
+    # The figure and canvas are created once and redrawn in place afterwards
+    if rate_chart is None:
+        rate_chart = RateChart()
+        chart_canvas = FigureCanvasTkAgg(rate_chart.figure, master=chart_frame)
+        chart_canvas.get_tk_widget().pack(fill="both", expand=True)
 
-    # Aggregate by Date + Source, then compute daily mismatch rate per source
-    grouped = df_plot.groupby(["Date", "Source"], as_index=False).agg({
-        "MismatchCount": "sum",
-        "TotalUPC": "sum"
-    })
-    grouped["Rate"] = grouped.apply(
-        lambda r: (r["MismatchCount"] / r["TotalUPC"]) if r["TotalUPC"] > 0 else 0.0,
-        axis=1
-    )
+    rate_chart.update(series, chart_type_var.get(), resolution, TEXT[language]["home_title"])
+    chart_canvas.draw_idle()
 
-    if grouped.empty:
-        messagebox.showerror(TEXT[language]["error_title"], "No aggregated data to plot.")
-        return
 
-    # Build complete date list to align different sources
-    dates = sorted(grouped["Date"].unique())
-    if not dates:
-        messagebox.showerror(TEXT[language]["error_title"], "No dates available to plot.")
-        return
-
-    # Prepare figure
-    if chart_canvas is not None:
-        chart_canvas.get_tk_widget().destroy()
-        chart_canvas = None
-
-    fig = Figure(figsize=(6, 3), dpi=100)
-    ax = fig.add_subplot(111)
-
-    chart_mode = chart_type_var.get()
-
-    if chart_mode == "line":
-        # One line per source
-        for src in selected_sources:
-            df_src = grouped[grouped["Source"] == src]
-            y_vals = []
-            for d in dates:
-                row = df_src[df_src["Date"] == d]
-                if not row.empty:
-                    y_vals.append(float(row["Rate"].iloc[0]))
-                else:
-                    y_vals.append(0.0)
-            ax.plot(dates, y_vals, marker="o", label=src)
-    else:
-        # Grouped bar chart by date and source
-        x_idx = list(range(len(dates)))
-        n_src = max(len(selected_sources), 1)
-        width = 0.8 / n_src  # total width around each date
-
-        for i, src in enumerate(selected_sources):
-            df_src = grouped[grouped["Source"] == src]
-            y_vals = []
-            for d in dates:
-                row = df_src[df_src["Date"] == d]
-                if not row.empty:
-                    y_vals.append(float(row["Rate"].iloc[0]))
-                else:
-                    y_vals.append(0.0)
-            # shift each source slightly so they appear side by side
-            offsets = [x + (i - (n_src - 1) / 2) * width for x in x_idx]
-            ax.bar(offsets, y_vals, width=width, label=src)
-
-        # Use date strings as x-axis tick labels
-        ax.set_xticks(x_idx)
-        ax.set_xticklabels([d.strftime("%Y-%m-%d") for d in dates], rotation=45, ha="right")
-
-    ax.set_xlabel("Date")
-    ax.set_ylabel("Mismatch Rate")
-    ax.set_title(TEXT[language]["home_title"])
-    ax.legend()
-    fig.autofmt_xdate()
-
-    chart_canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-    chart_canvas.draw()
-    chart_canvas.get_tk_widget().pack(fill="both", expand=True)
 def on_source_change(event=None):
     src = source_combo.get().strip() or "Inbound"
     val = int(today_source_upc_counts.get(src, 0))
@@ -794,190 +779,252 @@ def on_source_change(event=None):
         total_upc_entry.insert(0, str(val))
 
 
-root = tk.Tk()
-root.title(TEXT[language]["title"])
-root.geometry("900x740")
-
-try:
-    root.iconbitmap(resource_path("logo_on_shelf_bold.ico"))
-except Exception:
-    pass
-
-menubar = tk.Menu(root)
-lang_menu = tk.Menu(menubar, tearoff=0)
-lang_menu.add_command(label=TEXT["zh"]["menu_zh"], command=lambda: switch_language("zh"))
-lang_menu.add_command(label=TEXT["en"]["menu_en"], command=lambda: switch_language("en"))
-menubar.add_cascade(label=TEXT[language]["menu_language"], menu=lang_menu)
-root.config(menu=menubar)
-
-try:
-    img = Image.open(resource_path("logo_on_shelf_bold.jfif"))
-    img = img.resize((80, 80), Image.Resampling.LANCZOS)
-    logo_img = ImageTk.PhotoImage(img)
-    img_label = tk.Label(root, image=logo_img)
-    img_label.pack(pady=5)
-except Exception:
-    logo_img = None
-
-notebook = ttk.Notebook(root)
-checker_frame = tk.Frame(notebook)
-home_frame = tk.Frame(notebook)
-notebook.add(checker_frame, text=TEXT[language]["tab_home"])
-notebook.add(home_frame, text=TEXT[language]["tab_checker"])
-notebook.pack(expand=True, fill="both", pady=10)
-
-checker_title_label = tk.Label(checker_frame, text=TEXT[language]["title"], font=("Arial", 14, "bold"))
-checker_title_label.pack(pady=10)
-
-file_frame = tk.Frame(checker_frame)
-file_frame.pack(pady=10)
-
-create_file_selector(file_frame, "grounding", "Grounding", 0)
-create_file_selector(file_frame, "inbound", "Inbound", 1)
-create_file_selector(file_frame, "export", "Export", 2)
-create_file_selector(file_frame, "cancel", "Cancel", 3)
-create_file_selector(file_frame, "transfer", "Transfer", 4)
-create_file_selector(file_frame, "history", "History", 5)
-
-refresh_button = tk.Button(
-    checker_frame,
-    text=TEXT[language]["refresh_button"],
-    font=("Arial", 10, "bold"),
-    bg="#007ACC",
-    fg="white",
-    width=25,
-    command=auto_load_files
-)
-refresh_button.pack(pady=5)
-
-auto_load_files()
-
-run_button = tk.Button(
-    checker_frame,
-    text=TEXT[language]["run_button"],
-    font=("Arial", 12, "bold"),
-    bg="green",
-    fg="white",
-    width=25,
-    command=run_check
-)
-run_button.pack(pady=10)
-
-home_title_label = tk.Label(home_frame, text=TEXT[language]["home_title"], font=("Arial", 14, "bold"))
-home_title_label.pack(pady=10)
-
-home_top_frame = tk.Frame(home_frame)
-home_top_frame.pack(pady=5, fill="x", padx=20)
-
-date_label = tk.Label(home_top_frame, text=TEXT[language]["home_date"])
-date_label.grid(row=0, column=0, sticky="w", padx=5, pady=2)
-date_entry = tk.Entry(home_top_frame, width=15)
-date_entry.grid(row=0, column=1, padx=5, pady=2)
-date_entry.insert(0, datetime.date.today().strftime("%Y-%m-%d"))
-
-source_label = tk.Label(home_top_frame, text=TEXT[language]["home_source"])
-source_label.grid(row=0, column=2, sticky="w", padx=5, pady=2)
-source_combo = ttk.Combobox(
-    home_top_frame,
-    values=["Inbound", "Value-Add", "Transfer", "Cancel"],
-    state="readonly",
-    width=15
-)
-source_combo.grid(row=0, column=3, padx=5, pady=2)
-source_combo.set("Inbound")
-source_combo.bind("<<ComboboxSelected>>", on_source_change)
-
-count_label = tk.Label(home_top_frame, text=TEXT[language]["home_count"])
-count_label.grid(row=0, column=4, sticky="w", padx=5, pady=2)
-count_entry = tk.Entry(home_top_frame, width=10)
-count_entry.grid(row=0, column=5, padx=5, pady=2)
-
-total_upc_label = tk.Label(home_top_frame, text=TEXT[language]["home_total_upc"])
-total_upc_label.grid(row=0, column=6, sticky="w", padx=5, pady=2)
-total_upc_entry = tk.Entry(home_top_frame, width=10)
-total_upc_entry.grid(row=0, column=7, padx=5, pady=2)
-
-add_record_button = tk.Button(home_top_frame, text=TEXT[language]["home_add"], command=add_stats_record)
-add_record_button.grid(row=0, column=8, padx=10, pady=2)
-
-stats_hint_label = tk.Label(home_frame, text=TEXT[language]["stats_auto_hint"], fg="gray", font=("Arial", 9))
-stats_hint_label.pack(anchor="w", padx=20, pady=2)
-
-stats_tree = ttk.Treeview(
-    home_frame,
-    columns=("date", "source", "mismatch", "total", "rate"),
-    show="headings",
-    height=8
-)
-stats_tree.heading("date", text=TEXT[language]["home_date"])
-stats_tree.heading("source", text=TEXT[language]["home_source"])
-stats_tree.heading("mismatch", text=TEXT[language]["home_count"])
-stats_tree.heading("total", text=TEXT[language]["home_total_upc"])
-stats_tree.heading("rate", text="Mismatch Rate")
-stats_tree.column("date", width=110)
-stats_tree.column("source", width=110)
-stats_tree.column("mismatch", width=110)
-stats_tree.column("total", width=110)
-stats_tree.column("rate", width=120)
-stats_tree.pack(padx=20, pady=10, fill="x")
-
-home_bottom_frame = tk.Frame(home_frame)
-home_bottom_frame.pack(pady=5, fill="x", padx=20)
-
-export_stats_button = tk.Button(home_bottom_frame, text=TEXT[language]["home_export"], command=export_stats)
-export_stats_button.grid(row=0, column=0, padx=5, pady=2)
-
-start_date_label = tk.Label(home_bottom_frame, text=TEXT[language]["home_start_date"])
-start_date_label.grid(row=1, column=0, sticky="w", padx=5, pady=2)
-start_date_entry = tk.Entry(home_bottom_frame, width=15)
-start_date_entry.grid(row=1, column=1, padx=5, pady=2)
-
-end_date_label = tk.Label(home_bottom_frame, text=TEXT[language]["home_end_date"])
-end_date_label.grid(row=1, column=2, sticky="w", padx=5, pady=2)
-end_date_entry = tk.Entry(home_bottom_frame, width=15)
-end_date_entry.grid(row=1, column=3, padx=5, pady=2)
-
-chart_type_label = tk.Label(home_bottom_frame, text=TEXT[language]["home_chart_type"])
-chart_type_label.grid(row=1, column=4, sticky="w", padx=5, pady=2)
-chart_type_var = tk.StringVar(value="bar")
-bar_radio = tk.Radiobutton(home_bottom_frame, text=TEXT[language]["home_chart_bar"],
-                           variable=chart_type_var, value="bar")
-bar_radio.grid(row=1, column=5, padx=5, pady=2)
-line_radio = tk.Radiobutton(home_bottom_frame, text=TEXT[language]["home_chart_line"],
-                            variable=chart_type_var, value="line")
-line_radio.grid(row=1, column=6, padx=5, pady=2)
-
-chart_button = tk.Button(home_bottom_frame, text=TEXT[language]["home_chart"], command=generate_chart)
-chart_button.grid(row=1, column=7, padx=10, pady=2)
-
-# Source filter checkbuttons for chart (optional)
-source_filter_label = tk.Label(home_bottom_frame, text="Sources:")
-source_filter_label.grid(row=2, column=0, sticky="w", padx=5, pady=2)
-
-source_filter_vars["Inbound"] = tk.BooleanVar(value=True)
-source_filter_vars["Value-Add"] = tk.BooleanVar(value=True)
-source_filter_vars["Transfer"] = tk.BooleanVar(value=True)
-source_filter_vars["Cancel"] = tk.BooleanVar(value=True)
-
-inbound_cb = tk.Checkbutton(home_bottom_frame, text="Inbound", variable=source_filter_vars["Inbound"])
-inbound_cb.grid(row=2, column=1, padx=5, pady=2, sticky="w")
-
-valueadd_cb = tk.Checkbutton(home_bottom_frame, text="Value-Add", variable=source_filter_vars["Value-Add"])
-valueadd_cb.grid(row=2, column=2, padx=5, pady=2, sticky="w")
-
-transfer_cb = tk.Checkbutton(home_bottom_frame, text="Transfer", variable=source_filter_vars["Transfer"])
-transfer_cb.grid(row=2, column=3, padx=5, pady=2, sticky="w")
-
-cancel_cb = tk.Checkbutton(home_bottom_frame, text="Cancel", variable=source_filter_vars["Cancel"])
-cancel_cb.grid(row=2, column=4, padx=5, pady=2, sticky="w")
-
-stats_file_label = tk.Label(home_frame, text=f"{TEXT[language]['stats_file_label']} {TEXT[language]['stats_no_file']}")
-stats_file_label.pack(anchor="w", padx=20, pady=5)
-
-chart_frame = tk.Frame(home_frame, height=250)
-chart_frame.pack(fill="both", expand=True, padx=20, pady=5)
-
-load_stats_history()
-
 if __name__ == "__main__":
+    # Source loading may start worker processes; they re-import this file and must not build a window.
+    multiprocessing.freeze_support()
+
+    root = tk.Tk()
+    root.title(TEXT[language]["title"])
+    root.geometry("900x740")
+
+    try:
+        root.iconbitmap(resource_path("logo_on_shelf_bold.ico"))
+    except Exception:
+        pass
+
+    menubar = tk.Menu(root)
+    lang_menu = tk.Menu(menubar, tearoff=0)
+    lang_menu.add_command(label=TEXT["zh"]["menu_zh"], command=lambda: switch_language("zh"))
+    lang_menu.add_command(label=TEXT["en"]["menu_en"], command=lambda: switch_language("en"))
+    menubar.add_cascade(label=TEXT[language]["menu_language"], menu=lang_menu)
+    root.config(menu=menubar)
+
+    logo_img = load_logo()
+    if logo_img is not None:
+        img_label = tk.Label(root, image=logo_img)
+        img_label.pack(pady=5)
+
+    notebook = ttk.Notebook(root)
+    checker_frame = tk.Frame(notebook)
+    home_frame = tk.Frame(notebook)
+    notebook.add(checker_frame, text=TEXT[language]["tab_home"])
+    notebook.add(home_frame, text=TEXT[language]["tab_checker"])
+    notebook.pack(expand=True, fill="both", pady=10)
+
+    checker_title_label = tk.Label(checker_frame, text=TEXT[language]["title"], font=("Arial", 14, "bold"))
+    checker_title_label.pack(pady=10)
+
+    file_frame = tk.Frame(checker_frame)
+    file_frame.pack(pady=10)
+
+    create_file_selector(file_frame, "grounding", "Grounding", 0)
+    create_file_selector(file_frame, "inbound", "Inbound", 1)
+    create_file_selector(file_frame, "export", "Export", 2)
+    create_file_selector(file_frame, "cancel", "Cancel", 3)
+    create_file_selector(file_frame, "transfer", "Transfer", 4)
+    create_file_selector(file_frame, "history", "History", 5)
+
+    refresh_button = tk.Button(
+        checker_frame,
+        text=TEXT[language]["refresh_button"],
+        font=("Arial", 10, "bold"),
+        bg="#007ACC",
+        fg="white",
+        width=25,
+        command=auto_load_files
+    )
+    refresh_button.pack(pady=5)
+
+    cache_frame = tk.Frame(checker_frame)
+    cache_frame.pack(pady=2)
+
+    use_cache_var = tk.BooleanVar(value=True)
+    use_cache_check = tk.Checkbutton(cache_frame, text=TEXT[language]["use_cache"], variable=use_cache_var)
+    use_cache_check.grid(row=0, column=0, padx=5)
+
+    clear_cache_button = tk.Button(cache_frame, text=TEXT[language]["clear_cache_button"], command=clear_source_cache)
+    clear_cache_button.grid(row=0, column=1, padx=5)
+
+    profile_var = tk.BooleanVar(value=False)
+    profile_check = tk.Checkbutton(cache_frame, text=TEXT[language]["profile_next"], variable=profile_var)
+    profile_check.grid(row=0, column=2, padx=5)
+
+    run_button = tk.Button(
+        checker_frame,
+        text=TEXT[language]["run_button"],
+        font=("Arial", 12, "bold"),
+        bg="green",
+        fg="white",
+        width=25,
+        command=run_check
+    )
+    run_button.pack(pady=10)
+
+    progress_frame = tk.Frame(checker_frame)
+    progress_frame.pack(pady=5)
+
+    progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=300, mode="determinate")
+    progress_bar.grid(row=0, column=0, padx=5)
+
+    cancel_button = tk.Button(
+        progress_frame,
+        text=TEXT[language]["cancel_button"],
+        state="disabled",
+        command=cancel_check
+    )
+    cancel_button.grid(row=0, column=1, padx=5)
+
+    status_var = tk.StringVar(value=TEXT[language]["status_idle"])
+    status_label = tk.Label(checker_frame, textvariable=status_var, fg="gray", font=("Arial", 9))
+    status_label.pack(pady=2)
+
+    run_details_button = tk.Button(checker_frame, relief="flat", fg="gray", command=toggle_run_details)
+    run_details_button.pack(pady=2)
+
+    # Packed by toggle_run_details.
+    run_details_frame = tk.Frame(checker_frame)
+    run_details_tree = ttk.Treeview(run_details_frame, columns=RUN_DETAIL_COLUMNS, show="headings", height=8,
+                                    displaycolumns=["stage", *STAGE_FIELDS, "status"])
+    for column in RUN_DETAIL_COLUMNS:
+        run_details_tree.column(column, width=200 if column in ("stage", "status") else 70,
+                                anchor="w" if column in ("stage", "status") else "e")
+    run_details_tree.pack(fill="x")
+    run_log_var = tk.StringVar(value="")
+    tk.Label(run_details_frame, textvariable=run_log_var, fg="gray", font=("Arial", 8)).pack(anchor="w")
+    refresh_run_details_header()
+
+    home_title_label = tk.Label(home_frame, text=TEXT[language]["home_title"], font=("Arial", 14, "bold"))
+    home_title_label.pack(pady=10)
+
+    home_top_frame = tk.Frame(home_frame)
+    home_top_frame.pack(pady=5, fill="x", padx=20)
+
+    date_label = tk.Label(home_top_frame, text=TEXT[language]["home_date"])
+    date_label.grid(row=0, column=0, sticky="w", padx=5, pady=2)
+    date_entry = tk.Entry(home_top_frame, width=15)
+    date_entry.grid(row=0, column=1, padx=5, pady=2)
+    date_entry.insert(0, datetime.date.today().strftime("%Y-%m-%d"))
+
+    source_label = tk.Label(home_top_frame, text=TEXT[language]["home_source"])
+    source_label.grid(row=0, column=2, sticky="w", padx=5, pady=2)
+    source_combo = ttk.Combobox(
+        home_top_frame,
+        values=["Inbound", "Value-Add", "Transfer", "Cancel"],
+        state="readonly",
+        width=15
+    )
+    source_combo.grid(row=0, column=3, padx=5, pady=2)
+    source_combo.set("Inbound")
+    source_combo.bind("<<ComboboxSelected>>", on_source_change)
+
+    count_label = tk.Label(home_top_frame, text=TEXT[language]["home_count"])
+    count_label.grid(row=0, column=4, sticky="w", padx=5, pady=2)
+    count_entry = tk.Entry(home_top_frame, width=10)
+    count_entry.grid(row=0, column=5, padx=5, pady=2)
+
+    total_upc_label = tk.Label(home_top_frame, text=TEXT[language]["home_total_upc"])
+    total_upc_label.grid(row=0, column=6, sticky="w", padx=5, pady=2)
+    total_upc_entry = tk.Entry(home_top_frame, width=10)
+    total_upc_entry.grid(row=0, column=7, padx=5, pady=2)
+
+    add_record_button = tk.Button(home_top_frame, text=TEXT[language]["home_add"], command=add_stats_record)
+    add_record_button.grid(row=0, column=8, padx=10, pady=2)
+
+    stats_hint_label = tk.Label(home_frame, text=TEXT[language]["stats_auto_hint"], fg="gray", font=("Arial", 9))
+    stats_hint_label.pack(anchor="w", padx=20, pady=2)
+
+    stats_tree_frame = tk.Frame(home_frame)
+    stats_tree_frame.pack(padx=20, pady=10, fill="x")
+
+    stats_tree = ttk.Treeview(
+        stats_tree_frame,
+        columns=("date", "source", "mismatch", "total", "rate"),
+        show="headings",
+        height=8
+    )
+    stats_tree.heading("date", text=TEXT[language]["home_date"], command=lambda: sort_stats_by("date"))
+    stats_tree.heading("source", text=TEXT[language]["home_source"], command=lambda: sort_stats_by("source"))
+    stats_tree.heading("mismatch", text=TEXT[language]["home_count"], command=lambda: sort_stats_by("mismatch"))
+    stats_tree.heading("total", text=TEXT[language]["home_total_upc"], command=lambda: sort_stats_by("total"))
+    stats_tree.heading("rate", text="Mismatch Rate", command=lambda: sort_stats_by("rate"))
+    stats_tree.column("date", width=110)
+    stats_tree.column("source", width=110)
+    stats_tree.column("mismatch", width=110)
+    stats_tree.column("total", width=110)
+    stats_tree.column("rate", width=120)
+    stats_scrollbar = ttk.Scrollbar(stats_tree_frame, orient="vertical", command=stats_tree.yview)
+    stats_tree.configure(yscrollcommand=on_stats_scroll)
+    stats_tree.pack(side="left", fill="x", expand=True)
+    stats_scrollbar.pack(side="right", fill="y")
+
+    home_bottom_frame = tk.Frame(home_frame)
+    home_bottom_frame.pack(pady=5, fill="x", padx=20)
+
+    export_stats_button = tk.Button(home_bottom_frame, text=TEXT[language]["home_export"], command=export_stats)
+    export_stats_button.grid(row=0, column=0, padx=5, pady=2)
+
+    start_date_label = tk.Label(home_bottom_frame, text=TEXT[language]["home_start_date"])
+    start_date_label.grid(row=1, column=0, sticky="w", padx=5, pady=2)
+    start_date_entry = tk.Entry(home_bottom_frame, width=15)
+    start_date_entry.grid(row=1, column=1, padx=5, pady=2)
+
+    end_date_label = tk.Label(home_bottom_frame, text=TEXT[language]["home_end_date"])
+    end_date_label.grid(row=1, column=2, sticky="w", padx=5, pady=2)
+    end_date_entry = tk.Entry(home_bottom_frame, width=15)
+    end_date_entry.grid(row=1, column=3, padx=5, pady=2)
+
+    chart_type_label = tk.Label(home_bottom_frame, text=TEXT[language]["home_chart_type"])
+    chart_type_label.grid(row=1, column=4, sticky="w", padx=5, pady=2)
+    chart_type_var = tk.StringVar(value="bar")
+    bar_radio = tk.Radiobutton(home_bottom_frame, text=TEXT[language]["home_chart_bar"],
+                               variable=chart_type_var, value="bar")
+    bar_radio.grid(row=1, column=5, padx=5, pady=2)
+    line_radio = tk.Radiobutton(home_bottom_frame, text=TEXT[language]["home_chart_line"],
+                                variable=chart_type_var, value="line")
+    line_radio.grid(row=1, column=6, padx=5, pady=2)
+
+    chart_button = tk.Button(home_bottom_frame, text=TEXT[language]["home_chart"], command=generate_chart)
+    chart_button.grid(row=1, column=7, padx=10, pady=2)
+
+    resolution_label = tk.Label(home_bottom_frame, text=TEXT[language]["home_resolution"])
+    resolution_label.grid(row=2, column=5, sticky="w", padx=5, pady=2)
+    resolution_combo = ttk.Combobox(home_bottom_frame, values=TEXT[language]["home_resolutions"],
+                                    state="readonly", width=8)
+    resolution_combo.current(0)
+    resolution_combo.grid(row=2, column=6, padx=5, pady=2)
+
+    filter_button = tk.Button(home_bottom_frame, text=TEXT[language]["home_filter"], command=filter_stats_table)
+    filter_button.grid(row=2, column=7, padx=10, pady=2)
+
+    # Source filter checkbuttons for chart (optional)
+    source_filter_label = tk.Label(home_bottom_frame, text="Sources:")
+    source_filter_label.grid(row=2, column=0, sticky="w", padx=5, pady=2)
+
+    source_filter_vars["Inbound"] = tk.BooleanVar(value=True)
+    source_filter_vars["Value-Add"] = tk.BooleanVar(value=True)
+    source_filter_vars["Transfer"] = tk.BooleanVar(value=True)
+    source_filter_vars["Cancel"] = tk.BooleanVar(value=True)
+
+    inbound_cb = tk.Checkbutton(home_bottom_frame, text="Inbound", variable=source_filter_vars["Inbound"])
+    inbound_cb.grid(row=2, column=1, padx=5, pady=2, sticky="w")
+
+    valueadd_cb = tk.Checkbutton(home_bottom_frame, text="Value-Add", variable=source_filter_vars["Value-Add"])
+    valueadd_cb.grid(row=2, column=2, padx=5, pady=2, sticky="w")
+
+    transfer_cb = tk.Checkbutton(home_bottom_frame, text="Transfer", variable=source_filter_vars["Transfer"])
+    transfer_cb.grid(row=2, column=3, padx=5, pady=2, sticky="w")
+
+    cancel_cb = tk.Checkbutton(home_bottom_frame, text="Cancel", variable=source_filter_vars["Cancel"])
+    cancel_cb.grid(row=2, column=4, padx=5, pady=2, sticky="w")
+
+    stats_file_label = tk.Label(home_frame, text=f"{TEXT[language]['stats_file_label']} {TEXT[language]['stats_no_file']}")
+    stats_file_label.pack(anchor="w", padx=20, pady=5)
+
+    chart_frame = tk.Frame(home_frame, height=250)
+    chart_frame.pack(fill="both", expand=True, padx=20, pady=5)
+
+    # Statistics and the auto-matched files are loaded once the window is on screen.
+    startup_profile.mark("window")
+    root.after(0, on_first_paint)
+
     root.mainloop()
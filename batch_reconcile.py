@@ -0,0 +1,235 @@
+import argparse
+import datetime
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from discrepancy_engine import (
+    REPORT_COLUMNS, SOURCE_KEYS, CheckResult, default_cache_dir, find_default_files, get_exe_dir, run_check,
+)
+from discrepancy_rules import RULES_FILENAME, RuleSet, compile_rules, load_rules
+from history_store import ledger_path_for, open_history
+from report_writers import REPORT_FORMATS, write_report
+from source_cache import SourceCache
+from stats_store import open_stats
+
+# Reconcile many day/site folders in one go.
+#
+# Every folder under the root that holds at least one of the default export
+# filenames is one run. Its date is taken from a YYYY-MM-DD / YYYYMMDD part of
+# the path (otherwise the newest file's modification date), and the rest of the
+# relative path names the site, e.g. root/2024-05-01/WH1 or root/WH1/20240501.
+# Runs are checked in a process pool, one folder per task; the results are
+# combined into one report, a per-run source count table and the stats history.
+
+DATE_PATTERN = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+
+# Stats source labels and the report column that marks a UPC as coming from that source.
+STATS_SOURCES = {
+    "Inbound": "Inbound Qty",
+    "Value-Add": "Value-add Qty",
+    "Cancel": "Canceled Qty",
+    "Transfer": "Transfer Qty",
+}
+
+
+@dataclass
+class BatchRun:
+    date: datetime.date
+    site: str
+    folder: str
+    paths: dict[str, str]
+
+
+@dataclass
+class BatchResult:
+    report: pd.DataFrame
+    counts: pd.DataFrame
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+def parse_run_date(parts: list[str]) -> tuple[datetime.date | None, list[str]]:
+    for i, part in enumerate(parts):
+        m = DATE_PATTERN.fullmatch(part)
+        if m:
+            try:
+                return datetime.date(*map(int, m.groups())), parts[:i] + parts[i + 1:]
+            except ValueError:
+                pass
+    return None, parts
+
+
+# Every run folder under root, ordered by date then site.
+def discover_runs(root: str) -> list[BatchRun]:
+    runs = []
+    for folder, _dirs, _files in os.walk(root):
+        paths = {k: p for k, p in find_default_files(folder).items() if k in SOURCE_KEYS}
+        if not paths:
+            continue
+        rel = os.path.relpath(folder, root)
+        parts = [] if rel == "." else rel.split(os.sep)
+        date, site_parts = parse_run_date(parts)
+        if date is None:
+            date = datetime.date.fromtimestamp(max(os.path.getmtime(p) for p in paths.values()))
+        runs.append(BatchRun(date=date, site="/".join(site_parts), folder=folder, paths=paths))
+    return sorted(runs, key=lambda run: (run.date, run.site))
+
+
+# Per-source UPC and discrepancy counts of one checked run, in the stats history's shape.
+# A source's discrepancy count is the number of reported UPCs with a quantity from it.
+def run_counts(result: CheckResult, date: datetime.date, site: str) -> pd.DataFrame:
+    counts = pd.DataFrame({
+        "Date": date,
+        "Site": site,
+        "Source": list(STATS_SOURCES),
+        "MismatchCount": [int((result.today[col] != 0).sum()) for col in STATS_SOURCES.values()],
+        "TotalUPC": [result.source_upc_counts[label] for label in STATS_SOURCES],
+    })
+    counts["Rate"] = (counts["MismatchCount"] / counts["TotalUPC"].where(counts["TotalUPC"] > 0)).fillna(0.0)
+    return counts
+
+
+# Check one folder. Runs inside pool workers, so it must stay a module-level function.
+def reconcile_run(run: BatchRun, rules: RuleSet, cache_dir: str | None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    cache = SourceCache(cache_dir) if cache_dir else None
+    result = run_check(run.paths, workers=1, cache=cache, rules=rules)
+    today = result.today.copy()
+    today.insert(0, "Site", run.site)
+    today.insert(0, "Date", run.date)
+    return today, run_counts(result, run.date, run.site)
+
+
+# Check every run in a process pool. on_done(run, error) is called as each one finishes;
+# a failing folder is recorded in errors and does not stop the batch.
+def run_batch(runs: list[BatchRun], rules: RuleSet | None = None, workers: int | None = None,
+              cache_dir: str | None = None, on_done=None) -> BatchResult:
+    rules = rules or compile_rules()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(runs) or 1))
+    outputs = {}
+    errors = {}
+
+    def finish(run, output=None, error=None):
+        if error is None:
+            outputs[run.folder] = output
+        else:
+            errors[run.folder] = error
+        if on_done is not None:
+            on_done(run, error)
+
+    if workers == 1:
+        for run in runs:
+            try:
+                finish(run, reconcile_run(run, rules, cache_dir))
+            except Exception as e:
+                finish(run, error=str(e))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(reconcile_run, run, rules, cache_dir): run for run in runs}
+            for future in as_completed(futures):
+                try:
+                    finish(futures[future], future.result())
+                except Exception as e:
+                    finish(futures[future], error=str(e))
+
+    done = [outputs[run.folder] for run in runs if run.folder in outputs]
+    report = pd.concat([today for today, _ in done], ignore_index=True) if done else \
+        pd.DataFrame(columns=["Date", "Site", *REPORT_COLUMNS])
+    counts = pd.concat([c for _, c in done], ignore_index=True) if done else \
+        pd.DataFrame(columns=["Date", "Site", "Source", "MismatchCount", "TotalUPC", "Rate"])
+    return BatchResult(report=report, counts=counts, errors=errors)
+
+
+# Ledger of one site, <ledger>_<site>.db next to the given ledger, so warehouses do not
+# share cumulative totals.
+def site_ledger_path(history_path: str, site: str) -> str:
+    ledger = ledger_path_for(history_path)
+    stem, ext = os.path.splitext(ledger)
+    return f"{stem}_{re.sub(r'[^0-9A-Za-z_-]+', '_', site)}{ext}"
+
+
+# Fold each run's discrepancies into its site's cumulative ledger, oldest first. Re-running
+# a batch does not double count: the ledger skips runs it has already applied. Every
+# checked run is applied, also one without discrepancies, so a corrected re-run of a day
+# replaces the earlier version of that day.
+def apply_history(result: BatchResult, history_path: str, rules: RuleSet) -> dict[str, int]:
+    reports = {key: today for key, today in result.report.groupby(["Site", "Date"], sort=False)}
+    empty = pd.DataFrame(columns=REPORT_COLUMNS)
+    unresolved = {}
+    for site, site_counts in result.counts.groupby("Site", sort=True):
+        store = open_history(site_ledger_path(history_path, site) if site else history_path, rules)
+        for date in sorted(site_counts["Date"].unique()):
+            today = reports.get((site, date))
+            store.apply_run(empty if today is None else today[REPORT_COLUMNS], rules, run_date=date, origin="batch")
+        unresolved[site] = len(store.unresolved())
+    return unresolved
+
+
+def record_stats(counts: pd.DataFrame, folder: str) -> int:
+    records = list(counts[["Date", "Site", "Source", "MismatchCount", "TotalUPC", "Rate"]]
+                   .itertuples(index=False, name=None))
+    open_stats(folder).replace_site_records(records)
+    return len(records)
+
+
+def counts_path_for(output: str) -> str:
+    stem, ext = os.path.splitext(output)
+    return f"{stem}_counts{ext}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reconcile every day/site folder under a root folder.")
+    parser.add_argument("root", help="folder containing one sub-folder of exports per day and site")
+    parser.add_argument("-o", "--output", required=True,
+                        help="consolidated report; per-run source counts go to <name>_counts.<ext>")
+    parser.add_argument("--format", choices=REPORT_FORMATS, help="report format (default: from the output extension)")
+    parser.add_argument("--workers", type=int, help="folders checked at once (default: one per CPU)")
+    parser.add_argument("--history", help="cumulative ledger (.db) to fold the runs into, oldest first; "
+                                          "each site gets <name>_<site>.db")
+    parser.add_argument("--stats-dir", help="folder of discrepancy_stats.db (default: next to this program)")
+    parser.add_argument("--no-stats", action="store_true", help="do not write the results to the stats history")
+    parser.add_argument("--cache-dir", help="parsed-source cache folder (default: source_cache next to this program)")
+    parser.add_argument("--no-cache", action="store_true", help="parse every source from scratch")
+    parser.add_argument("--rules", help=f"discrepancy rule config (default: {RULES_FILENAME} next to this program, if present)")
+    args = parser.parse_args(argv)
+
+    runs = discover_runs(args.root)
+    if not runs:
+        print(f"Error: no folders with {', '.join(SOURCE_KEYS)} exports under {args.root}", file=sys.stderr)
+        return 1
+
+    try:
+        rules = load_rules(args.rules or os.path.join(get_exe_dir(), RULES_FILENAME))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    finished = 0
+
+    def on_done(run, error):
+        nonlocal finished
+        finished += 1
+        status = f"failed: {error}" if error else "ok"
+        print(f"[{finished}/{len(runs)}] {run.date} {run.site or '-'} {status}", flush=True)
+
+    cache_dir = None if args.no_cache else (args.cache_dir or default_cache_dir())
+    result = run_batch(runs, rules, args.workers, cache_dir, on_done)
+
+    write_report(result.report, args.output, args.format)
+    write_report(result.counts, counts_path_for(args.output), args.format)
+    print(f"{len(result.report)} discrepancies from {len(runs) - len(result.errors)} runs written to {args.output}")
+
+    if args.history:
+        for site, n in apply_history(result, args.history, rules).items():
+            print(f"{n} unresolved UPCs in the cumulative ledger of {site or args.history}")
+    if not args.no_stats:
+        n = record_stats(result.counts, args.stats_dir or get_exe_dir())
+        print(f"{n} stats records written")
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cancel_parser import parse_cancel_orders  # noqa: E402
+from legacy import legacy_parse_cancel_orders  # noqa: E402
+
+
+# Column 0 of a cancel export: a mix of 3-row (no shelf) and 4-row (shelf code) records.
+def make_cancel_column(n_records: int, shelf_rate: float = 0.5, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    upcs = rng.integers(10**11, 10**12, size=n_records)
+    qty = rng.integers(1, 20, size=n_records)
+    shelves = rng.choice(["CUSTOM0", "A-01-02", "B-07-11"], size=n_records)
+    has_shelf = rng.random(n_records) < shelf_rate
+
+    col0 = []
+    for upc, q, shelf, with_shelf in zip(upcs.tolist(), qty.tolist(), shelves.tolist(), has_shelf.tolist()):
+        col0 += [upc, f"Product {upc}"]
+        if with_shelf:
+            col0.append(shelf)
+        col0.append(q)
+    return col0
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the cancel order state machine with parse_cancel_orders().")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'records':>10} {'rows':>10} {'legacy (s)':>12} {'tokenizer (s)':>14} {'speedup':>9}")
+    for n in args.sizes:
+        col0 = make_cancel_column(n)
+        old, t_old = timed(legacy_parse_cancel_orders, col0)
+        new, t_new = timed(parse_cancel_orders, col0)
+        pd.testing.assert_frame_equal(old, new, check_dtype=False)
+        print(f"{n:>10} {len(col0):>10} {t_old:>12.3f} {t_new:>14.3f} {t_old / t_new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from legacy import legacy_chart_series  # noqa: E402
+from stats_chart import RateChart, chart_series  # noqa: E402
+
+SOURCES = ["Inbound", "Value-Add", "Transfer", "Cancel"]
+
+
+# Stats records for every source on each of n_days consecutive days.
+def make_stats(n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = datetime.date(2020, 1, 1)
+    dates = [start + datetime.timedelta(days=i) for i in range(n_days)]
+    n = n_days * len(SOURCES)
+    total = rng.integers(0, 500, size=n)
+    mismatch = rng.integers(0, 20, size=n)
+    return pd.DataFrame({
+        "Date": np.repeat(np.array(dates, dtype=object), len(SOURCES)),
+        "Source": SOURCES * n_days,
+        "MismatchCount": mismatch,
+        "TotalUPC": total,
+        "Rate": np.where(total > 0, mismatch / np.maximum(total, 1), 0.0),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-date chart loops with chart_series().")
+    parser.add_argument("--days", type=int, nargs="+", default=[365, 365 * 3])
+    args = parser.parse_args()
+
+    print(f"{'days':>6} {'per-date loops (s)':>19} {'pivot (s)':>10} {'redraw (s)':>11} {'monthly redraw (s)':>19}")
+    for n in args.days:
+        df = make_stats(n)
+        start = time.perf_counter()
+        old = legacy_chart_series(df, SOURCES)
+        t_old = time.perf_counter() - start
+        start = time.perf_counter()
+        new = chart_series(df, SOURCES)
+        t_new = time.perf_counter() - start
+        np.testing.assert_allclose(old.to_numpy(), new.to_numpy())
+
+        # Second update of a persistent line chart, the cost of re-charting from the tab.
+        chart = RateChart()
+        chart.update(new, "line")
+        chart.figure.canvas.draw()
+        start = time.perf_counter()
+        chart.update(chart_series(df, SOURCES), "line")
+        chart.figure.canvas.draw()
+        t_draw = time.perf_counter() - start
+        start = time.perf_counter()
+        chart.update(chart_series(df, SOURCES, "month"), "line", "month")
+        chart.figure.canvas.draw()
+        t_month = time.perf_counter() - start
+        print(f"{n:>6} {t_old:>19.3f} {t_new:>10.3f} {t_draw:>11.3f} {t_month:>19.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discrepancy_engine import SOURCE_PARSERS, stream_csv_source  # noqa: E402
+from source_readers import CSV_CHUNK_ROWS, SOURCE_COLUMNS, SOURCE_DTYPES, UPC_COLUMNS  # noqa: E402
+
+# Streaming a large InboundRecordFile.csv(.gz) in chunks against reading it whole and
+# aggregating afterwards: time and peak traced memory of each, and whether the per-UPC
+# summaries agree. Peak memory of the streamed read should follow the number of distinct
+# UPCs, not the number of rows.
+
+
+def write_inbound(path: str, rows: int, upcs: int, extra_columns: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    codes = 10**11 + rng.choice(9 * 10**11, size=upcs, replace=False)
+    written = 0
+    header = True
+    while written < rows:
+        n = min(CSV_CHUNK_ROWS, rows - written)
+        frame = pd.DataFrame({
+            "Inbound No.": np.char.add("IN", np.arange(written, written + n).astype(str)),
+            "UPC": codes[rng.integers(0, upcs, size=n)],
+            "Inbound Qty": rng.integers(1, 10, size=n),
+            **{f"Extra {i}": "x" * 12 for i in range(extra_columns)},
+        })
+        frame.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+        written += n
+
+
+def read_whole(path: str) -> pd.DataFrame:
+    raw = pd.read_csv(path, usecols=SOURCE_COLUMNS["Inbound"],
+                      dtype={UPC_COLUMNS["Inbound"]: str, **SOURCE_DTYPES["Inbound"]})
+    return SOURCE_PARSERS["Inbound"](raw)
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return out, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare streamed and whole-file CSV ingestion.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--upcs", type=int, default=100_000, help="distinct UPCs in the file")
+    parser.add_argument("--extra-columns", type=int, default=10)
+    parser.add_argument("--gzip", action="store_true", help="write and read InboundRecordFile.csv.gz")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'MB on disk':>10} {'whole s':>8} {'whole MB':>9} {'stream s':>9} {'stream MB':>10}  match")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "InboundRecordFile.csv" + (".gz" if args.gzip else ""))
+            write_inbound(path, rows, args.upcs, args.extra_columns)
+            size = os.path.getsize(path) / 2**20
+            whole, whole_s, whole_mb = measure(read_whole, path)
+            (streamed, _), stream_s, stream_mb = measure(stream_csv_source, "Inbound", path)
+        match = whole.sort_values("UPC").reset_index(drop=True).equals(
+            streamed.sort_values("UPC").reset_index(drop=True))
+        print(f"{rows:>10} {size:>10.1f} {whole_s:>8.2f} {whole_mb:>9.1f} {stream_s:>9.2f} {stream_mb:>10.1f}  {match}")
+
+
+if __name__ == "__main__":
+    main()
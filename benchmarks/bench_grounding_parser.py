@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grounding_parser import parse_grounding  # noqa: E402
+from legacy import legacy_parse_grounding  # noqa: E402
+
+
+# Build a sheet in the 3-row block layout, as pd.read_excel would return it.
+def make_grounding_frame(n_products: int, bad_rate: float = 0.01, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    upcs = rng.integers(10**11, 10**12, size=n_products)
+    qty = rng.integers(1, 50, size=n_products).astype(object)
+    qty[rng.random(n_products) < bad_rate] = "N/A"
+
+    rows = np.empty((n_products * 3, 4), dtype=object)
+    rows[0::3, 0] = upcs
+    rows[1::3, 0] = [f"Product {u}" for u in upcs]
+    rows[2::3, 0] = "A-01-01"
+    rows[2::3, 1] = qty
+    rows[2::3, 2] = "operator"
+    rows[2::3, 3] = "2024-01-01 08:00:00"
+    return pd.DataFrame(rows, columns=["UPC", "Grounding Num.", "Operator", "Operation Time"])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the block-walking grounding parser with parse_grounding().")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'products':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_grounding_frame(n)
+        old, t_old = timed(legacy_parse_grounding, df)
+        new, t_new = timed(parse_grounding, df)
+        pd.testing.assert_frame_equal(old, new, check_dtype=False)
+        print(f"{n:>10} {t_old:>12.3f} {t_new:>15.4f} {t_old / t_new:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discrepancy_engine import DEFAULT_FILES  # noqa: E402
+from source_readers import SOURCE_COLUMNS, excel_engine, read_source_columns  # noqa: E402
+
+
+# Write wide tabular exports: the required columns plus filler columns like a real WMS export.
+def make_wide_sources(folder: str, n_rows: int, extra_columns: int, seed: int = 0) -> dict[str, str]:
+    rng = np.random.default_rng(seed)
+    upcs = rng.integers(10**11, 10**11 + n_rows, size=n_rows)
+    filler = {f"Extra {i}": rng.choice(["alpha", "beta", "gamma"], size=n_rows) for i in range(extra_columns)}
+    frames = {
+        "Inbound": {"UPC": upcs, "Inbound Qty": rng.integers(1, 5, size=n_rows)},
+        "Export": {
+            "Outbound SN": np.where(rng.random(n_rows) < 0.5, None, "SN"),
+            "UPC after value-added": upcs,
+            "Value-added Num.": rng.integers(1, 3, size=n_rows),
+        },
+        "Transfer": {"UPC": upcs, "transfer Num.": rng.integers(1, 3, size=n_rows)},
+    }
+    paths = {}
+    for key, cols in frames.items():
+        paths[key] = os.path.join(folder, DEFAULT_FILES[key])
+        pd.DataFrame({**cols, **filler}).to_excel(paths[key], index=False)
+    return paths
+
+
+# Time and peak memory are taken in separate calls because tracemalloc slows Python code down.
+# Peak memory covers Python/numpy allocations; a native reader's internal buffers are not traced.
+def measure(fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-sheet reads with the column-pruned source readers.")
+    parser.add_argument("--input-dir", help="folder with real exports (default: generate wide synthetic files)")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--extra-columns", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.input_dir:
+            paths = {k: os.path.join(args.input_dir, DEFAULT_FILES[k]) for k in SOURCE_COLUMNS}
+            paths = {k: p for k, p in paths.items() if os.path.exists(p)}
+        else:
+            paths = make_wide_sources(tmp, args.rows, args.extra_columns)
+
+        cases = [
+            ("full sheet, openpyxl", lambda key, path: pd.read_excel(path, engine="openpyxl")),
+            ("pruned, openpyxl", lambda key, path: read_source_columns(key, path, engine="openpyxl")),
+            (f"pruned, {excel_engine()}", lambda key, path: read_source_columns(key, path)),
+        ]
+        print(f"{'source':>9} {'reader':>22} {'time (s)':>9} {'peak MB':>8}")
+        for key, path in paths.items():
+            for label, fn in cases:
+                elapsed, peak = measure(lambda: fn(key, path))
+                print(f"{key:>9} {label:>22} {elapsed:>9.2f} {peak:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discrepancy_engine import (  # noqa: E402
+    DEFAULT_RULESET, QTY_COLUMNS, SOURCE_KEYS, SOURCE_PARSERS, classify, merge_sources,
+)
+from frame_schema import compact_summary, memory_report, text_dtype  # noqa: E402
+from history_store import HistoryStore  # noqa: E402
+from synthetic_data import generate_sources  # noqa: E402
+
+# Memory footprint of the merged frame, today's report and the cumulative ledger frame,
+# in the pipeline's compact column types against the Python str / int64 columns it
+# used before. Built from synthetic data, so any size can be tried.
+
+
+def build_frames(n_upcs: int, duplication: float, discrepancy_rate: float, seed: int) -> dict[str, pd.DataFrame]:
+    sources = generate_sources(n_upcs, duplication, discrepancy_rate, seed=seed)
+    summaries = {key: compact_summary(SOURCE_PARSERS[key](sources.sheets[key]), QTY_COLUMNS[key])
+                 for key in SOURCE_KEYS}
+    merged = merge_sources(summaries)
+    report = classify(merged.copy(), DEFAULT_RULESET)
+    with tempfile.TemporaryDirectory() as tmp:
+        cumulative = HistoryStore(os.path.join(tmp, "ledger.db")).apply_run(report, DEFAULT_RULESET)
+    return {"merged": merged, "report": report, "cumulative": cumulative}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of the pipeline frames before/after compact types.")
+    parser.add_argument("--upcs", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--duplication", type=float, default=1.5)
+    parser.add_argument("--discrepancy-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--columns", action="store_true", help="show every column, not only the totals")
+    args = parser.parse_args()
+
+    print(f"pandas {pd.__version__}, text columns: {text_dtype() or 'Python str (pyarrow not installed)'}")
+    pd.set_option("display.width", 120)
+    for n in args.upcs:
+        report = memory_report(build_frames(n, args.duplication, args.discrepancy_rate, args.seed))
+        if not args.columns:
+            report = report[report["Column"] == "total"]
+        print(f"\n{n} UPCs")
+        print(report.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
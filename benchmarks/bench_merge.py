@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discrepancy_engine import QTY_COLUMNS, merge_sources  # noqa: E402
+from legacy import legacy_merge_sources  # noqa: E402
+
+
+# Per-source summaries over a shared UPC universe, each covering a random subset.
+def make_summaries(n_upcs: int, coverage: float = 0.6, seed: int = 0) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    universe = np.array([str(u) for u in rng.choice(10**12, size=n_upcs, replace=False)], dtype=object)
+    summaries = {}
+    for key, col in QTY_COLUMNS.items():
+        upcs = universe[rng.random(n_upcs) < coverage]
+        summaries[key] = pd.DataFrame({"UPC": upcs, col: rng.integers(1, 10, size=len(upcs))})
+    summaries["Grounding"]["Product Name"] = "Product " + summaries["Grounding"]["UPC"]
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the chained left-merges with merge_sources().")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'UPCs':>10} {'chained merges (s)':>19} {'single pass (s)':>16} {'speedup':>8}")
+    for n in args.sizes:
+        s = make_summaries(n)
+        grounding = s["Grounding"]
+        start = time.perf_counter()
+        old = legacy_merge_sources(grounding[["UPC", "Grounding Qty"]], s["Inbound"], s["Export"], s["Cancel"],
+                                   s["Transfer"], grounding[["UPC", "Product Name"]])
+        t_old = time.perf_counter() - start
+        start = time.perf_counter()
+        new = merge_sources(s)
+        t_new = time.perf_counter() - start
+
+        old = old.sort_values("UPC").reset_index(drop=True)
+        new = new.sort_values("UPC").reset_index(drop=True)[old.columns]
+        pd.testing.assert_frame_equal(old, new, check_dtype=False)
+        print(f"{n:>10} {t_old:>19.3f} {t_new:>16.3f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
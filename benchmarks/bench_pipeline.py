@@ -0,0 +1,186 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discrepancy_engine import (  # noqa: E402
+    DEFAULT_RULESET, SOURCE_KEYS, SOURCE_PARSERS, classify, find_default_files, load_source, merge_sources,
+)
+from history_store import HistoryStore  # noqa: E402
+from legacy import legacy_run  # noqa: E402
+from report_writers import write_report  # noqa: E402
+from synthetic_data import XLSX_MAX_ROWS, generate_sources, write_sources  # noqa: E402
+
+# End-to-end benchmark on synthetic data: times (and optionally memory-profiles) every
+# pipeline stage, checks the report against the original implementation (legacy_run on
+# the generated sheets, up to --legacy-max-upcs) and the generator's expected discrepancies,
+# and appends the results to a JSON-lines file, comparing with the last run of the same
+# configuration so regressions show up between versions.
+#
+# "files" mode writes real xlsx exports and loads them as the app does. Sizes that do
+# not fit in an Excel sheet run in "memory" mode, which parses the generated sheets
+# directly (everything except the file read).
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl")
+# A stage is flagged when it is this much slower than the previous run (and not trivially fast).
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_SECONDS = 0.05
+# The row-by-row legacy pipeline takes ~20 s at 100k UPCs.
+LEGACY_MAX_UPCS = 100_000
+
+
+def load_from_memory(key: str, sheet: pd.DataFrame) -> pd.DataFrame:
+    summary = SOURCE_PARSERS[key](sheet)
+    summary["UPC"] = summary["UPC"].astype(str)
+    return summary
+
+
+def run_stages(sources, paths, workdir: str, trace: bool) -> tuple[pd.DataFrame, dict]:
+    stages = {}
+
+    def stage(name, fn, *args):
+        if trace:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        out = fn(*args)
+        stages[name] = {"seconds": time.perf_counter() - start}
+        if trace:
+            stages[name]["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        return out
+
+    if paths is not None:
+        summaries = {key: stage(f"load:{key}", load_source, key, paths[key]) for key in SOURCE_KEYS}
+    else:
+        summaries = {key: stage(f"parse:{key}", load_from_memory, key, sources.sheets[key]) for key in SOURCE_KEYS}
+    merged = stage("merge", merge_sources, summaries)
+    report = stage("classify", classify, merged, DEFAULT_RULESET)
+
+    ledger = HistoryStore(tempfile.mktemp(suffix=".db", dir=workdir))
+    stage("history", ledger.apply_run, report, DEFAULT_RULESET)
+    stage("export", write_report, report, os.path.join(workdir, "report.csv"))
+    return report, stages
+
+
+def sorted_report(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values("UPC").reset_index(drop=True).astype(str)
+
+
+def report_digest(df: pd.DataFrame) -> str:
+    return hashlib.sha1(sorted_report(df).to_csv(index=False).encode("utf-8")).hexdigest()
+
+
+def code_version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_result(path: str, config: dict) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["config"] == config:
+                last = record
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic data and record the results.")
+    parser.add_argument("--upcs", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--duplication", type=float, default=1.5)
+    parser.add_argument("--discrepancy-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=["auto", "files", "memory"], default="auto",
+                        help="auto: files when the sheets fit in Excel, otherwise memory")
+    parser.add_argument("--memory", action="store_true", help="also trace peak memory per stage (slower)")
+    parser.add_argument("--legacy-max-upcs", type=int, default=LEGACY_MAX_UPCS,
+                        help=f"largest size also checked against the original pipeline (default {LEGACY_MAX_UPCS})")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSON-lines file the results are appended to")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    version = code_version()
+    for n in args.upcs:
+        sources = generate_sources(n, args.duplication, args.discrepancy_rate, seed=args.seed)
+        fits = all(len(sheet) + 1 <= XLSX_MAX_ROWS for sheet in sources.sheets.values())
+        mode = ("files" if fits else "memory") if args.mode == "auto" else args.mode
+        config = {"upcs": n, "duplication": args.duplication, "discrepancy_rate": args.discrepancy_rate,
+                  "seed": args.seed, "mode": mode}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = None
+            if mode == "files":
+                write_sources(sources, tmp)
+                paths = find_default_files(tmp)
+            report, stages = run_stages(sources, paths, tmp, trace=False)
+            if args.memory:
+                tracemalloc.start()
+                _, traced = run_stages(sources, paths, tmp, trace=True)
+                tracemalloc.stop()
+                for name, result in traced.items():
+                    stages[name]["peak_mb"] = result["peak_mb"]
+
+        matches = sorted_report(report).equals(sorted_report(sources.expected_report()))
+        matches_legacy = None
+        if n <= args.legacy_max_upcs:
+            matches_legacy = sorted_report(report).equals(sorted_report(legacy_run(sources.sheets)))
+        record = {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "version": version,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "config": config,
+            "rows": {key: len(sheet) for key, sheet in sources.sheets.items()},
+            "stages": stages,
+            "total_seconds": sum(s["seconds"] for s in stages.values()),
+            "discrepancies": len(report),
+            "digest": report_digest(report),
+            "matches_expected": matches,
+            "matches_legacy": matches_legacy,
+        }
+        previous = previous_result(args.results, config)
+
+        print(f"\n{n} UPCs ({mode}), {record['discrepancies']} discrepancies, "
+              f"{'matches' if matches else 'DOES NOT MATCH'} the expected report"
+              + ("" if matches_legacy is None else
+                 f", {'matches' if matches_legacy else 'DOES NOT MATCH'} the original implementation"))
+        print(f"{'stage':>16} {'time (s)':>9} {'peak MB':>8} {'previous':>9} {'ratio':>6}")
+        for name, result in stages.items():
+            peak = f"{result['peak_mb']:.1f}" if "peak_mb" in result else "-"
+            line = f"{name:>16} {result['seconds']:>9.3f} {peak:>8}"
+            before = previous["stages"].get(name) if previous else None
+            if before:
+                ratio = result["seconds"] / max(before["seconds"], 1e-9)
+                flag = ""
+                if ratio > REGRESSION_RATIO and result["seconds"] > REGRESSION_MIN_SECONDS:
+                    flag = "  REGRESSION"
+                line += f" {before['seconds']:>9.3f} {ratio:>5.2f}x{flag}"
+            print(line)
+        print(f"{'total':>16} {record['total_seconds']:>9.3f}")
+        if previous:
+            print(f"Compared with {previous['version']} ({previous['time']})"
+                  + ("" if previous["digest"] == record["digest"] else "; the report output CHANGED"))
+
+        if not args.no_save:
+            with open(args.results, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
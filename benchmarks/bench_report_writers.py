@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discrepancy_engine import REPORT_COLUMNS  # noqa: E402
+from report_writers import parquet_engine, write_csv, write_parquet, write_xlsx  # noqa: E402
+
+
+# A discrepancy report with n_rows UPCs, shaped like the cumulative history output.
+def make_report(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    upcs = rng.choice(10**12, size=n_rows, replace=False).astype(str).astype(object)
+    df = pd.DataFrame({"UPC": upcs, "Product Name": "Product " + pd.Series(upcs)})
+    for col in REPORT_COLUMNS[2:-1]:
+        df[col] = rng.integers(0, 50, size=n_rows)
+    df["Issue"] = rng.choice(["Missing Inbound", "Missing Grounding", "Quantity Mismatch"], size=n_rows)
+    return df[REPORT_COLUMNS]
+
+
+# Time and peak memory are taken in separate calls because tracemalloc slows Python code down.
+def measure(fn, with_memory: bool):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    if not with_memory:
+        return elapsed, float("nan")
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pandas' to_excel/to_csv with the streaming report writers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slow) traced peak-memory pass")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'writer':>26} {'time (s)':>9} {'peak MB':>8} {'file MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            df = make_report(n)
+            cases = [
+                ("pandas to_excel", "xlsx", lambda p: df.to_excel(p, index=False)),
+                ("write_xlsx (streaming)", "xlsx", lambda p: write_xlsx(df, p)),
+                ("pandas to_csv", "csv", lambda p: df.to_csv(p, index=False, encoding="utf-8-sig")),
+                ("write_csv (chunked)", "csv", lambda p: write_csv(df, p)),
+            ]
+            if parquet_engine() is not None:
+                cases.append(("write_parquet", "parquet", lambda p: write_parquet(df, p)))
+            for label, ext, fn in cases:
+                path = os.path.join(tmp, f"report.{ext}")
+                elapsed, peak = measure(lambda: fn(path), not args.no_memory)
+                size = os.path.getsize(path) / 2**20
+                print(f"{n:>9} {label:>26} {elapsed:>9.2f} {peak:>8.1f} {size:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
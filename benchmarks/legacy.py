@@ -0,0 +1,162 @@
+import pandas as pd
+
+# Reference copies of the original row-walking parsers from run_check().
+# Benchmarks time the new code against these and check that the output matches.
+
+
+def legacy_parse_grounding(grounding_df: pd.DataFrame) -> pd.DataFrame:
+    records = []
+    for i in range(0, len(grounding_df), 3):
+        group = grounding_df.iloc[i:i + 3]
+        if len(group) == 3:
+            upc = str(group.iloc[0, 0])
+            product_name = str(group.iloc[1, 0])
+            grounding_num = group.iloc[2, 1]
+            try:
+                grounding_num = int(float(grounding_num))
+            except Exception:
+                grounding_num = 0
+            records.append({
+                "UPC": upc,
+                "Product Name": product_name,
+                "Grounding Qty": grounding_num
+            })
+    return pd.DataFrame(records)
+
+
+def legacy_parse_cancel_orders(col0: list) -> pd.DataFrame:
+    cancel_records = []
+    i = 0
+    while i < len(col0):
+        upc = str(col0[i]).strip()
+        if i + 1 >= len(col0):
+            break
+        product_name = str(col0[i + 1]).strip()
+        if i + 2 >= len(col0):
+            break
+        next_line = str(col0[i + 2]).strip()
+        if next_line.isnumeric():
+            shelf_code = None
+            canceled_qty = int(float(next_line))
+            i += 3
+        else:
+            shelf_code = next_line
+            if i + 3 < len(col0):
+                canceled_qty_str = str(col0[i + 3]).strip()
+                try:
+                    canceled_qty = int(float(canceled_qty_str))
+                except Exception:
+                    canceled_qty = 0
+            else:
+                canceled_qty = 0
+            i += 4
+        cancel_records.append({
+            "UPC": upc,
+            "Product Name": product_name,
+            "Shelf Code": shelf_code,
+            "Canceled Qty": canceled_qty
+        })
+    return pd.DataFrame(cancel_records)
+
+
+def legacy_merge_sources(grounding_summary, inbound_summary, valueadd_summary, cancel_summary,
+                         transfer_summary, df_final_grounding) -> pd.DataFrame:
+    all_upcs = set()
+    for df in [grounding_summary, inbound_summary, valueadd_summary, cancel_summary, transfer_summary]:
+        if not df.empty:
+            all_upcs.update(df["UPC"].unique())
+
+    merged = pd.DataFrame({"UPC": list(all_upcs)})
+    merged = merged.merge(grounding_summary, on="UPC", how="left")
+    merged = merged.merge(inbound_summary, on="UPC", how="left")
+    merged = merged.merge(valueadd_summary, on="UPC", how="left")
+    merged = merged.merge(cancel_summary, on="UPC", how="left")
+    merged = merged.merge(transfer_summary, on="UPC", how="left")
+
+    for col in ["Grounding Qty", "Inbound Qty", "Value-add Qty", "Canceled Qty", "Transfer Qty"]:
+        if col in merged.columns:
+            merged[col] = merged[col].fillna(0).astype(int)
+        else:
+            merged[col] = 0
+
+    merged["Total Inbound Qty"] = (
+        merged["Inbound Qty"]
+        + merged["Value-add Qty"]
+        + merged["Canceled Qty"]
+        + merged["Transfer Qty"]
+    )
+
+    if not df_final_grounding.empty:
+        product_map = df_final_grounding[["UPC", "Product Name"]].drop_duplicates("UPC")
+    else:
+        product_map = pd.DataFrame(columns=["UPC", "Product Name"])
+    return merged.merge(product_map, on="UPC", how="left")
+
+
+def legacy_chart_series(df_plot: pd.DataFrame, selected_sources: list) -> pd.DataFrame:
+    grouped = df_plot.groupby(["Date", "Source"], as_index=False).agg({
+        "MismatchCount": "sum",
+        "TotalUPC": "sum"
+    })
+    grouped["Rate"] = grouped.apply(
+        lambda r: (r["MismatchCount"] / r["TotalUPC"]) if r["TotalUPC"] > 0 else 0.0,
+        axis=1
+    )
+    dates = sorted(grouped["Date"].unique())
+
+    series = {}
+    for src in selected_sources:
+        df_src = grouped[grouped["Source"] == src]
+        y_vals = []
+        for d in dates:
+            row = df_src[df_src["Date"] == d]
+            if not row.empty:
+                y_vals.append(float(row["Rate"].iloc[0]))
+            else:
+                y_vals.append(0.0)
+        series[src] = y_vals
+    return pd.DataFrame(series, index=pd.to_datetime(pd.Series(dates)))
+
+
+def legacy_check_issue(row):
+    if row["Total Inbound Qty"] == 0 and row["Grounding Qty"] > 0:
+        return "Missing Inbound"
+    if row["Grounding Qty"] == 0 and row["Total Inbound Qty"] > 0:
+        return "Missing Grounding"
+    if row["Total Inbound Qty"] != row["Grounding Qty"]:
+        return "Quantity Mismatch"
+    return None
+
+
+# The original run_check() from parsing to classification, on sheets as pd.read_excel
+# returns them (Cancel Order without a header row). Returns today's report.
+def legacy_run(sheets: dict) -> pd.DataFrame:
+    df_final_grounding = legacy_parse_grounding(sheets["Grounding"])
+    grounding_summary = df_final_grounding.groupby("UPC", as_index=False)["Grounding Qty"].sum()
+
+    inbound_summary = sheets["Inbound"].groupby("UPC", as_index=False)["Inbound Qty"].sum()
+
+    export_df_raw = sheets["Export"]
+    valueadd_df = export_df_raw[export_df_raw["Outbound SN"].isna()]
+    valueadd_summary = valueadd_df.groupby("UPC after value-added", as_index=False)["Value-added Num."].sum()
+    valueadd_summary.rename(columns={"UPC after value-added": "UPC", "Value-added Num.": "Value-add Qty"},
+                            inplace=True)
+
+    cancel_df = legacy_parse_cancel_orders(sheets["Cancel"].iloc[1:].reset_index(drop=True)[0].tolist())
+    cancel_df = cancel_df[(cancel_df["Shelf Code"].isna()) | (cancel_df["Shelf Code"] == "CUSTOM0")]
+    cancel_summary = cancel_df.groupby("UPC", as_index=False)["Canceled Qty"].sum()
+
+    transfer_summary = sheets["Transfer"].groupby("UPC", as_index=False)["transfer Num."].sum()
+    transfer_summary.rename(columns={"transfer Num.": "Transfer Qty"}, inplace=True)
+
+    for df in [grounding_summary, inbound_summary, valueadd_summary, cancel_summary, transfer_summary]:
+        if not df.empty:
+            df["UPC"] = df["UPC"].astype(str)
+
+    merged = legacy_merge_sources(grounding_summary, inbound_summary, valueadd_summary, cancel_summary,
+                                  transfer_summary, df_final_grounding)
+    merged["Issue"] = merged.apply(legacy_check_issue, axis=1)
+    return merged[merged["Issue"].notna()][[
+        "UPC", "Product Name", "Inbound Qty", "Value-add Qty", "Canceled Qty", "Transfer Qty",
+        "Total Inbound Qty", "Grounding Qty", "Issue",
+    ]]
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from grounding_parser import to_quantity
+from source_readers import read_excel
+
+# Cancel Order.xlsx stores each record in column 0 as either
+#   UPC / product name / canceled qty                 (3 rows, no shelf code)
+#   UPC / product name / shelf code / canceled qty    (4 rows)
+# A record is 3 rows long when its third cell is numeric.
+COLUMNS = ["UPC", "Product Name", "Shelf Code", "Canceled Qty"]
+
+# Only cancels that were not put back on a real shelf count towards inbound.
+COUNTED_SHELF_CODE = "CUSTOM0"
+
+
+# Strip every cell and flag the numeric ones in one vectorized pass.
+def classify_cells(values) -> tuple[np.ndarray, np.ndarray]:
+    cells = np.fromiter(map(str.strip, map(str, values)), dtype=object, count=len(values))
+    is_numeric = np.fromiter(map(str.isnumeric, cells), dtype=bool, count=len(cells))
+    return cells, is_numeric
+
+
+# Walk the record boundaries: every record starts 3 or 4 rows after the previous one.
+# Incomplete records at the end of the column are dropped.
+def record_starts(is_numeric: np.ndarray) -> np.ndarray:
+    n = len(is_numeric)
+    if n < 3:
+        return np.empty(0, dtype=np.int64)
+    steps = (4 - is_numeric[2:]).tolist()
+    starts = []
+    append = starts.append
+    i = 0
+    last = n - 3
+    while i <= last:
+        append(i)
+        i += steps[i]
+    return np.asarray(starts, dtype=np.int64)
+
+
+# Number of leading cells covered by complete records. A record whose quantity cell is not
+# there yet (the file is still growing) and fewer than 3 trailing cells are left out.
+def complete_records_end(values) -> int:
+    _, is_numeric = classify_cells(values)
+    starts = record_starts(is_numeric)
+    ends = starts + 4 - is_numeric[starts + 2]
+    ends = ends[ends <= len(values)]
+    return int(ends[-1]) if len(ends) else 0
+
+
+def parse_cancel_orders(values) -> pd.DataFrame:
+    cells, is_numeric = classify_cells(values)
+    starts = record_starts(is_numeric)
+    if len(starts) == 0:
+        return pd.DataFrame(columns=COLUMNS)
+
+    third = cells[starts + 2]
+    no_shelf = is_numeric[starts + 2]
+
+    # 4-row records read their quantity from the next cell (0 when the file ends early).
+    qty_pos = np.minimum(starts + 3, len(cells) - 1)
+    qty_cells = np.where(no_shelf, third, cells[qty_pos])
+    qty_cells[~no_shelf & (starts + 3 >= len(cells))] = None
+
+    return pd.DataFrame({
+        "UPC": cells[starts],
+        "Product Name": cells[starts + 1],
+        "Shelf Code": np.where(no_shelf, None, third),
+        "Canceled Qty": to_quantity(qty_cells).to_numpy(),
+    }, columns=COLUMNS)
+
+
+def filter_counted_shelves(cancel_df: pd.DataFrame) -> pd.DataFrame:
+    return cancel_df[cancel_df["Shelf Code"].isna() | (cancel_df["Shelf Code"] == COUNTED_SHELF_CODE)]
+
+
+# Records of the sheet as read with header=None; the first cell is the headline.
+def parse_cancel_sheet(raw: pd.DataFrame) -> pd.DataFrame:
+    return parse_cancel_orders(raw.iloc[1:, 0].to_numpy(dtype=object))
+
+
+def read_cancel_orders(path: str) -> pd.DataFrame:
+    return parse_cancel_sheet(read_excel(path, header=None))
@@ -0,0 +1,440 @@
+import argparse
+import gzip
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from cancel_parser import complete_records_end, parse_cancel_orders
+from discrepancy_engine import (
+    DEFAULT_FILES, QTY_COLUMNS, REPORT_COLUMNS, SOURCE_KEYS, SOURCE_PARSERS, SOURCE_READERS, CheckResult,
+    count_source_upcs, empty_summary, find_default_files, get_exe_dir, merge_sources, sort_like_excel,
+    summarize_cancel,
+)
+from discrepancy_rules import RULES_FILENAME, RuleSet, compile_rules, load_rules
+from frame_schema import REPORT_QTY_COLUMNS, compact_issue, compact_summary, frame_mb
+from grounding_parser import BLOCK_SIZE
+from report_writers import REPORT_FORMATS, write_report
+from run_metrics import RunMetrics, format_stages, run_log_path, stage_label
+from source_cache import CACHE_VERSION
+from source_readers import CSV_SOURCES, UPC_COLUMNS, is_csv, read_csv_rows
+
+# Incremental (delta) re-check of exports that grow during the day.
+#
+# A state file next to the report keeps, per source, how far the file was consumed
+# (data rows and a byte offset for CSV; sheet rows up to the last complete 3-row
+# grounding block or 3/4-row cancel record for xlsx) and the per-UPC totals of those
+# rows. The next run only parses what was appended since, folds it into the totals,
+# merges the sources again (one vectorized pass over the UPCs, not the rows) and
+# reclassifies only the UPCs whose quantities changed.
+#
+# CSV exports are read from the stored offset, so a re-check reads only the new bytes
+# (.csv.gz is decompressed up to the offset but not parsed). An xlsx file is zipped XML
+# that cannot be read from the middle: it is still read whole, but only its new rows
+# are parsed and aggregated. Files whose size and mtime are unchanged are not opened.
+#
+# A source is read again from row 0 when its file was truncated or rewritten: fewer
+# rows than consumed, another path, or a different fingerprint of the header and of
+# the first and last consumed rows (the bytes before the offset for CSV). A trailing
+# line or record that is not complete yet counts in the report, as in a full check,
+# but is not committed, so it is parsed again once the rest of it arrives.
+#
+# Like watch mode, a delta check does not update the cumulative ledger.
+
+# Bump when the state layout changes; CACHE_VERSION covers the parsers.
+STATE_VERSION = 1
+# Sheet rows fingerprinted at each end of the consumed part.
+FINGERPRINT_ROWS = 32
+# CSV bytes fingerprinted before the consumed offset.
+FINGERPRINT_BYTES = 64 * 1024
+# New CSV lines are parsed in blocks of about this size.
+CSV_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+@dataclass
+class SourceState:
+    path: str
+    # (size, mtime_ns) when the file was last read.
+    stat: tuple[int, int]
+    # Data rows for CSV; sheet rows up to the end of the last complete record for xlsx.
+    consumed: int
+    fingerprint: str
+    # Per-UPC totals of the consumed rows, in the order a full parse produces.
+    summary: pd.DataFrame
+    # CSV only: bytes up to the end of the last consumed line (decompressed for .csv.gz).
+    offset: int = 0
+    # Kind of the inferred UPC column of a tabular xlsx; a change re-keys every UPC.
+    upc_kind: str = ""
+    # Totals of the incomplete trailing line or record, counted but not committed.
+    pending: pd.DataFrame | None = None
+
+
+@dataclass
+class DeltaState:
+    version: tuple = (STATE_VERSION, CACHE_VERSION)
+    rules: tuple | None = None
+    sources: dict[str, SourceState] = field(default_factory=dict)
+    # Merged frame of the last run with its Issue column.
+    merged: pd.DataFrame | None = None
+
+
+def state_path_for(output: str) -> str:
+    return os.path.splitext(output)[0] + "_delta_state.pkl"
+
+
+# The state is pickled as plain dicts and frames, so it loads no matter which module
+# (or the script run as __main__) defined the classes.
+def load_state(path: str) -> DeltaState:
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data["version"] != (STATE_VERSION, CACHE_VERSION):
+            return DeltaState()
+        sources = {key: SourceState(**fields) for key, fields in data["sources"].items()}
+        return DeltaState(rules=data["rules"], sources=sources, merged=data["merged"])
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, KeyError, TypeError, ValueError):
+        # Missing, half-written or from an incompatible version: start over.
+        return DeltaState()
+
+
+def save_state(path: str, state: DeltaState):
+    data = {
+        "version": state.version,
+        "rules": state.rules,
+        "sources": {key: vars(source) for key, source in state.sources.items()},
+        "merged": state.merged,
+    }
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def rules_key(rules: RuleSet) -> tuple:
+    return rules.tolerance, tuple(sorted(rules.source_tolerances.items())), rules.ignore_zero, tuple(rules.labels)
+
+
+def file_stat(path: str) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def digest(*parts: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+# Add a part's per-UPC totals to the running ones; the first product name seen is kept,
+# as in a full parse.
+def fold(key: str, total: pd.DataFrame | None, part: pd.DataFrame | None) -> pd.DataFrame | None:
+    if part is None or part.empty:
+        return total
+    qty = QTY_COLUMNS[key]
+    part = compact_summary(part, qty)
+    if total is None or total.empty:
+        return part
+    combined = pd.concat([total, part], ignore_index=True)
+    if combined[qty].dtype.kind in "iu":
+        combined[qty] = combined[qty].astype(np.int64)
+    agg = {qty: "sum"}
+    if "Product Name" in combined:
+        agg["Product Name"] = "first"
+    return compact_summary(combined.groupby("UPC", as_index=False, sort=False).agg(agg), qty)
+
+
+# Rows in the order a full parse of the file gives: groupby sorts the UPCs as read, i.e.
+# numerically for a numeric xlsx column and as text otherwise (see sort_like_excel for CSV).
+def parse_order(key: str, summary: pd.DataFrame | None, csv: bool, upc_kind: str) -> pd.DataFrame:
+    if summary is None:
+        return empty_summary(key)
+    if summary.empty:
+        return summary
+    if csv:
+        return sort_like_excel(summary)
+    if upc_kind and upc_kind in "iuf":
+        order = pd.to_numeric(summary["UPC"]).sort_values(kind="stable").index
+    else:
+        order = summary["UPC"].sort_values(kind="stable").index
+    return summary.loc[order].reset_index(drop=True)
+
+
+# Totals the report uses: the committed ones plus the pending tail.
+def current_summary(key: str, source: SourceState) -> pd.DataFrame:
+    if source.pending is None or source.pending.empty:
+        return source.summary
+    return parse_order(key, fold(key, source.summary, source.pending), is_csv(source.path), source.upc_kind)
+
+
+def open_csv(path: str):
+    return gzip.open(path, "rb") if path.lower().endswith(".gz") else open(path, "rb")
+
+
+# Header line plus the bytes just before offset.
+def csv_fingerprint(f, header: bytes, offset: int) -> str:
+    start = max(len(header), offset - FINGERPRINT_BYTES)
+    f.seek(start)
+    return digest(header, f.read(offset - start))
+
+
+# End of the last complete record in data, which starts at a record boundary (0 if none).
+# A newline only ends a record outside quotes, i.e. after an even number of quote
+# characters; a quoted field with a newline in it is not cut. Escaped ("") quotes
+# keep the count even.
+def complete_csv_end(data: bytes) -> int:
+    end = data.rfind(b"\n")
+    quotes = data.count(b'"', 0, end) if end >= 0 else 0
+    while end >= 0 and quotes % 2:
+        previous = data.rfind(b"\n", 0, end)
+        quotes -= data.count(b'"', previous + 1, end)
+        end = previous
+    return end + 1
+
+
+def consume_csv(key: str, path: str, previous: SourceState | None,
+                stat: tuple[int, int]) -> tuple[SourceState, int, str]:
+    with open_csv(path) as f:
+        header = f.readline()
+        mode = "new" if previous is None else "rebuild"
+        if (previous is not None and previous.path == path and previous.offset >= len(header)
+                and csv_fingerprint(f, header, previous.offset) == previous.fingerprint):
+            mode = "append"
+        if mode == "append":
+            offset, consumed, total = previous.offset, previous.consumed, previous.summary
+        else:
+            offset, consumed, total = len(header), 0, None
+
+        f.seek(offset)
+        parsed = 0
+        carry = b""
+        while True:
+            data = f.read(CSV_BLOCK_BYTES)
+            if not data:
+                break
+            data = carry + data
+            cut = complete_csv_end(data)
+            carry = data[cut:]
+            if cut:
+                rows = read_csv_rows(key, header, data[:cut])
+                total = fold(key, total, SOURCE_PARSERS[key](rows))
+                offset += cut
+                consumed += len(rows)
+                parsed += len(rows)
+
+        # The last record has no newline yet (or is inside an open quote): it may still be
+        # being written. An unclosed quote cannot be parsed at all until it is finished.
+        pending = None
+        if carry.strip() and carry.count(b'"') % 2 == 0:
+            rows = read_csv_rows(key, header, carry)
+            pending = SOURCE_PARSERS[key](rows)
+            parsed += len(rows)
+        fingerprint = csv_fingerprint(f, header, offset)
+
+    source = SourceState(path, stat, consumed, fingerprint, parse_order(key, total, True, ""),
+                         offset=offset, pending=pending)
+    return source, parsed, mode
+
+
+# Header and the first and last consumed rows of a sheet.
+def sheet_fingerprint(raw: pd.DataFrame, end: int) -> str:
+    rows = pd.concat([raw.iloc[:min(FINGERPRINT_ROWS, end)], raw.iloc[max(0, end - FINGERPRINT_ROWS):end]])
+    hashes = pd.util.hash_pandas_object(rows.astype(str), index=False).to_numpy()
+    return digest("\0".join(map(str, raw.columns)).encode("utf-8"), hashes.tobytes())
+
+
+def consume_sheet(key: str, path: str, previous: SourceState | None,
+                  stat: tuple[int, int]) -> tuple[SourceState, int, str]:
+    raw = SOURCE_READERS[key](path)
+    upc_kind = raw[UPC_COLUMNS[key]].dtype.kind if key in UPC_COLUMNS else ""
+    # Cancel Order.xlsx is read without a header; its first cell is the headline.
+    first = 1 if key == "Cancel" else 0
+    mode = "new" if previous is None else "rebuild"
+    if (previous is not None and previous.path == path and previous.upc_kind == upc_kind
+            and first <= previous.consumed <= len(raw)
+            and sheet_fingerprint(raw, previous.consumed) == previous.fingerprint):
+        mode = "append"
+    start, total = (previous.consumed, previous.summary) if mode == "append" else (first, None)
+
+    tail = raw.iloc[start:]
+    pending = None
+    if key == "Grounding":
+        end = len(tail) // BLOCK_SIZE * BLOCK_SIZE
+        part = SOURCE_PARSERS[key](tail.iloc[:end])
+    elif key == "Cancel":
+        values = tail.iloc[:, 0].to_numpy(dtype=object)
+        end = complete_records_end(values)
+        part = summarize_cancel(parse_cancel_orders(values[:end]))
+        if end < len(values):
+            pending = summarize_cancel(parse_cancel_orders(values[end:]))
+    else:
+        end = len(tail)
+        part = SOURCE_PARSERS[key](tail)
+
+    consumed = start + end
+    source = SourceState(path, stat, consumed, sheet_fingerprint(raw, consumed),
+                         parse_order(key, fold(key, total, part), False, upc_kind), upc_kind=upc_kind, pending=pending)
+    return source, len(tail), mode
+
+
+# New state of one source, the number of rows parsed and how it was read:
+# "unchanged", "append", "rebuild" (truncated or rewritten) or "new".
+def consume(key: str, path: str, previous: SourceState | None) -> tuple[SourceState, int, str]:
+    stat = file_stat(path)
+    if previous is not None and previous.path == path and previous.stat == stat:
+        return previous, 0, "unchanged"
+    if is_csv(path):
+        if key not in CSV_SOURCES:
+            raise ValueError(f"{key} cannot be read from CSV; use the .xlsx export.")
+        return consume_csv(key, path, previous, stat)
+    return consume_sheet(key, path, previous, stat)
+
+
+# Issue of each merged row, carried over from the previous run where none of the UPC's
+# quantities changed. Returns the column and the number of rows classified.
+def reclassify(merged: pd.DataFrame, previous: pd.DataFrame | None, rules: RuleSet) -> tuple[pd.Categorical, int]:
+    changed = np.ones(len(merged), dtype=bool)
+    issue = np.full(len(merged), None, dtype=object)
+    if previous is not None:
+        pos = pd.Index(previous["UPC"]).get_indexer(merged["UPC"])
+        known = pos >= 0
+        changed = ~known
+        for col in REPORT_QTY_COLUMNS:
+            changed[known] |= previous[col].to_numpy()[pos[known]] != merged[col].to_numpy()[known]
+        keep = ~changed
+        issue[keep] = previous["Issue"].to_numpy(dtype=object)[pos[keep]]
+    if changed.any():
+        issue[changed] = rules.classify(merged[changed])
+    return compact_issue(issue, rules.labels), int(changed.sum())
+
+
+def describe(mode: str, rows: int) -> str:
+    if mode == "append":
+        return f"+{rows} rows"
+    if mode == "rebuild":
+        return f"rebuilt, {rows} rows"
+    if mode == "new":
+        return f"{rows} rows"
+    return mode
+
+
+class DeltaChecker:
+    def __init__(self, state_path: str, rules: RuleSet | None = None, rebuild: bool = False):
+        self.state_path = state_path
+        self.rules = rules or compile_rules()
+        self.state = DeltaState() if rebuild else load_state(state_path)
+
+    # Same result as run_check() without history. Stage "delta" records tell how each
+    # source was read; rows_in of "classify" is the number of UPCs reclassified.
+    def run(self, paths: dict[str, str], save_path: str | None = None, fmt: str | None = None,
+            metrics: RunMetrics | None = None, run_log: bool = True) -> CheckResult:
+        selected = {k: paths[k] for k in SOURCE_KEYS if k in paths}
+        if not selected:
+            raise ValueError("Please provide at least one file (Grounding / Inbound / Export / Cancel / Transfer).")
+
+        metrics = metrics or RunMetrics()
+        log_path = run_log_path(save_path) if save_path is not None and run_log else None
+        status = "error"
+        result = None
+        try:
+            result = self._run(selected, save_path, fmt, metrics)
+            status = "ok"
+        finally:
+            metrics.close()
+            if log_path is not None:
+                summary = metrics.summary(status, mode="delta", sources=sorted(selected),
+                                          discrepancies=None if result is None else len(result.report),
+                                          output=save_path)
+                try:
+                    metrics.write_log(log_path, summary)
+                except OSError:
+                    log_path = None
+
+        result.metrics = metrics
+        result.run_log = log_path
+        return result
+
+    def _run(self, selected: dict[str, str], save_path, fmt, metrics: RunMetrics) -> CheckResult:
+        summaries = {key: empty_summary(key) for key in SOURCE_KEYS}
+        sources = {}
+        notes = []
+        for key, path in selected.items():
+            with metrics.stage("delta", key) as record:
+                sources[key], record["rows_in"], record["delta"] = consume(key, path, self.state.sources.get(key))
+                summaries[key] = current_summary(key, sources[key])
+                record["rows_out"] = len(summaries[key])
+            notes.append(f"{key} {describe(record['delta'], record['rows_in'])}")
+
+        with metrics.stage("merge", rows_in=sum(len(df) for df in summaries.values())) as record:
+            counts = count_source_upcs(summaries)
+            merged = merge_sources(summaries)
+            record["rows_out"] = len(merged)
+            record["frame_mb"] = frame_mb(merged)
+        with metrics.stage("classify") as record:
+            rules_id = rules_key(self.rules)
+            previous = self.state.merged if self.state.rules == rules_id else None
+            merged["Issue"], record["rows_in"] = reclassify(merged, previous, self.rules)
+            today = merged[merged["Issue"].notna()][REPORT_COLUMNS]
+            record["rows_out"] = len(today)
+
+        self.state = DeltaState(rules=rules_id, sources=sources, merged=merged)
+        with metrics.stage("state") as record:
+            save_state(self.state_path, self.state)
+            record["bytes"] = os.path.getsize(self.state_path)
+        if save_path is not None:
+            with metrics.stage("export", rows_in=len(today)) as record:
+                write_report(today, save_path, fmt)
+                record["rows_out"] = len(today)
+        return CheckResult(report=today.copy(), today=today, source_upc_counts=counts, cache_report=", ".join(notes))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Re-check growing exports, parsing only the rows added since the last run.")
+    parser.add_argument("--input-dir", help="folder to search for the default export filenames")
+    for key in SOURCE_KEYS:
+        parser.add_argument(f"--{key.lower()}", help=DEFAULT_FILES[key])
+    parser.add_argument("-o", "--output", required=True, help="report file to write")
+    parser.add_argument("--format", choices=REPORT_FORMATS, help="report format (default: from the output extension)")
+    parser.add_argument("--state", help="state file (default: <report name>_delta_state.pkl next to the report)")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the stored state and read every file from the start")
+    parser.add_argument("--rules", help=f"discrepancy rule config (default: {RULES_FILENAME} next to this program, if present)")
+    parser.add_argument("--details", action="store_true", help="print the time, rows and memory of every stage")
+    args = parser.parse_args(argv)
+
+    paths = find_default_files(args.input_dir) if args.input_dir else {}
+    for key in SOURCE_KEYS:
+        value = getattr(args, key.lower())
+        if value:
+            paths[key] = value
+    paths.pop("History", None)
+
+    metrics = RunMetrics()
+    try:
+        rules = load_rules(args.rules or os.path.join(get_exe_dir(), RULES_FILENAME))
+        checker = DeltaChecker(args.state or state_path_for(args.output), rules, rebuild=args.rebuild)
+        result = checker.run(paths, save_path=args.output, fmt=args.format, metrics=metrics)
+    except Exception as e:
+        failed = metrics.failed_stage()
+        print(f"Error{f' in {stage_label(failed)}' if failed else ''}: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{len(result.report)} discrepancies written to {args.output}")
+    print(f"Sources: {result.cache_report}")
+    if args.details:
+        print(format_stages(result.metrics.stages))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,559 @@
+import argparse
+import functools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from cancel_parser import filter_counted_shelves, parse_cancel_sheet
+from discrepancy_rules import RULES_FILENAME, RuleSet, compile_rules, load_rules
+from frame_schema import compact_issue, compact_report, compact_summary, compact_text, frame_mb
+from grounding_parser import parse_grounding
+from history_store import ledger_path_for, open_history
+from report_writers import REPORT_FORMATS, write_report
+from run_metrics import RUN_LOG_FILENAME, RunMetrics, format_stages, profile_base, profiled, run_log_path, stage_label
+from source_cache import CACHE_DIRNAME, SourceCache
+from source_readers import (
+    CSV_CHUNK_ROWS, CSV_SOURCES, CSV_SUFFIXES, SOURCE_COLUMNS, is_csv, read_csv_chunks, read_excel, read_source_columns,
+)
+
+# Headless load -> parse -> merge -> classify -> history -> export pipeline.
+# This module must stay importable without a display: no tkinter, matplotlib or PIL.
+
+SOURCE_KEYS = ["Grounding", "Inbound", "Export", "Cancel", "Transfer"]
+
+DEFAULT_FILES = {
+    "Grounding": "Grounding.xlsx",
+    "Inbound": "InboundRecordFile.xlsx",
+    "Export": "ExportCustomRecordsFile.xlsx",
+    "Cancel": "Cancel Order.xlsx",
+    "Transfer": "Transfer Order.xlsx",
+    "History": "historical.xlsx",
+}
+
+# Quantity column each source contributes to the merged frame.
+QTY_COLUMNS = {
+    "Grounding": "Grounding Qty",
+    "Inbound": "Inbound Qty",
+    "Export": "Value-add Qty",
+    "Cancel": "Canceled Qty",
+    "Transfer": "Transfer Qty",
+}
+
+REPORT_COLUMNS = [
+    "UPC",
+    "Product Name",
+    "Inbound Qty",
+    "Value-add Qty",
+    "Canceled Qty",
+    "Transfer Qty",
+    "Total Inbound Qty",
+    "Grounding Qty",
+    "Issue"
+]
+
+# Below this total input size a process pool costs more to start than it saves.
+PARALLEL_MIN_BYTES = 5 * 1024 * 1024
+
+
+class CheckCancelled(Exception):
+    pass
+
+
+@dataclass
+class CheckResult:
+    report: pd.DataFrame
+    today: pd.DataFrame
+    source_upc_counts: dict = field(default_factory=dict)
+    history_error: str | None = None
+    cache_report: str | None = None
+    metrics: RunMetrics | None = None
+    run_log: str | None = None
+    profile_paths: list[str] = field(default_factory=list)
+
+
+def get_exe_dir() -> str:
+    return os.path.dirname(sys.executable if getattr(sys, "frozen", False) else __file__)
+
+
+def default_cache_dir() -> str:
+    return os.path.join(get_exe_dir(), CACHE_DIRNAME)
+
+
+# Names a source is looked for under: the default export, then its CSV variants.
+def default_filenames(key: str) -> list[str]:
+    names = [DEFAULT_FILES[key]]
+    if key in CSV_SOURCES:
+        stem = os.path.splitext(DEFAULT_FILES[key])[0]
+        names += [stem + suffix for suffix in CSV_SUFFIXES]
+    return names
+
+
+# Find the default export filenames in a folder, e.g. next to the executable.
+def find_default_files(folder: str) -> dict[str, str]:
+    found = {}
+    for key in DEFAULT_FILES:
+        for filename in default_filenames(key):
+            path = os.path.join(folder, filename)
+            if os.path.exists(path):
+                found[key] = path
+                break
+    # After migration only the ledger may be left.
+    ledger = ledger_path_for(os.path.join(folder, DEFAULT_FILES["History"]))
+    if "History" not in found and os.path.exists(ledger):
+        found["History"] = ledger
+    return found
+
+
+# Per-UPC summaries of each source's parsed rows. Split from the readers so benchmarks
+# can feed sheets generated in memory.
+def summarize_grounding(df_final_grounding: pd.DataFrame) -> pd.DataFrame:
+    return df_final_grounding.groupby("UPC", as_index=False).agg(
+        {"Grounding Qty": "sum", "Product Name": "first"}
+    )
+
+
+def summarize_inbound(inbound_df: pd.DataFrame) -> pd.DataFrame:
+    return inbound_df.groupby("UPC", as_index=False)["Inbound Qty"].sum()
+
+
+def summarize_valueadd(export_df_raw: pd.DataFrame) -> pd.DataFrame:
+    # rows without an outbound SN are value-added inbound
+    valueadd_df = export_df_raw[export_df_raw["Outbound SN"].isna()]
+    valueadd_summary = valueadd_df.groupby("UPC after value-added", as_index=False)["Value-added Num."].sum()
+    return valueadd_summary.rename(columns={"UPC after value-added": "UPC", "Value-added Num.": "Value-add Qty"})
+
+
+def summarize_cancel(cancel_df: pd.DataFrame) -> pd.DataFrame:
+    cancel_df = filter_counted_shelves(cancel_df)
+    return cancel_df.groupby("UPC", as_index=False)["Canceled Qty"].sum()
+
+
+def summarize_transfer(transfer_df: pd.DataFrame) -> pd.DataFrame:
+    transfer_summary = transfer_df.groupby("UPC", as_index=False)["transfer Num."].sum()
+    return transfer_summary.rename(columns={"transfer Num.": "Transfer Qty"})
+
+
+# Each source is read into a raw sheet, then parsed into a per-UPC summary; the two
+# steps are timed separately in the run log.
+SOURCE_READERS = {
+    "Grounding": read_excel,
+    "Inbound": functools.partial(read_source_columns, "Inbound"),
+    "Export": functools.partial(read_source_columns, "Export"),
+    "Cancel": functools.partial(read_excel, header=None),
+    "Transfer": functools.partial(read_source_columns, "Transfer"),
+}
+
+SOURCE_PARSERS = {
+    "Grounding": lambda raw: summarize_grounding(parse_grounding(raw)),
+    "Inbound": summarize_inbound,
+    "Export": summarize_valueadd,
+    "Cancel": lambda raw: summarize_cancel(parse_cancel_sheet(raw)),
+    "Transfer": summarize_transfer,
+}
+
+
+def empty_summary(key: str) -> pd.DataFrame:
+    columns = ["UPC", QTY_COLUMNS[key]]
+    if key == "Grounding":
+        columns.append("Product Name")
+    return pd.DataFrame(columns=columns)
+
+
+# Per-UPC summary of a CSV export read in chunks. Each chunk is summed per UPC, and the
+# partial sums are buffered until they hold about as many rows as the running total; only
+# then are they folded in with one regroup. Memory follows the number of distinct UPCs
+# rather than of rows, and each row is regrouped only a few times.
+# Returns the summary and the number of rows read.
+def stream_csv_source(key: str, path: str, chunk_rows: int = CSV_CHUNK_ROWS) -> tuple[pd.DataFrame, int]:
+    total = None
+    parts = []
+    buffered = 0
+    rows = 0
+
+    def fold():
+        frames = parts if total is None else [total, *parts]
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True).groupby("UPC", as_index=False, sort=False).sum()
+
+    with read_csv_chunks(key, path, chunk_rows) as reader:
+        for chunk in reader:
+            rows += len(chunk)
+            part = SOURCE_PARSERS[key](chunk)
+            parts.append(part)
+            buffered += len(part)
+            if total is None or buffered >= len(total):
+                total = fold()
+                parts, buffered = [], 0
+    if parts:
+        total = fold()
+    if total is None:
+        total = SOURCE_PARSERS[key](pd.DataFrame(columns=SOURCE_COLUMNS[key]))
+    return sort_like_excel(total), rows
+
+
+# The xlsx path groups UPCs in the type pandas inferred: numerically when every UPC is a
+# number, which for digit strings without leading zeros is the order of (length, text).
+# Sorting the same way keeps the report rows in the same order for either export.
+def sort_like_excel(summary: pd.DataFrame) -> pd.DataFrame:
+    upc = summary["UPC"].astype(str)
+    if upc.str.fullmatch(r"0|[1-9][0-9]*").all():
+        order = summary.assign(_length=upc.str.len()).sort_values(["_length", "UPC"], kind="stable").index
+    else:
+        order = summary.sort_values("UPC", kind="stable").index
+    return summary.loc[order].reset_index(drop=True)
+
+
+# Read and aggregate one source, recording a "read" and a "parse" stage when metrics is given
+# (one "stream" stage for a CSV export, where the two are interleaved).
+def load_source(key: str, path: str, metrics: RunMetrics | None = None) -> pd.DataFrame:
+    metrics = metrics or RunMetrics()
+    if is_csv(path):
+        if key not in CSV_SOURCES:
+            raise ValueError(f"{key} cannot be read from CSV; use the .xlsx export.")
+        with metrics.stage("stream", key) as record:
+            summary, record["rows_in"] = stream_csv_source(key, path)
+            if not summary.empty:
+                summary = compact_summary(summary, QTY_COLUMNS[key])
+            record["rows_out"] = len(summary)
+        return summary
+
+    with metrics.stage("read", key) as record:
+        raw = SOURCE_READERS[key](path)
+        record["rows_out"] = len(raw)
+    with metrics.stage("parse", key, rows_in=len(raw)) as record:
+        summary = SOURCE_PARSERS[key](raw)
+        if not summary.empty:
+            summary = compact_summary(summary, QTY_COLUMNS[key])
+        record["rows_out"] = len(summary)
+    return summary
+
+
+# Pool task: the summary plus the stage records measured in the worker process.
+# Must stay a module-level function.
+def load_source_measured(key: str, path: str, trace_memory: bool) -> tuple[pd.DataFrame, list[dict]]:
+    metrics = RunMetrics(trace_memory)
+    try:
+        summary = load_source(key, path, metrics)
+    except Exception as e:
+        # Exception attributes are pickled back to the parent with it.
+        e.stage_records = metrics.stages
+        raise
+    finally:
+        metrics.close()
+        for record in metrics.stages:
+            record["process"] = "worker"
+    return summary, metrics.stages
+
+
+def default_workers(n_sources: int) -> int:
+    return max(1, min(n_sources, os.cpu_count() or 1))
+
+
+def should_load_in_parallel(paths: dict[str, str], workers: int) -> bool:
+    if workers <= 1 or len(paths) <= 1:
+        return False
+    total_bytes = sum(os.path.getsize(p) for p in paths.values() if os.path.exists(p))
+    return total_bytes >= PARALLEL_MIN_BYTES
+
+
+# Read and aggregate every selected source; missing sources get an empty summary.
+# With more than one worker the sources are parsed in a process pool, so wall time is
+# close to the slowest single file. on_loaded(key) is called as each source finishes.
+# Sources found in the cache are not parsed at all. Stage timings go to metrics.
+def load_sources(paths: dict[str, str], on_loaded=None, workers: int | None = None,
+                 cache: SourceCache | None = None, metrics: RunMetrics | None = None) -> dict[str, pd.DataFrame]:
+    metrics = metrics or RunMetrics()
+    selected = {k: paths[k] for k in SOURCE_KEYS if k in paths}
+    summaries = {key: empty_summary(key) for key in SOURCE_KEYS if key not in selected}
+
+    pending = {}
+    cache_keys = {}
+    for key, path in selected.items():
+        if cache is not None:
+            with metrics.stage("cache", key) as record:
+                cache_keys[key], cached = cache.get(key, path)
+                record["cache"] = "miss" if cached is None else "hit"
+                record["rows_out"] = None if cached is None else len(cached)
+            if cached is not None:
+                summaries[key] = cached
+                if on_loaded is not None:
+                    on_loaded(key)
+                continue
+        pending[key] = path
+
+    def finish(key, summary):
+        summaries[key] = summary
+        if cache is not None:
+            cache.put(cache_keys[key], summary)
+        if on_loaded is not None:
+            on_loaded(key)
+
+    if workers is None:
+        workers = default_workers(len(pending))
+
+    if not should_load_in_parallel(pending, workers):
+        for key, path in pending.items():
+            finish(key, load_source(key, path, metrics))
+        return summaries
+
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+    try:
+        futures = {executor.submit(load_source_measured, key, path, metrics.trace_memory): key
+                   for key, path in pending.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                summary, records = future.result()
+            except Exception as e:
+                metrics.extend(getattr(e, "stage_records", None) or [
+                    {"stage": "load", "source": key, "status": "error", "error": str(e), "process": "worker"}
+                ])
+                raise
+            metrics.extend(records)
+            finish(key, summary)
+    finally:
+        # On error or cancel, drop queued sources instead of waiting for them.
+        executor.shutdown(wait=False, cancel_futures=True)
+    return summaries
+
+
+# Number of UPCs with a positive quantity in each inbound source.
+def count_source_upcs(summaries: dict[str, pd.DataFrame]) -> dict[str, int]:
+    counts = {}
+    for key, label in [("Inbound", "Inbound"), ("Export", "Value-Add"), ("Cancel", "Cancel"), ("Transfer", "Transfer")]:
+        df = summaries[key]
+        counts[label] = int((df[QTY_COLUMNS[key]] > 0).sum()) if not df.empty else 0
+    return counts
+
+
+# Build the wide UPC x source frame in one hash aggregation: every summary's UPCs are
+# factorized together once, then each source's quantities are scattered into place.
+def merge_sources(summaries: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    present = [key for key in SOURCE_KEYS if not summaries[key].empty]
+    if not present:
+        raise ValueError("No data rows found in selected files.")
+
+    upcs = pd.concat([summaries[key]["UPC"] for key in present], ignore_index=True)
+    codes, uniques = pd.factorize(upcs)
+    n = len(uniques)
+
+    merged = pd.DataFrame({"UPC": compact_text(pd.Series(uniques))})
+    offsets = np.cumsum([0] + [len(summaries[key]) for key in present])
+    source_codes = {key: codes[offsets[i]:offsets[i + 1]] for i, key in enumerate(present)}
+
+    total = np.zeros(n, dtype=np.int64)
+    for key in SOURCE_KEYS:
+        col = QTY_COLUMNS[key]
+        if key in source_codes:
+            qty = np.nan_to_num(summaries[key][col].to_numpy(dtype="float64"))
+            merged[col] = np.bincount(source_codes[key], weights=qty, minlength=n).astype(np.int64)
+        else:
+            merged[col] = np.zeros(n, dtype=np.int64)
+        if key != "Grounding":
+            total += merged[col].to_numpy()
+    merged["Total Inbound Qty"] = total
+
+    product_name = np.full(n, np.nan, dtype=object)
+    if "Grounding" in source_codes:
+        product_name[source_codes["Grounding"]] = summaries["Grounding"]["Product Name"].to_numpy(dtype=object)
+    merged["Product Name"] = compact_text(pd.Series(product_name))
+    return compact_report(merged)
+
+
+DEFAULT_RULESET = compile_rules()
+
+
+def classify(merged: pd.DataFrame, rules: RuleSet = DEFAULT_RULESET) -> pd.DataFrame:
+    merged["Issue"] = compact_issue(rules.classify(merged), rules.labels)
+    return merged[merged["Issue"].notna()][REPORT_COLUMNS]
+
+
+# Add today's discrepancies to the cumulative ledger and return the unresolved UPCs.
+# A historical.xlsx is imported into a ledger next to it on first use.
+def merge_history(today_result: pd.DataFrame, history_path: str, rules: RuleSet = DEFAULT_RULESET,
+                  origin: str = "check") -> pd.DataFrame:
+    return open_history(history_path, rules).apply_run(today_result, rules, origin=origin)
+
+
+# progress(done, total, stage, source) is called after each stage finishes, where stage is
+# one of "load", "merge", "classify", "history" or "export" (source is only set for "load").
+# cancel is any object with is_set(), e.g. a threading.Event; it is checked between stages
+# up to the first one with side effects (history, else export). From there the check runs
+# to the end, so a cancelled check never touched the ledger or the report file.
+#
+# Every stage is timed into metrics (a fresh RunMetrics unless one is passed, so callers can
+# see which stage failed). With save_path and run_log, the stages are appended to the run log
+# next to the report. profile runs the check under a profiler (sources are then loaded in
+# this thread) and writes the profile next to the run log.
+def run_check(paths: dict[str, str], history_path: str | None = None, save_path: str | None = None,
+              fmt: str | None = None, progress=None, cancel=None, workers: int | None = None,
+              cache: SourceCache | None = None, rules: RuleSet = DEFAULT_RULESET,
+              metrics: RunMetrics | None = None, run_log: bool = True, profile: bool = False) -> CheckResult:
+    if not any(k in paths for k in SOURCE_KEYS):
+        raise ValueError("Please provide at least one file (Grounding / Inbound / Export / Cancel / Transfer).")
+
+    metrics = metrics or RunMetrics()
+    log_path = run_log_path(save_path) if save_path is not None and run_log else None
+    status = "error"
+    result = None
+    profile_paths = []
+    try:
+        if profile:
+            with profiled(profile_base(save_path, metrics.run_id)) as profile_paths:
+                result = _run_stages(paths, history_path, save_path, fmt, progress, cancel, 1, cache, rules, metrics)
+        else:
+            result = _run_stages(paths, history_path, save_path, fmt, progress, cancel, workers, cache, rules, metrics)
+        status = "ok"
+    except CheckCancelled:
+        status = "cancelled"
+        raise
+    finally:
+        metrics.close()
+        if log_path is not None:
+            summary = metrics.summary(status, sources=sorted(k for k in SOURCE_KEYS if k in paths),
+                                      discrepancies=None if result is None else len(result.report),
+                                      output=save_path, profile=profile_paths or None)
+            try:
+                metrics.write_log(log_path, summary)
+            except OSError:
+                # The run log is diagnostic only; a read-only folder must not fail the check.
+                log_path = None
+
+    result.metrics = metrics
+    result.run_log = log_path
+    result.profile_paths = profile_paths
+    return result
+
+
+def _run_stages(paths, history_path, save_path, fmt, progress, cancel, workers, cache, rules,
+                metrics: RunMetrics) -> CheckResult:
+    selected = [k for k in SOURCE_KEYS if k in paths]
+    total = len(selected) + 2 + (history_path is not None) + (save_path is not None)
+    done = 0
+
+    def step(stage, source=None):
+        nonlocal done
+        done += 1
+        if progress is not None:
+            progress(done, total, stage, source)
+
+    def check_cancel():
+        if cancel is not None and cancel.is_set():
+            raise CheckCancelled()
+
+    def loaded(key):
+        step("load", key)
+        check_cancel()
+
+    check_cancel()
+    summaries = load_sources(paths, on_loaded=loaded, workers=workers, cache=cache, metrics=metrics)
+    check_cancel()
+    with metrics.stage("merge", rows_in=sum(len(df) for df in summaries.values())) as record:
+        counts = count_source_upcs(summaries)
+        merged = merge_sources(summaries)
+        record["rows_out"] = len(merged)
+        record["frame_mb"] = frame_mb(merged)
+    step("merge")
+    check_cancel()
+    with metrics.stage("classify", rows_in=len(merged)) as record:
+        today_result = classify(merged, rules)
+        record["rows_out"] = len(today_result)
+        record["frame_mb"] = frame_mb(today_result)
+    step("classify")
+    check_cancel()
+
+    result = CheckResult(report=today_result.copy(), today=today_result, source_upc_counts=counts)
+    if cache is not None:
+        result.cache_report = cache.report()
+    if history_path is not None:
+        try:
+            with metrics.stage("history", rows_in=len(today_result)) as record:
+                result.report = merge_history(today_result, history_path, rules)
+                record["rows_out"] = len(result.report)
+                record["frame_mb"] = frame_mb(result.report)
+        except Exception as e:
+            # A broken history file should not lose today's report.
+            result.history_error = f"Error updating historical.xlsx: {e}"
+        step("history")
+
+    if save_path is not None:
+        with metrics.stage("export", rows_in=len(result.report)) as record:
+            export_report(result.report, save_path, fmt)
+            record["rows_out"] = len(result.report)
+        step("export")
+    return result
+
+
+def export_report(df: pd.DataFrame, save_path: str, fmt: str | None = None):
+    write_report(df, save_path, fmt)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the grounding discrepancy check without the GUI.")
+    parser.add_argument("--input-dir", help="folder to search for the default export filenames")
+    parser.add_argument("--grounding", help="Grounding.xlsx")
+    parser.add_argument("--inbound", help="InboundRecordFile.xlsx (or .csv / .csv.gz)")
+    parser.add_argument("--export", help="ExportCustomRecordsFile.xlsx (or .csv / .csv.gz)")
+    parser.add_argument("--cancel", help="Cancel Order.xlsx")
+    parser.add_argument("--transfer", help="Transfer Order.xlsx (or .csv / .csv.gz)")
+    parser.add_argument("--history", help="cumulative ledger (.db), or historical.xlsx to import into one")
+    parser.add_argument("-o", "--output", required=True, help="report file to write")
+    parser.add_argument("--format", choices=REPORT_FORMATS, help="report format (default: from the output extension)")
+    parser.add_argument("--cache-dir", help="parsed-source cache folder (default: source_cache next to this program)")
+    parser.add_argument("--no-cache", action="store_true", help="parse every source from scratch")
+    parser.add_argument("--clear-cache", action="store_true", help="empty the cache before running")
+    parser.add_argument("--rules", help=f"discrepancy rule config (default: {RULES_FILENAME} next to this program, if present)")
+    parser.add_argument("--workers", type=int, help="processes used to load sources (1 = sequential, default: one per source)")
+    parser.add_argument("--details", action="store_true", help="print the time, rows and memory of every stage")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also measure each stage's peak allocations (several times slower)")
+    parser.add_argument("--profile", action="store_true", help="profile this run; the profile is written next to the report")
+    parser.add_argument("--no-run-log", action="store_true", help=f"do not append the stages to {RUN_LOG_FILENAME}")
+    args = parser.parse_args(argv)
+
+    paths = find_default_files(args.input_dir) if args.input_dir else {}
+    for key in DEFAULT_FILES:
+        value = getattr(args, key.lower())
+        if value:
+            paths[key] = value
+    history_path = paths.pop("History", None)
+
+    cache = SourceCache(args.cache_dir or default_cache_dir())
+    if args.clear_cache:
+        cache.clear()
+    if args.no_cache:
+        cache = None
+
+    metrics = RunMetrics(trace_memory=args.trace_memory)
+    try:
+        rules = load_rules(args.rules or os.path.join(get_exe_dir(), RULES_FILENAME))
+        result = run_check(paths, history_path, save_path=args.output, fmt=args.format, workers=args.workers,
+                           cache=cache, rules=rules, metrics=metrics, run_log=not args.no_run_log,
+                           profile=args.profile)
+    except Exception as e:
+        failed = metrics.failed_stage()
+        print(f"Error{f' in {stage_label(failed)}' if failed else ''}: {e}", file=sys.stderr)
+        if args.details and metrics.stages:
+            print(format_stages(metrics.stages), file=sys.stderr)
+        return 1
+
+    if result.history_error:
+        print(result.history_error, file=sys.stderr)
+    print(f"{len(result.report)} discrepancies written to {args.output}")
+    print("Today UPC counts by source: " + ", ".join(f"{k}: {v}" for k, v in result.source_upc_counts.items()))
+    if result.cache_report:
+        print(f"Source cache: {result.cache_report}")
+    if args.details:
+        print(format_stages(result.metrics.stages))
+    for path in result.profile_paths:
+        print(f"Profile written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
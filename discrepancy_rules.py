@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Discrepancy rules, evaluated column-wise over the whole merged frame.
+#
+# A UPC is reported when |Total Inbound Qty - Grounding Qty| exceeds its tolerance:
+# "tolerance" plus the per-source tolerance of every inbound source that has a
+# non-zero quantity for that UPC. The issue label then depends on which side is zero.
+# With "ignore_zero", UPCs where either side is zero are not reported at all
+# (useful when only part of the day's files are loaded).
+RULES_FILENAME = "discrepancy_rules.json"
+
+DEFAULT_RULES = {
+    "tolerance": 0,
+    "source_tolerances": {
+        "Inbound Qty": 0,
+        "Value-add Qty": 0,
+        "Canceled Qty": 0,
+        "Transfer Qty": 0,
+    },
+    "ignore_zero": False,
+    "labels": {
+        "missing_inbound": "Missing Inbound",
+        "missing_grounding": "Missing Grounding",
+        "quantity_mismatch": "Quantity Mismatch",
+    },
+}
+
+
+class RuleSet:
+    def __init__(self, config: dict):
+        unknown = set(config["source_tolerances"]) - set(DEFAULT_RULES["source_tolerances"])
+        if unknown:
+            raise ValueError(f"Unknown source in source_tolerances: {', '.join(sorted(unknown))}")
+        self.tolerance = float(config["tolerance"])
+        self.source_tolerances = {col: float(t) for col, t in config["source_tolerances"].items() if float(t)}
+        self.ignore_zero = bool(config["ignore_zero"])
+        labels = config["labels"]
+        self.labels = [labels["missing_inbound"], labels["missing_grounding"], labels["quantity_mismatch"]]
+
+    # Issue label per row (None when the row is not a discrepancy).
+    def classify(self, df: pd.DataFrame) -> np.ndarray:
+        total = df["Total Inbound Qty"].to_numpy()
+        grounding = df["Grounding Qty"].to_numpy()
+
+        allowed = np.full(len(df), self.tolerance)
+        for col, tol in self.source_tolerances.items():
+            allowed += tol * (df[col].to_numpy() != 0)
+        flagged = np.abs(total - grounding) > allowed
+        if self.ignore_zero:
+            flagged &= (total != 0) & (grounding != 0)
+
+        missing_inbound = flagged & (total == 0) & (grounding > 0)
+        missing_grounding = flagged & (grounding == 0) & (total > 0)
+        return np.select([missing_inbound, missing_grounding, flagged], self.labels, default=None)
+
+
+# Defaults overridden by whatever keys the config sets.
+def compile_rules(config: dict | None = None) -> RuleSet:
+    merged = {**DEFAULT_RULES, **(config or {})}
+    merged["source_tolerances"] = {**DEFAULT_RULES["source_tolerances"], **merged["source_tolerances"]}
+    merged["labels"] = {**DEFAULT_RULES["labels"], **merged["labels"]}
+    return RuleSet(merged)
+
+
+def load_rules(path: str | None) -> RuleSet:
+    if path is None or not os.path.exists(path):
+        return compile_rules()
+    with open(path, encoding="utf-8") as f:
+        return compile_rules(json.load(f))
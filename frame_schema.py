@@ -0,0 +1,120 @@
+import functools
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+# Compact column types shared by the source summaries, the merged frame, the report
+# and the cumulative (ledger) frame. Frames are converted once where they enter the
+# pipeline: in load_source() and when the ledger is read back.
+#
+#   UPC, Product Name  Arrow-backed strings when pyarrow is installed: one contiguous
+#                      buffer per column instead of a Python str object per cell.
+#                      Both are unique per row after aggregation, so a categorical
+#                      would still hold every string plus its codes.
+#   quantities         int32, or int64 for a column with values beyond QTY_LIMIT
+#   Issue              categorical over the rule labels
+
+REPORT_QTY_COLUMNS = [
+    "Inbound Qty",
+    "Value-add Qty",
+    "Canceled Qty",
+    "Transfer Qty",
+    "Total Inbound Qty",
+    "Grounding Qty",
+]
+TEXT_COLUMNS = ["UPC", "Product Name"]
+# int32 is used below this magnitude, so the sum or difference of two quantities
+# (Total Inbound Qty - Grounding Qty in the rules) still fits.
+QTY_LIMIT = 2**30
+
+
+# None when pyarrow is missing: text columns are then left as they are.
+@functools.lru_cache(maxsize=None)
+def text_dtype():
+    if importlib.util.find_spec("pyarrow") is None:
+        return None
+    major, minor = (int(x) for x in pd.__version__.split(".")[:2])
+    # pandas >= 2.3 can keep NaN as the missing value, as object columns do.
+    if (major, minor) >= (2, 3):
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    return pd.StringDtype("pyarrow")
+
+
+def compact_text(values: pd.Series) -> pd.Series:
+    dtype = text_dtype()
+    if dtype is None or values.dtype == dtype:
+        return values
+    # Missing values stay missing; astype(str) would turn them into "nan" on pandas 2.
+    return values.astype(object).where(values.notna(), None).astype(dtype)
+
+
+def compact_qty(values) -> np.ndarray:
+    arr = np.asarray(values)
+    if arr.dtype.kind not in "iu":
+        return arr
+    if len(arr) == 0 or np.abs(arr).max() < QTY_LIMIT:
+        return arr.astype(np.int32)
+    return arr.astype(np.int64)
+
+
+def compact_issue(values, labels: list[str] | None = None) -> pd.Categorical:
+    categories = list(dict.fromkeys(labels)) if labels is not None else None
+    return pd.Categorical(values, categories=categories)
+
+
+# Source summary after parsing: UPC as compact text, the quantity as int32 when it is whole.
+# Fractional quantities stay float so merge_sources() truncates after summing, as before.
+def compact_summary(summary: pd.DataFrame, qty_column: str) -> pd.DataFrame:
+    summary["UPC"] = compact_text(summary["UPC"].astype(str))
+    if "Product Name" in summary:
+        summary["Product Name"] = compact_text(summary["Product Name"])
+    qty = summary[qty_column].to_numpy()
+    if qty.dtype.kind == "f" and np.array_equal(qty, np.trunc(qty)):
+        qty = qty.astype(np.int64)
+    summary[qty_column] = compact_qty(qty)
+    return summary
+
+
+# Report-shaped frame (UPC, Product Name, quantities, Issue) in the compact types.
+def compact_report(df: pd.DataFrame, labels: list[str] | None = None) -> pd.DataFrame:
+    for col in TEXT_COLUMNS:
+        if col in df:
+            df[col] = compact_text(df[col])
+    for col in REPORT_QTY_COLUMNS:
+        if col in df:
+            df[col] = compact_qty(df[col].to_numpy())
+    if "Issue" in df:
+        df["Issue"] = compact_issue(df["Issue"], labels)
+    return df
+
+
+# The same frame in the types the pipeline used before: Python str objects and int64.
+def legacy_types(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for col in [*TEXT_COLUMNS, "Issue"]:
+        if col in df:
+            # An explicit object Series, so pandas >= 3 does not infer its str type again.
+            df[col] = df[col].astype(object).where(df[col].notna(), np.nan)
+    for col in REPORT_QTY_COLUMNS:
+        if col in df and df[col].dtype.kind in "iu":
+            df[col] = df[col].astype(np.int64)
+    return df
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    return round(df.memory_usage(deep=True).sum() / 2**20, 2)
+
+
+# Per-column footprint of each frame in the legacy and the compact types.
+def memory_report(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    rows = []
+    for name, df in frames.items():
+        before = legacy_types(df).memory_usage(deep=True, index=False)
+        after = df.memory_usage(deep=True, index=False)
+        for col in df.columns:
+            rows.append((name, col, str(df[col].dtype), before[col] / 2**20, after[col] / 2**20))
+        rows.append((name, "total", "", before.sum() / 2**20, after.sum() / 2**20))
+    report = pd.DataFrame(rows, columns=["Frame", "Column", "Type", "Before MB", "After MB"])
+    report["Saved"] = 1 - report["After MB"] / report["Before MB"].where(report["Before MB"] > 0)
+    return report
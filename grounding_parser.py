@@ -0,0 +1,100 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from source_readers import read_excel
+
+# Grounding.xlsx stores each product as 3 consecutive rows:
+#   row 1: UPC
+#   row 2: product name
+#   row 3: Shelf Code | Grounding Num. | Operator | Operation Time
+# Trailing rows that do not complete a block are ignored.
+BLOCK_SIZE = 3
+
+SUMMARY_COLUMNS = ["UPC", "Product Name", "Grounding Qty"]
+DETAILED_COLUMNS = ["UPC", "Product Name", "Shelf Code", "Grounding Qty", "Operator", "Operation Time"]
+
+# Date, time and duration cells: float() rejects them, but to_numeric() and numpy's datetime
+# casts turn them into epoch counts.
+TIME_TYPES = (datetime.date, datetime.time, datetime.timedelta, np.datetime64, np.timedelta64)
+# infer_dtype() kinds of object columns that hold no TIME_TYPES cells.
+NUMERIC_KINDS = {"floating", "integer", "mixed-integer-float", "boolean", "decimal", "string", "empty"}
+# Quantities are int64; larger values cannot be stored.
+INT64_LIMIT = 2.0 ** 63
+
+
+def _legacy_int(value, invalid_qty):
+    try:
+        return int(float(value))
+    except Exception:
+        return invalid_qty
+
+
+# Cells of a date, time or duration, or None when there are none (a numeric column is
+# checked without looking at its cells).
+def time_cells(values, raw: np.ndarray) -> np.ndarray | None:
+    kind = getattr(getattr(values, "dtype", None), "kind", "O")
+    if kind in "mM":
+        return np.ones(len(raw), dtype=bool)
+    if kind != "O" or pd.api.types.infer_dtype(raw, skipna=True) in NUMERIC_KINDS:
+        return None
+    return np.fromiter((isinstance(v, TIME_TYPES) for v in raw), dtype=bool, count=len(raw))
+
+
+# Same result as int(float(x)) per cell, with invalid_qty for values that cannot be converted,
+# dates and durations, and values outside the int64 range.
+def to_quantity(values, invalid_qty=0) -> pd.Series:
+    raw = np.asarray(values, dtype=object)
+    try:
+        # numpy applies float() to every cell; this only fails if some cell is not a number.
+        arr = raw.astype("float64")
+    except (TypeError, ValueError):
+        nums = pd.to_numeric(pd.Series(raw), errors="coerce").astype("float64")
+        # to_numeric rejects a few things float() accepts (padded strings, "1_000", ...);
+        # only those leftover cells go through the slow per-value conversion.
+        retry = nums.isna().to_numpy() & pd.notna(raw)
+        if retry.any():
+            nums[retry] = [_legacy_int(v, np.nan) for v in raw[retry]]
+        arr = nums.to_numpy()
+
+    bad = ~np.isfinite(arr) | (np.abs(arr) >= INT64_LIMIT)
+    # Dates and durations may have become epoch counts above; only cells that became
+    # numbers need a look.
+    converted = np.flatnonzero(~bad)
+    times = time_cells(values, raw[converted])
+    if times is not None:
+        bad[converted[times]] = True
+    qty = np.trunc(np.where(bad, 0, arr))
+    if invalid_qty is None:
+        return pd.Series(np.where(bad, np.nan, qty) if bad.any() else qty.astype("int64"))
+    return pd.Series(np.where(bad, invalid_qty, qty).astype("int64"))
+
+
+# Reshape the grounding sheet into one row per product without walking blocks in Python.
+def parse_grounding(df: pd.DataFrame, detailed: bool = False, invalid_qty=0) -> pd.DataFrame:
+    columns = DETAILED_COLUMNS if detailed else SUMMARY_COLUMNS
+    n_blocks = len(df) // BLOCK_SIZE
+    if n_blocks == 0:
+        return pd.DataFrame(columns=columns)
+
+    end = n_blocks * BLOCK_SIZE
+    col0 = df.iloc[:end, 0].to_numpy(dtype=object)
+    detail = df.iloc[2:end:BLOCK_SIZE]
+
+    out = {
+        "UPC": list(map(str, col0[0::BLOCK_SIZE])),
+        "Product Name": list(map(str, col0[1::BLOCK_SIZE])),
+    }
+    if detailed:
+        out["Shelf Code"] = col0[2::BLOCK_SIZE]
+    out["Grounding Qty"] = to_quantity(detail.iloc[:, 1].to_numpy(dtype=object), invalid_qty).to_numpy()
+    if detailed:
+        out["Operator"] = detail.iloc[:, 2].to_numpy(dtype=object)
+        out["Operation Time"] = detail.iloc[:, 3].to_numpy(dtype=object)
+
+    return pd.DataFrame(out, columns=columns)
+
+
+def read_grounding(path: str, detailed: bool = False, invalid_qty=0) -> pd.DataFrame:
+    return parse_grounding(read_excel(path), detailed=detailed, invalid_qty=invalid_qty)
@@ -0,0 +1,315 @@
+import argparse
+import contextlib
+import datetime
+import hashlib
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+from frame_schema import compact_report
+
+# Incremental cumulative-discrepancy ledger in a local SQLite file.
+#
+#   runs    one row per applied check (date, origin, content key)
+#   deltas  log of every run's per-UPC quantities
+#   before  the totals rows a run replaced, so the run can be taken back exactly
+#   totals  running totals of the UPCs that are still unresolved (issue IS NOT NULL)
+#
+# A run only reads and rewrites the totals of the UPCs it touches, inside one
+# transaction, so its cost follows today's delta rather than the age of the history.
+# UPCs whose running totals balance are removed from totals (their deltas stay in
+# the log), the same way resolved rows dropped out of historical.xlsx.
+#
+# There is one run per origin and day. Re-running the same check is skipped; a
+# changed re-run (e.g. after a fresh export) replaces that day's run, as rewriting
+# historical.xlsx did: the earlier run and any run applied after it are taken back
+# from their before rows, the new run is applied, and the later runs are applied
+# again from their deltas.
+
+LEDGER_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+QTY_FIELDS = {
+    "Inbound Qty": "inbound",
+    "Value-add Qty": "valueadd",
+    "Canceled Qty": "canceled",
+    "Transfer Qty": "transfer",
+    "Total Inbound Qty": "total_inbound",
+    "Grounding Qty": "grounding",
+}
+
+REPORT_COLUMNS = ["UPC", "Product Name", *QTY_FIELDS, "Issue"]
+
+_QTY_SQL = ", ".join(f"{name} INTEGER NOT NULL" for name in QTY_FIELDS.values())
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_date TEXT NOT NULL,
+    applied_at TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    run_key TEXT NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS runs_day ON runs(origin, run_date);
+CREATE TABLE IF NOT EXISTS deltas (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    upc TEXT NOT NULL,
+    product_name TEXT,
+    {_QTY_SQL}
+);
+CREATE INDEX IF NOT EXISTS deltas_upc ON deltas(upc);
+CREATE INDEX IF NOT EXISTS deltas_run ON deltas(run_id);
+CREATE TABLE IF NOT EXISTS before (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    upc TEXT NOT NULL,
+    product_name TEXT,
+    {_QTY_SQL},
+    issue TEXT
+);
+CREATE INDEX IF NOT EXISTS before_run ON before(run_id);
+CREATE TABLE IF NOT EXISTS totals (
+    upc TEXT PRIMARY KEY,
+    product_name TEXT,
+    {_QTY_SQL},
+    issue TEXT
+);
+"""
+
+
+# Ledger used for a history path: .db files are used directly; for historical.xlsx
+# the ledger is historical.db next to it, imported from the workbook on first use.
+def ledger_path_for(history_path: str) -> str:
+    if history_path.lower().endswith(LEDGER_SUFFIXES):
+        return history_path
+    return os.path.splitext(history_path)[0] + ".db"
+
+
+# Same clean-up run_check has always applied to historical.xlsx rows.
+def normalize_rows(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for c in REPORT_COLUMNS:
+        if c not in df.columns:
+            df[c] = pd.NA
+    df = df[REPORT_COLUMNS]
+    if not df.empty:
+        df["UPC"] = df["UPC"].astype(str)
+        for col in QTY_FIELDS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+    return df
+
+
+# Identifies a run by its origin, date and content, so re-running the same check does not double count.
+def run_key(df: pd.DataFrame, run_date: datetime.date, origin: str) -> str:
+    content = pd.util.hash_pandas_object(df[["UPC", *QTY_FIELDS]], index=False).to_numpy()
+    digest = hashlib.sha1(np.sort(content).tobytes()).hexdigest()
+    return f"{origin}:{run_date.isoformat()}:{digest}"
+
+
+class HistoryStore:
+    def __init__(self, path: str):
+        self.path = path
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        # Runs applied before the before table existed cannot be taken back exactly.
+        if "undoable" not in {row[1] for row in conn.execute("PRAGMA table_info(runs)")}:
+            conn.execute("ALTER TABLE runs ADD COLUMN undoable INTEGER NOT NULL DEFAULT 0")
+        return conn
+
+    def is_empty(self) -> bool:
+        if not os.path.exists(self.path):
+            return True
+        with contextlib.closing(self.connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0
+
+    # Fold one run's per-UPC quantities into the running totals and return every
+    # UPC that is still unresolved afterwards. keep_resolved is only used when importing
+    # a workbook, whose balanced rows still count towards later runs.
+    def apply_run(self, rows: pd.DataFrame, rules, run_date: datetime.date | None = None,
+                  origin: str = "check", keep_resolved: bool = False) -> pd.DataFrame:
+        run_date = run_date or datetime.date.today()
+        rows = normalize_rows(rows)
+        rows = rows.groupby("UPC", as_index=False, sort=False).agg(
+            {"Product Name": "first", **{col: "sum" for col in QTY_FIELDS}}
+        )
+        key = run_key(rows, run_date, origin)
+
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM runs WHERE run_key = ?", (key,)).fetchone() is None:
+                earlier = conn.execute(
+                    "SELECT run_id FROM runs WHERE origin = ? AND run_date = ? ORDER BY run_id DESC LIMIT 1",
+                    (origin, run_date.isoformat()),
+                ).fetchone()
+                if earlier is None:
+                    self._apply(conn, rows, rules, run_date, origin, key, keep_resolved)
+                else:
+                    self._replace(conn, earlier[0], rows, rules, run_date, origin, key, keep_resolved)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.unresolved()
+
+    # taken_off: quantities of a replaced run that could not be taken back from its before
+    # rows, subtracted from the totals instead.
+    def _apply(self, conn, rows, rules, run_date, origin, key, keep_resolved, taken_off=None):
+        cur = conn.execute(
+            "INSERT INTO runs (run_date, applied_at, origin, run_key, undoable) VALUES (?, ?, ?, ?, ?)",
+            (run_date.isoformat(), datetime.datetime.now().isoformat(timespec="seconds"), origin, key,
+             int(taken_off is None)),
+        )
+        run_id = cur.lastrowid
+        if taken_off is not None and not taken_off.empty:
+            taken_off = taken_off.copy()
+            taken_off[list(QTY_FIELDS)] = -taken_off[list(QTY_FIELDS)]
+            change = pd.concat([rows, taken_off], ignore_index=True).groupby("UPC", as_index=False, sort=False).agg(
+                {"Product Name": "first", **{col: "sum" for col in QTY_FIELDS}}
+            )
+        else:
+            change = rows
+        if change.empty:
+            return
+
+        names = rows["Product Name"].astype(object).where(rows["Product Name"].notna(), None)
+        qty = rows[list(QTY_FIELDS)].to_numpy(dtype="int64")
+        records = [(run_id, upc, name, *map(int, q)) for upc, name, q in zip(rows["UPC"], names, qty)]
+        fields = ", ".join(QTY_FIELDS.values())
+        marks = ", ".join("?" * len(QTY_FIELDS))
+        conn.executemany(f"INSERT INTO deltas (run_id, upc, product_name, {fields}) VALUES (?, ?, ?, {marks})",
+                         records)
+
+        # Current totals of only the UPCs in this run, kept as the run's before rows.
+        self._touch(conn, change["UPC"])
+        conn.execute(f"INSERT INTO before (run_id, upc, product_name, {fields}, issue) "
+                     f"SELECT ?, t.upc, t.product_name, {', '.join('t.' + f for f in QTY_FIELDS.values())}, t.issue "
+                     "FROM totals t JOIN touched USING (upc)", (run_id,))
+        prev = pd.read_sql_query(
+            f"SELECT upc, product_name, {fields} FROM before WHERE run_id = ?", conn, params=(run_id,),
+        ).rename(columns={"upc": "UPC", "product_name": "Product Name",
+                          **{v: k for k, v in QTY_FIELDS.items()}})
+
+        combined = change.merge(prev, on="UPC", how="left", suffixes=("", "_prev"))
+        combined["Product Name"] = combined["Product Name"].combine_first(combined["Product Name_prev"])
+        for col in QTY_FIELDS:
+            combined[col] = combined[col] + combined[f"{col}_prev"].fillna(0).astype(int)
+        combined["Issue"] = rules.classify(combined)
+
+        if keep_resolved:
+            open_rows = combined
+        else:
+            resolved = combined[combined["Issue"].isna()]
+            conn.executemany("DELETE FROM totals WHERE upc = ?", ((upc,) for upc in resolved["UPC"]))
+            open_rows = combined[combined["Issue"].notna()]
+        names = open_rows["Product Name"].astype(object).where(open_rows["Product Name"].notna(), None)
+        qty = open_rows[list(QTY_FIELDS)].to_numpy(dtype="int64")
+        conn.executemany(
+            f"INSERT OR REPLACE INTO totals (upc, product_name, {fields}, issue) VALUES (?, ?, {marks}, ?)",
+            [(upc, name, *map(int, q), issue)
+             for upc, name, q, issue in zip(open_rows["UPC"], names, qty, open_rows["Issue"])],
+        )
+
+    @staticmethod
+    def _touch(conn, upcs):
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS touched (upc TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM touched")
+        conn.executemany("INSERT OR IGNORE INTO touched VALUES (?)", ((upc,) for upc in upcs))
+
+    def _run_rows(self, conn, run_id: int) -> pd.DataFrame:
+        rows = pd.read_sql_query(
+            f"SELECT upc, product_name, {', '.join(QTY_FIELDS.values())} FROM deltas WHERE run_id = ?",
+            conn, params=(run_id,),
+        )
+        rows.columns = REPORT_COLUMNS[:-1]
+        return rows
+
+    def _forget(self, conn, run_id: int):
+        for table in ("before", "deltas", "runs"):
+            conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+    # Put the totals of the run's UPCs back the way they were before it.
+    def _undo(self, conn, run_id: int):
+        self._touch(conn, (row[0] for row in conn.execute("SELECT upc FROM deltas WHERE run_id = ?", (run_id,))))
+        conn.execute("DELETE FROM totals WHERE upc IN (SELECT upc FROM touched)")
+        fields = ", ".join(QTY_FIELDS.values())
+        conn.execute(f"INSERT INTO totals (upc, product_name, {fields}, issue) "
+                     f"SELECT upc, product_name, {fields}, issue FROM before WHERE run_id = ?", (run_id,))
+        self._forget(conn, run_id)
+
+    # Replace the same day's earlier run with rows, keeping the runs applied after it.
+    def _replace(self, conn, earlier_id, rows, rules, run_date, origin, key, keep_resolved):
+        later = conn.execute("SELECT run_id, run_date, origin, run_key, undoable FROM runs WHERE run_id > ? "
+                             "ORDER BY run_id", (earlier_id,)).fetchall()
+        undoable = conn.execute("SELECT undoable FROM runs WHERE run_id = ?", (earlier_id,)).fetchone()[0]
+        if not (undoable and all(run[4] for run in later)):
+            # Ledger written before runs kept their before rows: net the earlier run out instead.
+            taken_off = self._run_rows(conn, earlier_id)
+            self._forget(conn, earlier_id)
+            self._apply(conn, rows, rules, run_date, origin, key, keep_resolved, taken_off=taken_off)
+            return
+        redo = [(self._run_rows(conn, run_id), *run) for run_id, *run in later]
+        for run_id in [run[0] for run in reversed(later)] + [earlier_id]:
+            self._undo(conn, run_id)
+        self._apply(conn, rows, rules, run_date, origin, key, keep_resolved)
+        for later_rows, later_date, later_origin, later_key, _ in redo:
+            self._apply(conn, later_rows, rules, datetime.date.fromisoformat(later_date), later_origin, later_key,
+                        keep_resolved=later_origin == "import")
+
+    def unresolved(self) -> pd.DataFrame:
+        with contextlib.closing(self.connect()) as conn:
+            df = pd.read_sql_query(
+                f"SELECT upc, product_name, {', '.join(QTY_FIELDS.values())}, issue FROM totals "
+                "WHERE issue IS NOT NULL ORDER BY upc",
+                conn,
+            )
+        df.columns = REPORT_COLUMNS
+        return compact_report(df)
+
+    # One-time migration of an existing historical.xlsx into an empty ledger.
+    def import_excel(self, xlsx_path: str, rules) -> pd.DataFrame:
+        mtime = datetime.date.fromtimestamp(os.path.getmtime(xlsx_path))
+        return self.apply_run(pd.read_excel(xlsx_path), rules, run_date=mtime, origin="import", keep_resolved=True)
+
+
+# Open the ledger for a history path, importing historical.xlsx the first time.
+def open_history(history_path: str, rules) -> HistoryStore:
+    store = HistoryStore(ledger_path_for(history_path))
+    if history_path != store.path and os.path.exists(history_path) and store.is_empty():
+        store.import_excel(history_path, rules)
+    return store
+
+
+def main(argv=None) -> int:
+    from discrepancy_rules import load_rules
+    from report_writers import write_report
+
+    parser = argparse.ArgumentParser(description="Manage the cumulative discrepancy ledger.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import an existing historical.xlsx")
+    imp.add_argument("xlsx")
+    imp.add_argument("--db", help="ledger file (default: same name as the workbook, .db)")
+    imp.add_argument("--rules", help="discrepancy rule config")
+    exp = sub.add_parser("export", help="write the unresolved UPCs to xlsx, csv or parquet")
+    exp.add_argument("db")
+    exp.add_argument("output")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        store = HistoryStore(args.db or ledger_path_for(args.xlsx))
+        unresolved = store.import_excel(args.xlsx, load_rules(args.rules))
+        print(f"{len(unresolved)} unresolved UPCs in {store.path}")
+    else:
+        unresolved = HistoryStore(args.db).unresolved()
+        write_report(unresolved, args.output)
+        print(f"{len(unresolved)} unresolved UPCs written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
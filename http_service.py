@@ -0,0 +1,294 @@
+import argparse
+import email.parser
+import email.policy
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from discrepancy_engine import (
+    DEFAULT_FILES, QTY_COLUMNS, SOURCE_KEYS, SOURCE_PARSERS, classify, default_cache_dir, empty_summary,
+    find_default_files, get_exe_dir, merge_sources, run_check,
+)
+from discrepancy_rules import RULES_FILENAME, RuleSet, compile_rules, load_rules
+from frame_schema import compact_summary
+from report_writers import REPORT_FORMATS
+from run_metrics import RunMetrics
+from source_cache import SourceCache
+from source_readers import CSV_SUFFIXES, read_source_columns
+
+# Local HTTP service around run_check(), so other programs and people on this machine
+# can run a check without starting Python and importing pandas each time.
+#
+# Checks run in a process pool whose workers import pandas and go through the Excel
+# reader, a parser, merge and classify once at startup; a request then only pays for
+# reading and checking its files. Sources are sent as a multipart upload (one file
+# field per source) or as a JSON body of paths on this machine. The report comes back
+# as JSON, CSV, xlsx or Parquet together with the per-source UPC counts.
+#
+#   GET  /health
+#   POST /check?format=json|csv|xlsx|parquet
+#        multipart/form-data  fields grounding, inbound, export, cancel, transfer
+#        application/json     {"input_dir": "...", "paths": {"Inbound": "...", ...}}
+#
+# Bad input answers 400: an unknown field or source, a missing file, a source that
+# cannot be read or parsed, or a bad Content-Length. Anything else is a 500.
+#
+# The service listens on 127.0.0.1 only. It does not write the cumulative ledger or the
+# statistics history.
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Request bodies are held in memory while the uploads are split out.
+DEFAULT_MAX_REQUEST_MB = 1024
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+RESPONSE_FORMATS = ("json", *REPORT_FORMATS)
+
+# Upload field / JSON key (any case) -> source key.
+SOURCE_FIELDS = {key.lower(): key for key in SOURCE_KEYS}
+# Stages that read a client's file: a failure there is bad input (400), not a server error.
+SOURCE_STAGES = ("cache", "read", "parse", "stream")
+
+
+# Pool initializer: read a tiny workbook and check it, so the imports and first-call
+# setup of pandas, the Excel engine and numpy happen before the first request.
+def warm_up():
+    buffer = io.BytesIO()
+    pd.DataFrame({"UPC": [100000000001], "Inbound Qty": [1.0]}).to_excel(buffer, index=False)
+    buffer.seek(0)
+    summaries = {key: empty_summary(key) for key in SOURCE_KEYS}
+    summaries["Inbound"] = compact_summary(SOURCE_PARSERS["Inbound"](read_source_columns("Inbound", buffer)),
+                                           QTY_COLUMNS["Inbound"])
+    classify(merge_sources(summaries))
+
+
+# Pool task: check one request's files. File formats are written into the request's
+# folder; JSON is built here so the server thread only has to send it. A source file
+# that cannot be read or parsed raises ValueError.
+def check_request(paths: dict[str, str], fmt: str, folder: str, rules: RuleSet,
+                  cache_dir: str | None) -> tuple[dict, bytes | None]:
+    cache = SourceCache(cache_dir) if cache_dir else None
+    save_path = None if fmt == "json" else os.path.join(folder, f"report.{fmt}")
+    metrics = RunMetrics()
+    try:
+        result = run_check(paths, save_path=save_path, fmt=None if fmt == "json" else fmt, workers=1, cache=cache,
+                           rules=rules, metrics=metrics, run_log=False)
+    except Exception as e:
+        for record in metrics.stages:
+            if record["status"] == "error" and record["stage"] in SOURCE_STAGES and record["source"] in paths:
+                name = os.path.basename(paths[record["source"]])
+                raise ValueError(f"Cannot read {record['source']} ({name}): {record['error']}") from e
+        raise
+    meta = {
+        "discrepancies": len(result.today),
+        "source_upc_counts": result.source_upc_counts,
+        "cache": result.cache_report,
+        "stages": result.metrics.stages,
+    }
+    if fmt != "json":
+        return meta, None
+    meta["columns"] = list(result.today.columns)
+    meta["rows"] = json.loads(result.today.to_json(orient="records", force_ascii=False))
+    return meta, json.dumps(meta, default=str, ensure_ascii=False).encode("utf-8")
+
+
+# Name an upload is saved under: the default export name, with the CSV suffix it was sent with.
+def upload_filename(key: str, filename: str) -> str:
+    stem = os.path.splitext(DEFAULT_FILES[key])[0]
+    for suffix in sorted(CSV_SUFFIXES, key=len, reverse=True):
+        if filename.lower().endswith(suffix):
+            return stem + suffix
+    return DEFAULT_FILES[key]
+
+
+def save_uploads(content_type: str, body: bytes, folder: str) -> dict[str, str]:
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    if not message.is_multipart():
+        raise ValueError("Malformed multipart body.")
+    paths = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition") or ""
+        key = SOURCE_FIELDS.get(name.lower())
+        if key is None:
+            raise ValueError(f"Unknown upload field {name!r}; use {', '.join(SOURCE_FIELDS)}.")
+        path = os.path.join(folder, upload_filename(key, part.get_filename() or ""))
+        with open(path, "wb") as f:
+            f.write(part.get_payload(decode=True) or b"")
+        paths[key] = path
+    return paths
+
+
+def local_paths(data) -> dict[str, str]:
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object like {"input_dir": "...", "paths": {"Inbound": "..."}}.')
+    paths = find_default_files(data["input_dir"]) if data.get("input_dir") else {}
+    paths.pop("History", None)
+    for name, path in (data.get("paths") or {}).items():
+        key = SOURCE_FIELDS.get(str(name).lower())
+        if key is None:
+            raise ValueError(f"Unknown source {name!r}; use {', '.join(SOURCE_KEYS)}.")
+        paths[key] = path
+    for path in paths.values():
+        if not os.path.isfile(path):
+            raise ValueError(f"File not found: {path}")
+    return paths
+
+
+class CheckHandler(BaseHTTPRequestHandler):
+    server: "CheckService"
+
+    def send_json(self, status: int, data: dict):
+        body = json.dumps(data, default=str, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", CONTENT_TYPES["json"])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self.send_json(404, {"error": "Not found"})
+            return
+        self.send_json(200, {"status": "ok", "workers": self.server.workers})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/check":
+            self.send_json(404, {"error": "Not found"})
+            return
+        fmt = parse_qs(url.query).get("format", ["json"])[0]
+        if fmt not in RESPONSE_FORMATS:
+            self.send_json(400, {"error": f"format must be one of {', '.join(RESPONSE_FORMATS)}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self.send_json(400, {"error": "Content-Length must be a non-negative integer"})
+            return
+        if length > self.server.max_bytes:
+            self.close_connection = True
+            self.send_json(413, {"error": f"Request larger than {self.server.max_bytes // 2**20} MB"})
+            return
+        body = self.rfile.read(length)
+
+        start = time.perf_counter()
+        folder = tempfile.mkdtemp(prefix="discrepancy_request_")
+        try:
+            content_type = self.headers.get_content_type()
+            if content_type == "multipart/form-data":
+                paths = save_uploads(self.headers["Content-Type"], body, folder)
+            elif content_type == "application/json":
+                paths = local_paths(json.loads(body or b"{}"))
+            else:
+                raise ValueError("Send the sources as multipart/form-data uploads or a JSON body of paths.")
+            del body
+            future = self.server.executor.submit(check_request, paths, fmt, folder, self.server.rules,
+                                                 self.server.cache_dir)
+            meta, payload = future.result()
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        else:
+            self.send_report(fmt, meta, payload, folder)
+            self.log_message("check: %d sources, %d discrepancies, %.2f s", len(paths), meta["discrepancies"],
+                             time.perf_counter() - start)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def send_report(self, fmt: str, meta: dict, payload: bytes | None, folder: str):
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[fmt])
+        self.send_header("X-Discrepancies", str(meta["discrepancies"]))
+        self.send_header("X-Source-UPC-Counts", json.dumps(meta["source_upc_counts"]))
+        if payload is not None:
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        path = os.path.join(folder, f"report.{fmt}")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header("Content-Disposition", f'attachment; filename="discrepancy_report.{fmt}"')
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+
+class CheckService(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = DEFAULT_PORT, workers: int | None = None, rules: RuleSet | None = None,
+                 cache_dir: str | None = None, max_bytes: int = DEFAULT_MAX_REQUEST_MB * 2**20):
+        super().__init__((HOST, port), CheckHandler)
+        self.workers = workers or os.cpu_count() or 1
+        self.rules = rules or compile_rules()
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up)
+
+    # Start every worker now and wait until each has warmed up.
+    def warm_up(self):
+        for future in [self.executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve discrepancy checks over HTTP on this machine.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port on 127.0.0.1 (default {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, help="checks run at once (default: one per CPU)")
+    parser.add_argument("--max-request-mb", type=int, default=DEFAULT_MAX_REQUEST_MB,
+                        help=f"largest accepted request body (default {DEFAULT_MAX_REQUEST_MB})")
+    parser.add_argument("--cache-dir", help="parsed-source cache folder (default: source_cache next to this program)")
+    parser.add_argument("--no-cache", action="store_true", help="parse every source from scratch")
+    parser.add_argument("--rules", help=f"discrepancy rule config (default: {RULES_FILENAME} next to this program, if present)")
+    args = parser.parse_args(argv)
+
+    try:
+        rules = load_rules(args.rules or os.path.join(get_exe_dir(), RULES_FILENAME))
+        service = CheckService(args.port, args.workers, rules,
+                               cache_dir=None if args.no_cache else (args.cache_dir or default_cache_dir()),
+                               max_bytes=args.max_request_mb * 2**20)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        start = time.perf_counter()
+        service.warm_up()
+        print(f"Serving checks on http://{HOST}:{service.server_address[1]} with {service.workers} workers "
+              f"(warmed up in {time.perf_counter() - start:.1f} s)", flush=True)
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
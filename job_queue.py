@@ -0,0 +1,567 @@
+import argparse
+import contextlib
+import datetime
+import hashlib
+import io
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+
+import pandas as pd
+
+from batch_reconcile import record_stats, run_counts
+from discrepancy_engine import (
+    DEFAULT_FILES, SOURCE_KEYS, CheckResult, default_cache_dir, find_default_files, get_exe_dir, merge_history,
+    run_check,
+)
+from discrepancy_rules import RULES_FILENAME, RuleSet, load_rules
+from history_store import ledger_path_for
+from report_writers import REPORT_FORMATS, write_report
+from source_cache import CACHE_VERSION, SourceCache, file_digest
+
+# Persistent queue of reconciliation jobs in a local SQLite file.
+#
+#   jobs     one row per distinct job: its request (the inputs run_check() takes), priority,
+#            status (queued -> running -> done / failed), timings and a result summary
+#   results  the final report of each finished job, fetched later with `result`
+#   outputs  report files to write when a job finishes, one per submitter
+#   runner   the lease of the one runner working on the queue
+#
+# Anyone can submit; one runner process (`run`) executes the jobs, highest priority
+# first, on a bounded process pool. The checks themselves run in parallel, but every
+# write to a shared ledger or stats database happens in the runner's own thread, one
+# job at a time, so concurrent checks never contend for those files. A second runner
+# refuses to start while the first one's lease is fresh; a crashed runner's lease
+# expires after LEASE_SECONDS, and its running jobs are then queued again.
+#
+# A worker process that dies (e.g. out of memory) breaks the whole pool, and every job
+# it was running fails with it. The pool is rebuilt and those jobs are queued again. A
+# job that was alone in the pool caused the crash and is retried up to MAX_RETRIES times.
+# When several were running, none is charged: each of them runs alone next time, so
+# a second crash can be blamed on the job that caused it.
+#
+# A job is identified by the content of its source files, its history, stats and rule
+# settings and the day it is submitted. Submitting the same input set again that day
+# returns the existing job (queued, running or done) instead of running it twice; the
+# new submitter's output file is written from the stored result.
+
+QUEUE_FILENAME = "discrepancy_jobs.db"
+DEFAULT_POLL_SECONDS = 2.0
+STATUSES = ("queued", "running", "done", "failed")
+LEASE_SECONDS = 60.0
+HEARTBEAT_SECONDS = 15.0
+MAX_RETRIES = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input_key TEXT NOT NULL,
+    request TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    submissions INTEGER NOT NULL DEFAULT 1,
+    submitted_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    summary TEXT,
+    error TEXT,
+    retries INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_next ON jobs(status, priority DESC, job_id);
+CREATE INDEX IF NOT EXISTS jobs_input ON jobs(input_key);
+CREATE TABLE IF NOT EXISTS results (
+    job_id INTEGER PRIMARY KEY REFERENCES jobs(job_id),
+    report BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    job_id INTEGER NOT NULL REFERENCES jobs(job_id),
+    path TEXT NOT NULL,
+    format TEXT,
+    written_at TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, path)
+);
+CREATE TABLE IF NOT EXISTS runner (
+    lease INTEGER PRIMARY KEY CHECK (lease = 1),
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class JobRequest:
+    paths: dict[str, str]
+    history: str | None = None
+    # Rule config file; None uses discrepancy_rules.json next to the program, if present.
+    rules: str | None = None
+    # Folder of discrepancy_stats.db to record the run's counts in, under site.
+    stats_dir: str | None = None
+    site: str = ""
+
+
+@dataclass
+class Job:
+    job_id: int
+    request: JobRequest
+    priority: int = 0
+    retries: int = 0
+
+
+@dataclass
+class Submission:
+    job_id: int
+    status: str
+    duplicate: bool = False
+    # Output paths written right away from the stored result of a finished duplicate.
+    written: list[str] = field(default_factory=list)
+
+
+def now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def default_queue_path() -> str:
+    return os.path.join(get_exe_dir(), QUEUE_FILENAME)
+
+
+def rules_path_for(request: JobRequest) -> str:
+    return request.rules or os.path.join(get_exe_dir(), RULES_FILENAME)
+
+
+# Same-day identity of a request: file contents rather than paths, so the same exports
+# submitted from two folders are one job too.
+def input_key(request: JobRequest, day: datetime.date | None = None) -> str:
+    parts = [str(CACHE_VERSION), (day or datetime.date.today()).isoformat()]
+    for key in SOURCE_KEYS:
+        if key in request.paths:
+            parts += [key, file_digest(request.paths[key])]
+    rules_path = rules_path_for(request)
+    parts.append(file_digest(rules_path) if os.path.exists(rules_path) else "")
+    parts.append(os.path.abspath(ledger_path_for(request.history)) if request.history else "")
+    parts += [os.path.abspath(request.stats_dir) if request.stats_dir else "", request.site]
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def report_blob(report: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    report.to_pickle(buffer)
+    return buffer.getvalue()
+
+
+class JobQueue:
+    def __init__(self, path: str):
+        self.path = path
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        if "retries" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN retries INTEGER NOT NULL DEFAULT 0")
+        return conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # Queue a request, or join the same day's identical job. A duplicate keeps the higher
+    # of the two priorities; its output is written now if the job is already done.
+    def submit(self, request: JobRequest, priority: int = 0, output: str | None = None,
+               fmt: str | None = None) -> Submission:
+        missing = [key for key in request.paths if key not in SOURCE_KEYS]
+        if missing or not request.paths:
+            raise ValueError("Please provide at least one file (Grounding / Inbound / Export / Cancel / Transfer).")
+        key = input_key(request)
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, status FROM jobs WHERE input_key = ? AND status != 'failed' "
+                "ORDER BY job_id DESC LIMIT 1",
+                (key,),
+            ).fetchone()
+            if row is None:
+                cur = conn.execute(
+                    "INSERT INTO jobs (input_key, request, priority, status, submitted_at) VALUES (?, ?, ?, 'queued', ?)",
+                    (key, json.dumps(asdict(request)), priority, now()),
+                )
+                submission = Submission(cur.lastrowid, "queued")
+            else:
+                conn.execute("UPDATE jobs SET submissions = submissions + 1, priority = MAX(priority, ?) "
+                             "WHERE job_id = ?", (priority, row[0]))
+                submission = Submission(row[0], row[1], duplicate=True)
+            if output is not None:
+                # A finished job's output is claimed here and written below; otherwise the runner writes it.
+                conn.execute("INSERT OR REPLACE INTO outputs (job_id, path, format, written_at) VALUES (?, ?, ?, ?)",
+                             (submission.job_id, os.path.abspath(output), fmt,
+                              now() if submission.status == "done" else None))
+        if output is not None and submission.status == "done":
+            self.write_output(submission.job_id, self.result(submission.job_id), os.path.abspath(output), fmt)
+            submission.written.append(os.path.abspath(output))
+        return submission
+
+    # Take the next queued job, highest priority first, oldest first within a priority.
+    def claim(self) -> Job | None:
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, request, priority, retries FROM jobs WHERE status = 'queued' "
+                "ORDER BY priority DESC, job_id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE job_id = ?", (now(), row[0]))
+        return Job(row[0], JobRequest(**json.loads(row[1])), row[2], row[3])
+
+    # Take the runner lease for owner (host, pid), unless another runner's lease is still fresh.
+    def acquire_lease(self, owner: tuple[str, int]):
+        with self.transaction() as conn:
+            row = conn.execute("SELECT host, pid, heartbeat FROM runner").fetchone()
+            if row is not None and (row[0], row[1]) != owner and time.time() - row[2] < LEASE_SECONDS:
+                raise RuntimeError(f"Another runner (pid {row[1]} on {row[0]}) is working on {self.path}.")
+            conn.execute("INSERT OR REPLACE INTO runner (lease, host, pid, heartbeat) VALUES (1, ?, ?, ?)",
+                         (*owner, time.time()))
+
+    # False when the lease has been lost, i.e. another runner took over an expired lease.
+    def renew_lease(self, owner: tuple[str, int]) -> bool:
+        with self.transaction() as conn:
+            return conn.execute("UPDATE runner SET heartbeat = ? WHERE host = ? AND pid = ?",
+                                (time.time(), *owner)).rowcount == 1
+
+    def release_lease(self, owner: tuple[str, int]):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM runner WHERE host = ? AND pid = ?", owner)
+
+    # Jobs left running by a runner that was stopped or crashed go back into the queue.
+    # Only call this while holding the runner lease.
+    def requeue_interrupted(self) -> int:
+        with self.transaction() as conn:
+            return conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL "
+                                "WHERE status = 'running'").rowcount
+
+    # Put a claimed job back in the queue; retried counts it against MAX_RETRIES.
+    def requeue(self, job_id: int, retried: bool = False):
+        with self.transaction() as conn:
+            conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL, retries = retries + ? "
+                         "WHERE job_id = ?", (int(retried), job_id))
+
+    # Store the result and return the outputs still to be written, as (path, format).
+    def finish(self, job_id: int, report: pd.DataFrame, summary: dict) -> list[tuple[str, str | None]]:
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO results (job_id, report) VALUES (?, ?)", (job_id, report_blob(report)))
+            conn.execute("UPDATE jobs SET status = 'done', finished_at = ?, summary = ?, error = NULL WHERE job_id = ?",
+                         (now(), json.dumps(summary, default=str), job_id))
+            outputs = conn.execute("SELECT path, format FROM outputs WHERE job_id = ? AND written_at IS NULL",
+                                   (job_id,)).fetchall()
+            conn.execute("UPDATE outputs SET written_at = ? WHERE job_id = ? AND written_at IS NULL", (now(), job_id))
+        return outputs
+
+    def fail(self, job_id: int, error: str):
+        with self.transaction() as conn:
+            conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE job_id = ?",
+                         (now(), error, job_id))
+
+    def write_output(self, job_id: int, report: pd.DataFrame, path: str, fmt: str | None):
+        try:
+            write_report(report, path, fmt)
+            error = None
+        except Exception as e:
+            error = str(e)
+        with contextlib.closing(self.connect()) as conn:
+            conn.execute("UPDATE outputs SET error = ? WHERE job_id = ? AND path = ?", (error, job_id, path))
+
+    def result(self, job_id: int) -> pd.DataFrame:
+        with contextlib.closing(self.connect()) as conn:
+            row = conn.execute("SELECT report FROM results WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Job {job_id} has no result ({self.status(job_id)['status']}).")
+        return pd.read_pickle(io.BytesIO(row[0]))
+
+    def status(self, job_id: int) -> dict:
+        jobs = self.jobs(job_id=job_id)
+        if jobs.empty:
+            raise ValueError(f"No job {job_id} in {self.path}.")
+        return jobs.iloc[0].to_dict()
+
+    def jobs(self, status: str | None = None, job_id: int | None = None, limit: int = 50) -> pd.DataFrame:
+        where, params = [], []
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if job_id is not None:
+            where.append("job_id = ?")
+            params.append(job_id)
+        sql = ("SELECT job_id, status, priority, submissions, retries, submitted_at, started_at, finished_at, "
+               f"summary, error FROM jobs {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY job_id DESC LIMIT ?")
+        with contextlib.closing(self.connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=[*params, limit])
+
+
+# Pool task: the check itself, without history or stats. Must stay a module-level function.
+def run_job(paths: dict[str, str], rules: RuleSet, cache_dir: str | None) -> tuple[pd.DataFrame, dict, str | None]:
+    cache = SourceCache(cache_dir) if cache_dir else None
+    result = run_check(paths, workers=1, cache=cache, rules=rules, run_log=False)
+    return result.today, result.source_upc_counts, result.cache_report
+
+
+class JobRunner:
+    def __init__(self, queue: JobQueue, workers: int | None = None, cache_dir: str | None = None,
+                 poll: float = DEFAULT_POLL_SECONDS, log=print):
+        self.queue = queue
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.poll = poll
+        self.log = log
+        # Jobs that were in a pool that broke with more than one job: they run alone.
+        self.suspects: set[int] = set()
+
+    # Run jobs until stop is set, or with once until the queue is empty. At most `workers`
+    # checks run at a time; finished ones are completed here, in this thread. Raises
+    # RuntimeError when another runner holds the queue's lease.
+    def run(self, stop: threading.Event | None = None, once: bool = False):
+        stop = stop or threading.Event()
+        owner = (socket.gethostname(), os.getpid())
+        self.queue.acquire_lease(owner)
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self.keep_lease, args=(owner, stop, stopped), daemon=True)
+        heartbeat.start()
+        running = {}
+        # A suspect claimed while other jobs run, waiting for the pool to drain.
+        held = None
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            requeued = self.queue.requeue_interrupted()
+            if requeued:
+                self.log(f"{requeued} interrupted job(s) queued again")
+            while True:
+                while len(running) < self.workers and not stop.is_set() and not self.alone(running):
+                    job, held = held or self.queue.claim(), None
+                    if job is None:
+                        break
+                    if job.job_id in self.suspects and running:
+                        held = job
+                        break
+                    try:
+                        rules = load_rules(rules_path_for(job.request))
+                    except Exception as e:
+                        self.queue.fail(job.job_id, f"Error in rules: {e}")
+                        continue
+                    try:
+                        future = executor.submit(run_job, job.request.paths, rules, self.cache_dir)
+                    except BrokenProcessPool:
+                        self.queue.requeue(job.job_id)
+                        if running:
+                            # Their futures fail too; the pool is rebuilt once they are collected.
+                            break
+                        executor = self.rebuild(executor)
+                        continue
+                    running[future] = (job, rules, datetime.datetime.now())
+                    self.log(f"job {job.job_id} started (priority {job.priority})")
+                if not running:
+                    if held is not None and not stop.is_set():
+                        continue
+                    if once or stop.is_set():
+                        break
+                    stop.wait(self.poll)
+                    continue
+                done, _ = wait(running, timeout=self.poll, return_when=FIRST_COMPLETED)
+                lost = self.complete_all(done, running)
+                if lost:
+                    # The rest of the broken pool's jobs fail at once; collect them too.
+                    wait(running)
+                    lost += self.complete_all(list(running), running)
+                    self.requeue_lost(lost)
+                    executor = self.rebuild(executor)
+        finally:
+            if held is not None:
+                self.queue.requeue(held.job_id)
+            executor.shutdown(wait=True, cancel_futures=True)
+            stopped.set()
+            heartbeat.join()
+            self.queue.release_lease(owner)
+
+    def keep_lease(self, owner: tuple[str, int], stop: threading.Event, stopped: threading.Event):
+        while not stopped.wait(HEARTBEAT_SECONDS):
+            if not self.queue.renew_lease(owner):
+                # Only possible after this process stalled for longer than the lease.
+                self.log("runner lease lost to another runner; stopping")
+                stop.set()
+                return
+
+    def rebuild(self, executor: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.log("worker process died; pool restarted")
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    # Complete the given finished futures and drop them from running. Returns the jobs the
+    # pool broke under.
+    def complete_all(self, futures, running: dict) -> list[Job]:
+        lost = []
+        for future in futures:
+            job, rules, started = running.pop(future)
+            if self.complete(future, job, rules, started):
+                lost.append(job)
+            else:
+                self.suspects.discard(job.job_id)
+        return lost
+
+    # True while a suspect job runs: nothing else is started next to it.
+    def alone(self, running: dict) -> bool:
+        return any(job.job_id in self.suspects for job, _, _ in running.values())
+
+    # Queue the jobs of a broken pool again. Only a job that ran alone is charged a retry.
+    def requeue_lost(self, jobs: list[Job]):
+        if len(jobs) > 1:
+            for job in jobs:
+                self.suspects.add(job.job_id)
+                self.queue.requeue(job.job_id)
+            self.log(f"jobs {', '.join(str(job.job_id) for job in jobs)} lost their worker pool; "
+                     "queued again to run one at a time")
+            return
+        job = jobs[0]
+        if job.retries < MAX_RETRIES:
+            self.suspects.add(job.job_id)
+            self.queue.requeue(job.job_id, retried=True)
+            self.log(f"job {job.job_id} lost its worker process; queued again")
+        else:
+            self.suspects.discard(job.job_id)
+            self.queue.fail(job.job_id, "The worker process died (out of memory?)")
+            self.log(f"job {job.job_id} failed: worker process died")
+
+    # Fold a finished check into the shared history and stats, then store its result.
+    # Returns True when the pool broke under the job (see requeue_lost()).
+    def complete(self, future, job: Job, rules: RuleSet, started: datetime.datetime) -> bool:
+        request = job.request
+        try:
+            today, counts, cache_report = future.result()
+        except BrokenProcessPool:
+            return True
+        except Exception as e:
+            self.queue.fail(job.job_id, f"{type(e).__name__}: {e}")
+            self.log(f"job {job.job_id} failed: {e}")
+            return False
+        try:
+            report, history_error = today, None
+            if request.history:
+                try:
+                    # One ledger run per site and day: a changed re-run replaces the site's earlier one.
+                    report = merge_history(today, request.history, rules,
+                                           origin=f"check:{request.site}" if request.site else "check")
+                except Exception as e:
+                    # As in run_check(), a broken history file does not lose today's report.
+                    history_error = f"Error updating {os.path.basename(request.history)}: {e}"
+            if request.stats_dir:
+                result = CheckResult(report=report, today=today, source_upc_counts=counts)
+                record_stats(run_counts(result, datetime.date.today(), request.site), request.stats_dir)
+        except Exception as e:
+            self.queue.fail(job.job_id, f"{type(e).__name__}: {e}")
+            self.log(f"job {job.job_id} failed: {e}")
+            return False
+
+        summary = {
+            "discrepancies": len(report),
+            "today": len(today),
+            "source_upc_counts": counts,
+            "history_error": history_error,
+            "cache": cache_report,
+            "seconds": round((datetime.datetime.now() - started).total_seconds(), 2),
+        }
+        for path, fmt in self.queue.finish(job.job_id, report, summary):
+            self.queue.write_output(job.job_id, report, path, fmt)
+        self.log(f"job {job.job_id} done: {len(report)} discrepancies in {summary['seconds']:.1f} s")
+        return False
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Queue reconciliation jobs and run them one pool at a time.")
+    parser.add_argument("--queue", help=f"queue database (default: {QUEUE_FILENAME} next to this program)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="queue a check")
+    submit.add_argument("--input-dir", help="folder to search for the default export filenames")
+    for key in DEFAULT_FILES:
+        submit.add_argument(f"--{key.lower()}", help=DEFAULT_FILES[key])
+    submit.add_argument("-o", "--output", help="report file written when the job finishes")
+    submit.add_argument("--format", choices=REPORT_FORMATS, help="report format (default: from the output extension)")
+    submit.add_argument("--priority", type=int, default=0, help="higher runs first (default 0)")
+    submit.add_argument("--rules", help=f"discrepancy rule config (default: {RULES_FILENAME} next to this program, if present)")
+    submit.add_argument("--stats-dir", help="record the run's counts in discrepancy_stats.db in this folder")
+    submit.add_argument("--site", default="", help="site name stored with the stats records")
+
+    run = commands.add_parser("run", help="execute queued jobs")
+    run.add_argument("--workers", type=int, help="checks run at once (default: one per CPU)")
+    run.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    run.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS,
+                     help=f"seconds between looks at an empty queue (default {DEFAULT_POLL_SECONDS:g})")
+    run.add_argument("--cache-dir", help="parsed-source cache folder (default: source_cache next to this program)")
+    run.add_argument("--no-cache", action="store_true", help="parse every source from scratch")
+
+    status = commands.add_parser("status", help="list jobs")
+    status.add_argument("job_id", type=int, nargs="?")
+    status.add_argument("--status", choices=STATUSES)
+    status.add_argument("--limit", type=int, default=50)
+
+    result = commands.add_parser("result", help="write a finished job's report")
+    result.add_argument("job_id", type=int)
+    result.add_argument("-o", "--output", required=True)
+    result.add_argument("--format", choices=REPORT_FORMATS)
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.queue or default_queue_path())
+    try:
+        if args.command == "submit":
+            paths = find_default_files(args.input_dir) if args.input_dir else {}
+            for key in DEFAULT_FILES:
+                value = getattr(args, key.lower())
+                if value:
+                    paths[key] = value
+            history = paths.pop("History", None)
+            request = JobRequest({k: os.path.abspath(p) for k, p in paths.items()},
+                                 history=os.path.abspath(history) if history else None,
+                                 rules=os.path.abspath(args.rules) if args.rules else None,
+                                 stats_dir=os.path.abspath(args.stats_dir) if args.stats_dir else None, site=args.site)
+            submission = queue.submit(request, args.priority, args.output, args.format)
+            if submission.duplicate:
+                print(f"Same inputs as job {submission.job_id} ({submission.status}); not queued again")
+            else:
+                print(f"Job {submission.job_id} queued")
+            for path in submission.written:
+                print(f"Report written to {path}")
+        elif args.command == "run":
+            runner = JobRunner(queue, args.workers, None if args.no_cache else (args.cache_dir or default_cache_dir()),
+                               args.poll, log=lambda line: print(line, flush=True))
+            try:
+                runner.run(once=args.once)
+            except KeyboardInterrupt:
+                pass
+        elif args.command == "status":
+            jobs = queue.jobs(args.status, args.job_id, args.limit)
+            print(jobs.drop(columns=["summary"]).to_string(index=False) if not jobs.empty else "No jobs")
+            if args.job_id is not None and not jobs.empty and jobs.iloc[0]["summary"]:
+                print(json.dumps(json.loads(jobs.iloc[0]["summary"]), indent=2))
+        else:
+            write_report(queue.result(args.job_id), args.output, args.format)
+            print(f"Report of job {args.job_id} written to {args.output}")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
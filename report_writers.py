@@ -0,0 +1,112 @@
+import importlib.util
+import os
+
+import pandas as pd
+
+# Report writers, chosen by format name or output extension.
+#
+#   xlsx     streamed row by row: xlsxwriter in constant_memory mode when installed,
+#            otherwise openpyxl's write-only workbook
+#   csv      UTF-8 with BOM (opens correctly in Excel), written in chunks
+#   parquet  zstd-compressed, for downstream analytics (needs pyarrow or fastparquet)
+#
+# Rows are converted a chunk at a time, so the writers add a bounded amount of
+# memory on top of the DataFrame itself.
+
+CHUNK_ROWS = 50_000
+EXCEL_MAX_ROWS = 1_048_576
+
+REPORT_EXTENSIONS = {".xlsx": "xlsx", ".csv": "csv", ".parquet": "parquet"}
+REPORT_FORMATS = tuple(REPORT_EXTENSIONS.values())
+
+# Save dialog entries, first one is the default.
+REPORT_FILETYPES = [("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("Parquet files", "*.parquet")]
+
+
+def report_format(path: str, fmt: str | None = None) -> str:
+    if fmt is not None:
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format: {fmt}")
+        return fmt
+    return REPORT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "xlsx")
+
+
+# Cell values for one chunk: NaN/NA become empty cells, numpy scalars become Python ones.
+def _chunk_rows(df: pd.DataFrame, chunk_rows: int):
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].astype(object)
+        yield from chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def write_csv(df: pd.DataFrame, path: str, chunk_rows: int = CHUNK_ROWS):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        df.iloc[:0].to_csv(f, index=False)
+        for start in range(0, len(df), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(f, index=False, header=False)
+
+
+def write_xlsx(df: pd.DataFrame, path: str, chunk_rows: int = CHUNK_ROWS):
+    if len(df) + 1 > EXCEL_MAX_ROWS:
+        raise ValueError(f"{len(df)} rows do not fit in one Excel sheet; save the report as CSV or Parquet.")
+    if importlib.util.find_spec("xlsxwriter") is not None:
+        _write_xlsx_xlsxwriter(df, path, chunk_rows)
+    else:
+        _write_xlsx_openpyxl(df, path, chunk_rows)
+
+
+def _write_xlsx_xlsxwriter(df, path, chunk_rows):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        sheet = workbook.add_worksheet("Sheet1")
+        sheet.write_row(0, 0, [str(c) for c in df.columns], workbook.add_format({"bold": True}))
+        for r, row in enumerate(_chunk_rows(df, chunk_rows), start=1):
+            sheet.write_row(r, 0, row)
+    finally:
+        workbook.close()
+
+
+def _write_xlsx_openpyxl(df, path, chunk_rows):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    header = []
+    for c in df.columns:
+        cell = WriteOnlyCell(sheet, value=str(c))
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+    for row in _chunk_rows(df, chunk_rows):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def parquet_engine() -> str | None:
+    for name in ("pyarrow", "fastparquet"):
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return None
+
+
+def write_parquet(df: pd.DataFrame, path: str, chunk_rows: int = CHUNK_ROWS):
+    engine = parquet_engine()
+    if engine is None:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); save the report as CSV or xlsx.")
+    # Mixed-type object columns (e.g. UPCs read as numbers and text) are stored as text.
+    df = df.copy(deep=False)
+    for c in df.columns:
+        values = df[c]
+        if values.dtype == object and values.dropna().map(type).nunique() > 1:
+            df[c] = values.astype(str).where(values.notna(), None)
+    df.to_parquet(path, engine=engine, compression="zstd" if engine == "pyarrow" else "gzip", index=False)
+
+
+WRITERS = {"xlsx": write_xlsx, "csv": write_csv, "parquet": write_parquet}
+
+
+def write_report(df: pd.DataFrame, path: str, fmt: str | None = None, chunk_rows: int = CHUNK_ROWS):
+    WRITERS[report_format(path, fmt)](df, path, chunk_rows)
@@ -0,0 +1,207 @@
+import contextlib
+import datetime
+import importlib.util
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+# Per-stage instrumentation of a check run.
+#
+# Every stage records wall time, process CPU time, input/output rows and the process
+# memory after it (resident set and its high-water mark, which are free to read).
+# With trace_memory, each stage also gets the peak of Python/numpy allocations made
+# during it from tracemalloc; that slows parsing down several times, so it is opt-in.
+# The records are appended to a JSON-lines run log next to the report.
+
+RUN_LOG_FILENAME = "discrepancy_run_log.jsonl"
+# Numeric columns of the stage table (CLI --details and the GUI's run details panel).
+# Both show the process peak; the tracemalloc peak is added only for traced runs.
+STAGE_FIELDS = ["wall_s", "cpu_s", "rows_in", "rows_out", "rss_mb", "peak_rss_mb"]
+TRACED_FIELD = "traced_peak_mb"
+STAGE_HEADINGS = {
+    "wall_s": "wall s", "cpu_s": "cpu s", "rows_in": "rows in", "rows_out": "rows out",
+    "rss_mb": "RSS MB", "peak_rss_mb": "peak MB", TRACED_FIELD: "traced MB",
+}
+
+
+# Resident set size and its peak so far, in MB (None where the platform does not say).
+def process_memory() -> tuple[float | None, float | None]:
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage",
+                )
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters),
+                                                        counters.cb):
+            return None, None
+        return counters.WorkingSetSize / 2**20, counters.PeakWorkingSetSize / 2**20
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    try:
+        with open("/proc/self/statm") as f:
+            current_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return None, peak_mb
+    # ru_maxrss is only updated now and then, so it can trail the current size.
+    return current_mb, max(peak_mb, current_mb)
+
+
+class RunMetrics:
+    def __init__(self, trace_memory: bool = False):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = datetime.datetime.now().isoformat(timespec="seconds")
+        self.trace_memory = trace_memory
+        self.stages: list[dict] = []
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+
+    # Time the enclosed block as one stage. The block may set record["rows_out"].
+    @contextlib.contextmanager
+    def stage(self, name: str, source: str | None = None, rows_in: int | None = None):
+        record = {"stage": name, "source": source, "rows_in": rows_in, "rows_out": None, "status": "ok"}
+        tracing = self.trace_memory
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            raise
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall, 4)
+            record["cpu_s"] = round(time.process_time() - cpu, 4)
+            if tracing:
+                record["traced_peak_mb"] = round((tracemalloc.get_traced_memory()[1] - base) / 2**20, 2)
+            rss, peak = process_memory()
+            record["rss_mb"] = round(rss, 1) if rss is not None else None
+            record["peak_rss_mb"] = round(peak, 1) if peak is not None else None
+            self.stages.append(record)
+
+    # Records measured elsewhere, e.g. in a pool worker.
+    def extend(self, records: list[dict]):
+        self.stages.extend(records)
+
+    def close(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def failed_stage(self) -> dict | None:
+        return next((r for r in reversed(self.stages) if r["status"] == "error"), None)
+
+    def summary(self, status: str, **extra) -> dict:
+        return {
+            "stage": "run",
+            "status": status,
+            "started": self.started,
+            "wall_s": round(time.perf_counter() - self._wall0, 4),
+            "cpu_s": round(time.process_time() - self._cpu0, 4),
+            **extra,
+        }
+
+    # Append every stage plus a closing "run" line, all tagged with the run id.
+    def write_log(self, path: str, summary: dict):
+        with open(path, "a", encoding="utf-8") as f:
+            for record in [*self.stages, summary]:
+                f.write(json.dumps({"run": self.run_id, **record}, default=str) + "\n")
+
+
+def run_folder(save_path: str | None) -> str:
+    return os.path.dirname(os.path.abspath(save_path)) if save_path else os.getcwd()
+
+
+def run_log_path(save_path: str | None) -> str:
+    return os.path.join(run_folder(save_path), RUN_LOG_FILENAME)
+
+
+def profile_base(save_path: str | None, run_id: str) -> str:
+    return os.path.join(run_folder(save_path), f"discrepancy_profile_{run_id}")
+
+
+# "parse:Cancel", "merge", ...
+def stage_label(record: dict) -> str:
+    return f"{record['stage']}:{record['source']}" if record.get("source") else record["stage"]
+
+
+# Profile the enclosed block. pyinstrument (sampling, low overhead) is used when installed
+# and writes <base>.profile.html; otherwise cProfile writes <base>.prof and a text summary.
+# Only the calling thread is profiled. yields a list that receives the written paths.
+@contextlib.contextmanager
+def profiled(base: str):
+    written: list[str] = []
+    if importlib.util.find_spec("pyinstrument") is not None:
+        from pyinstrument import Profiler
+
+        profiler = Profiler(interval=0.001)
+        profiler.start()
+        try:
+            yield written
+        finally:
+            profiler.stop()
+            path = base + ".profile.html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            written.append(path)
+        return
+
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield written
+    finally:
+        profiler.disable()
+        profiler.dump_stats(base + ".prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(30)
+        with open(base + ".profile.txt", "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        written.extend([base + ".prof", base + ".profile.txt"])
+
+
+def format_value(value) -> str:
+    if value is None:
+        return ""
+    return f"{value:.3f}" if isinstance(value, float) and value < 100 else str(value)
+
+
+def stage_fields(stages: list[dict]) -> list[str]:
+    traced = any(r.get(TRACED_FIELD) is not None for r in stages)
+    return STAGE_FIELDS + ([TRACED_FIELD] if traced else [])
+
+
+def format_stages(stages: list[dict]) -> str:
+    fields = stage_fields(stages)
+    lines = [f"{'stage':<20} " + " ".join(f"{STAGE_HEADINGS[k]:>9}" for k in fields) + "  status"]
+    for r in stages:
+        status = r.get("cache") or r.get("delta") or r["status"]
+        if r.get("error"):
+            status += f" - {r['error']}"
+        values = " ".join(f"{format_value(r.get(k)):>9}" for k in fields)
+        lines.append(f"{stage_label(r):<20} {values}  {status}")
+    return "\n".join(lines)
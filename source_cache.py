@@ -0,0 +1,140 @@
+import hashlib
+import importlib.util
+import os
+import pickle
+import shutil
+import tempfile
+
+import pandas as pd
+
+# On-disk cache of parsed, aggregated source summaries.
+#
+# Each entry is one DataFrame named by a hash of the source key, path, size, mtime
+# and file content. Entries are written atomically and the file mtime doubles as
+# the LRU timestamp, so several app instances can share the folder without an index.
+#
+# With pyarrow installed, entries are Arrow IPC (feather) files, which load in
+# milliseconds and never run code from the file. Without it they are pickles:
+# unpickling a crafted file runs arbitrary code, so the cache folder must then
+# only be writable by people you trust.
+
+CACHE_DIRNAME = "source_cache"
+# Bump when a parser or loader changes what it produces.
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+ENTRY_FORMAT = "feather" if importlib.util.find_spec("pyarrow") is not None else "pickle"
+ENTRY_SUFFIXES = {"feather": ".feather", "pickle": ".pkl"}
+ENTRY_SUFFIX = ENTRY_SUFFIXES[ENTRY_FORMAT]
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def entry_key(source: str, path: str) -> str:
+    st = os.stat(path)
+    parts = [str(CACHE_VERSION), source, os.path.abspath(path), str(st.st_size), str(st.st_mtime_ns), file_digest(path)]
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class SourceCache:
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES, entry_format: str = ENTRY_FORMAT):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entry_format = entry_format
+        self.hits: list[str] = []
+        self.misses: list[str] = []
+        # Sources whose summary could not be written, and why.
+        self.unsaved: list[str] = []
+        self.error: str | None = None
+        self.sources: dict[str, str] = {}
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIXES[self.entry_format])
+
+    def get(self, source: str, path: str) -> tuple[str, pd.DataFrame | None]:
+        key = entry_key(source, path)
+        self.sources[key] = source
+        entry = self._entry_path(key)
+        try:
+            if self.entry_format == "feather":
+                df = pd.read_feather(entry)
+            else:
+                df = pd.read_pickle(entry)
+            os.utime(entry)
+        except FileNotFoundError:
+            self.misses.append(source)
+            return key, None
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError, ImportError):
+            # Truncated, corrupt or produced by an incompatible pandas: treat as a miss and
+            # drop the entry, so put() writes a good one.
+            self.misses.append(source)
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+            return key, None
+        self.hits.append(source)
+        return key, df
+
+    # The cache is optional: a read-only, full or unreachable folder leaves the source
+    # uncached instead of failing the check.
+    def put(self, key: str, df: pd.DataFrame):
+        tmp = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            if self.entry_format == "feather":
+                df.to_feather(tmp)
+            else:
+                df.to_pickle(tmp)
+            os.replace(tmp, self._entry_path(key))
+            self.evict()
+        except OSError as e:
+            self.unsaved.append(self.sources.get(key, key))
+            self.error = e.strerror or str(e)
+        finally:
+            if tmp is not None and os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+    # Drop least recently used entries until the cache fits in max_bytes.
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(tuple(ENTRY_SUFFIXES.values())):
+                full = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, full))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def report(self) -> str:
+        text = f"{len(self.hits)} hit, {len(self.misses)} miss"
+        if self.hits:
+            text += " (cached: " + ", ".join(self.hits) + ")"
+        if self.unsaved:
+            text += f"; not saved: {', '.join(self.unsaved)} ({self.error})"
+        return text
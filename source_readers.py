@@ -0,0 +1,70 @@
+import functools
+import importlib.util
+import io
+
+import pandas as pd
+
+# Columns the pipeline actually uses from each tabular export. Wide WMS exports
+# carry dozens more, which are never materialized.
+SOURCE_COLUMNS = {
+    "Inbound": ["UPC", "Inbound Qty"],
+    "Export": ["Outbound SN", "UPC after value-added", "Value-added Num."],
+    "Transfer": ["UPC", "transfer Num."],
+}
+
+# Tabular sources the WMS can also export as CSV, plain or gzip-compressed. They are
+# streamed in chunks of CSV_CHUNK_ROWS rows.
+CSV_SOURCES = ("Inbound", "Export", "Transfer")
+CSV_SUFFIXES = (".csv", ".csv.gz")
+CSV_CHUNK_ROWS = 200_000
+
+UPC_COLUMNS = {
+    "Inbound": "UPC",
+    "Export": "UPC after value-added",
+    "Transfer": "UPC",
+}
+
+# UPC columns keep pandas' inferred type on purpose: numeric UPCs must stringify
+# exactly as before ("123", not "123.0") when the summaries are keyed by str.
+SOURCE_DTYPES = {
+    "Inbound": {"Inbound Qty": "float64"},
+    "Export": {"Outbound SN": "object", "Value-added Num.": "float64"},
+    "Transfer": {"transfer Num.": "float64"},
+}
+
+
+# calamine (Rust, pandas >= 2.2) parses xlsx several times faster than openpyxl.
+# Without it, pandas' openpyxl reader is used, which already streams in read-only mode.
+@functools.lru_cache(maxsize=None)
+def excel_engine() -> str:
+    major, minor = (int(x) for x in pd.__version__.split(".")[:2])
+    if (major, minor) >= (2, 2) and importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+
+def read_excel(path: str, engine: str | None = None, **kwargs) -> pd.DataFrame:
+    return pd.read_excel(path, engine=engine or excel_engine(), **kwargs)
+
+
+# Read only the required columns of a tabular source with explicit dtypes.
+def read_source_columns(key: str, path: str, engine: str | None = None) -> pd.DataFrame:
+    return read_excel(path, engine=engine, usecols=SOURCE_COLUMNS[key], dtype=SOURCE_DTYPES[key])
+
+
+def is_csv(path: str) -> bool:
+    return path.lower().endswith(CSV_SUFFIXES)
+
+
+# Chunks of a CSV export with the same columns and types as read_source_columns().
+# UPCs are read as text: a CSV cell is what Excel would show, leading zeros included.
+def read_csv_chunks(key: str, path: str, chunk_rows: int = CSV_CHUNK_ROWS):
+    return pd.read_csv(path, usecols=SOURCE_COLUMNS[key], dtype={UPC_COLUMNS[key]: str, **SOURCE_DTYPES[key]},
+                       chunksize=chunk_rows, encoding="utf-8-sig")
+
+
+# Whole CSV lines after the header, e.g. the rows appended since a delta check. They are
+# parsed behind the file's header line, so short or odd rows come out as in a full read.
+def read_csv_rows(key: str, header: bytes, data: bytes) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(header + data), usecols=SOURCE_COLUMNS[key],
+                       dtype={UPC_COLUMNS[key]: str, **SOURCE_DTYPES[key]}, encoding="utf-8-sig")
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Startup timing for the desktop app.
+#
+# The app calls mark() as it reaches each startup phase. When GDC_STARTUP_REPORT
+# names a file, the marks are written there once the statistics have loaded, and
+# with GDC_STARTUP_EXIT=1 the app then quits. Running this module launches the
+# app that way under -X importtime and prints the import breakdown and the time
+# to first paint, failing when it exceeds the budget:
+#
+#   python startup_profile.py --budget 2.0
+#
+# This module is imported first by the app, so it must stay stdlib-only.
+
+REPORT_ENV = "GDC_STARTUP_REPORT"
+EXIT_ENV = "GDC_STARTUP_EXIT"
+APP_SCRIPT = "Auto_Grounding_Discrepancy_Checker_app_2_0.py"
+DEFAULT_BUDGET = 2.0
+
+_t0 = time.perf_counter()
+_marks: dict[str, float] = {}
+_first_paint_wall: float | None = None
+
+
+# Seconds since this module was imported, recorded under name.
+def mark(name: str):
+    global _first_paint_wall
+    _marks[name] = time.perf_counter() - _t0
+    if name == "first_paint":
+        _first_paint_wall = time.time()
+
+
+# Write the marks if a report was requested; True when the app should quit now.
+def write_report() -> bool:
+    path = os.environ.get(REPORT_ENV)
+    if not path:
+        return False
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"marks": _marks, "first_paint_wall": _first_paint_wall}, f)
+    return os.environ.get(EXIT_ENV) == "1"
+
+
+# Cumulative seconds per top-level package from -X importtime output, largest first.
+def parse_importtime(stderr: str) -> list[tuple[str, float]]:
+    totals: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:]
+        if name.startswith(" "):
+            continue
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0.0) + int(parts[1]) / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+# Launch the app once and collect its marks. A frozen build is profiled by passing its
+# executable as command; the import breakdown is then unavailable.
+def profile_startup(command: list[str] | None = None, timeout: float = 120) -> dict:
+    if command is None:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), APP_SCRIPT)
+        command = [sys.executable, "-X", "importtime", script]
+
+    fd, report_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        env = {**os.environ, REPORT_ENV: report_path, EXIT_ENV: "1"}
+        launched = time.time()
+        proc = subprocess.run(command, env=env, capture_output=True, text=True, timeout=timeout)
+        with open(report_path, encoding="utf-8") as f:
+            text = f.read()
+        if not text:
+            raise RuntimeError(f"App exited ({proc.returncode}) without a startup report:\n{proc.stderr[-2000:]}")
+        report = json.loads(text)
+    finally:
+        os.remove(report_path)
+
+    report["imports"] = parse_importtime(proc.stderr)
+    report["launch_to_paint"] = report["first_paint_wall"] - launched if report["first_paint_wall"] else None
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the app's cold start against a time budget.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help=f"maximum seconds from launch to first paint (default {DEFAULT_BUDGET})")
+    parser.add_argument("--top", type=int, default=10, help="number of imports to list")
+    parser.add_argument("--exe", help="profile a frozen build instead of the script")
+    args = parser.parse_args(argv)
+
+    report = profile_startup([args.exe] if args.exe else None)
+
+    if report["imports"]:
+        print("Imports until the statistics loaded (cumulative):")
+        for name, seconds in report["imports"][:args.top]:
+            print(f"  {name:<30} {seconds:>7.3f} s")
+    print("App phases (since startup_profile import):")
+    for name, seconds in report["marks"].items():
+        print(f"  {name:<30} {seconds:>7.3f} s")
+
+    paint = report["launch_to_paint"]
+    if paint is None:
+        print("No first paint recorded.")
+        return 1
+    verdict = "OK" if paint <= args.budget else "OVER BUDGET"
+    print(f"Launch to first paint: {paint:.3f} s (budget {args.budget:.3f} s) {verdict}")
+    return 0 if paint <= args.budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
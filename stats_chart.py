@@ -0,0 +1,86 @@
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+# Mismatch-rate chart for the statistics tab.
+#
+# The series come from a single (period x source) aggregation with the rates
+# divided column-wise, and RateChart keeps one Figure alive between clicks:
+# line artists are moved with set_data(), so re-charting only redraws.
+
+# Period start for each resolution; "day" keeps the recorded dates.
+RESOLUTIONS = {"day": None, "week": "W", "month": "M"}
+TICK_FORMATS = {"day": "%Y-%m-%d", "week": "%Y-%m-%d", "month": "%Y-%m"}
+# Bar charts label at most this many periods on the x axis.
+MAX_BAR_LABELS = 30
+
+
+# Mismatch rate per period (rows) and source (columns) from stats records.
+# Rates are summed mismatches over summed UPCs, 0 where a source has no UPCs.
+def chart_series(df: pd.DataFrame, sources: list[str], resolution: str = "day") -> pd.DataFrame:
+    dates = pd.to_datetime(df["Date"])
+    freq = RESOLUTIONS[resolution]
+    period = dates.dt.to_period(freq).dt.start_time if freq else dates
+
+    sums = df.groupby([period.rename("Period"), df["Source"]])[["MismatchCount", "TotalUPC"]].sum()
+    mismatch = sums["MismatchCount"].unstack(fill_value=0).reindex(columns=sources, fill_value=0)
+    total = sums["TotalUPC"].unstack(fill_value=0).reindex(columns=sources, fill_value=0)
+
+    rate = np.divide(mismatch.to_numpy(dtype="float64"), total.to_numpy(dtype="float64"),
+                     out=np.zeros(mismatch.shape), where=total.to_numpy() > 0)
+    return pd.DataFrame(rate, index=mismatch.index, columns=sources)
+
+
+class RateChart:
+    def __init__(self, figsize=(6, 3), dpi=100):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.ax = self.figure.add_subplot(111)
+        self.mode = None
+        self.lines = {}
+
+    def update(self, series: pd.DataFrame, mode: str, resolution: str = "day", title: str = ""):
+        if mode != self.mode:
+            self.ax.clear()
+            self.lines = {}
+            self.mode = mode
+        if mode == "line":
+            self._update_lines(series, resolution)
+        else:
+            self._draw_bars(series, resolution)
+
+        self.ax.set_xlabel("Date")
+        self.ax.set_ylabel("Mismatch Rate")
+        self.ax.set_title(title)
+        self.ax.legend()
+        self.figure.autofmt_xdate()
+
+    # Existing lines are moved in place; sources that left the selection are removed.
+    def _update_lines(self, series, resolution):
+        x = mdates.date2num(series.index.to_pydatetime())
+        for src in list(self.lines):
+            if src not in series.columns:
+                self.lines.pop(src).remove()
+        for src in series.columns:
+            y = series[src].to_numpy()
+            if src in self.lines:
+                self.lines[src].set_data(x, y)
+            else:
+                (self.lines[src],) = self.ax.plot(x, y, marker="o", label=src)
+        self.ax.xaxis_date()
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter(TICK_FORMATS[resolution]))
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    # Grouped bars, one bar() call per source over all periods.
+    def _draw_bars(self, series, resolution):
+        self.ax.clear()
+        x_idx = np.arange(len(series))
+        n_src = max(len(series.columns), 1)
+        width = 0.8 / n_src
+        for i, src in enumerate(series.columns):
+            self.ax.bar(x_idx + (i - (n_src - 1) / 2) * width, series[src].to_numpy(), width=width, label=src)
+
+        step = max(1, -(-len(series) // MAX_BAR_LABELS))
+        self.ax.set_xticks(x_idx[::step])
+        self.ax.set_xticklabels(series.index[::step].strftime(TICK_FORMATS[resolution]), rotation=45, ha="right")
@@ -0,0 +1,178 @@
+import contextlib
+import datetime
+import os
+import sqlite3
+
+import pandas as pd
+
+# Daily discrepancy statistics in an append-only SQLite file.
+#
+# Adding a record is a single indexed INSERT instead of rewriting the whole
+# workbook. WAL mode plus a busy timeout lets several app instances append to
+# the same folder at once (on a local disk; SQLite locking is not reliable on
+# network shares). Excel is only written when the user exports.
+
+STATS_DB_FILENAME = "discrepancy_stats.db"
+LEGACY_STATS_FILENAME = "discrepancy_stats.xlsx"
+
+COLUMNS = ["Date", "Source", "MismatchCount", "TotalUPC", "Rate"]
+
+# Sort keys accepted by page(), mapped to table columns.
+SORT_COLUMNS = {
+    "date": "date",
+    "source": "source",
+    "mismatch": "mismatch_count",
+    "total": "total_upc",
+    "rate": "rate",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    source TEXT NOT NULL,
+    mismatch_count INTEGER NOT NULL,
+    total_upc INTEGER NOT NULL,
+    rate REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    site TEXT
+);
+CREATE INDEX IF NOT EXISTS stats_date_source ON stats(date, source);
+CREATE INDEX IF NOT EXISTS stats_source_date ON stats(source, date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class StatsStore:
+    def __init__(self, path: str):
+        self.path = path
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        # Stores created before batch runs have no site column (NULL = entered by hand).
+        if "site" not in {row[1] for row in conn.execute("PRAGMA table_info(stats)")}:
+            conn.execute("ALTER TABLE stats ADD COLUMN site TEXT")
+        return conn
+
+    def append(self, date: datetime.date, source: str, mismatch: int, total: int, rate: float):
+        self.append_many([(date, source, mismatch, total, rate)])
+
+    def append_many(self, records):
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        rows = [(d.isoformat(), s, int(m), int(t), float(r), now) for d, s, m, t, r in records]
+        with contextlib.closing(self.connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO stats (date, source, mismatch_count, total_upc, rate, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    # Records computed by a batch run, as (date, site, source, mismatch, total, rate). Earlier
+    # records for the same date, site and source are replaced, so re-running a batch is safe.
+    def replace_site_records(self, records):
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        rows = [(d.isoformat(), site, s, int(m), int(t), float(r), now) for d, site, s, m, t, r in records]
+        with contextlib.closing(self.connect()) as conn, conn:
+            conn.executemany("DELETE FROM stats WHERE date = ? AND site = ? AND source = ?",
+                             [row[:3] for row in rows])
+            conn.executemany(
+                "INSERT INTO stats (date, site, source, mismatch_count, total_upc, rate, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    @staticmethod
+    def _where(start, end, sources) -> tuple[str, list]:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(end.isoformat())
+        if sources is not None:
+            clauses.append(f"source IN ({', '.join('?' * len(sources))})")
+            params.extend(sources)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    # Records in insertion order, optionally limited to a date range and set of sources.
+    def query(self, start: datetime.date | None = None, end: datetime.date | None = None,
+              sources: list[str] | None = None) -> pd.DataFrame:
+        where, params = self._where(start, end, sources)
+        with contextlib.closing(self.connect()) as conn:
+            df = pd.read_sql_query(
+                "SELECT date, source, mismatch_count, total_upc, rate FROM stats" + where + " ORDER BY id",
+                conn,
+                params=params,
+            )
+        df.columns = COLUMNS
+        df["Date"] = pd.to_datetime(df["Date"]).dt.date
+        return df
+
+    # One page of display rows (date, source, mismatch, total, "12.3%"), formatted by SQLite
+    # so the cost does not depend on how many records the store holds.
+    def page(self, offset: int, limit: int, sort: str | None = None, descending: bool = False,
+             start: datetime.date | None = None, end: datetime.date | None = None,
+             sources: list[str] | None = None) -> list[tuple]:
+        where, params = self._where(start, end, sources)
+        direction = "DESC" if descending else "ASC"
+        order = f"{SORT_COLUMNS[sort]} {direction}, id {direction}" if sort else f"id {direction}"
+        with contextlib.closing(self.connect()) as conn:
+            return conn.execute(
+                "SELECT date, source, mismatch_count, total_upc, printf('%.1f%%', rate * 100) FROM stats"
+                + where + f" ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+
+    def count(self, start: datetime.date | None = None, end: datetime.date | None = None,
+              sources: list[str] | None = None) -> int:
+        where, params = self._where(start, end, sources)
+        with contextlib.closing(self.connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM stats" + where, params).fetchone()[0]
+
+    # One-time import of the old discrepancy_stats.xlsx, with the same column clean-up
+    # the app applied when loading it.
+    def migrate_excel(self, xlsx_path: str) -> int:
+        with contextlib.closing(self.connect()) as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+                return 0
+
+        df = pd.read_excel(xlsx_path)
+        for c in COLUMNS:
+            if c not in df.columns:
+                df[c] = datetime.date.today() if c == "Date" else 0
+        df = df[COLUMNS]
+        try:
+            df["Date"] = pd.to_datetime(df["Date"]).dt.date
+        except Exception:
+            df["Date"] = datetime.date.today()
+        df["Rate"] = df["Rate"].fillna(0.0)
+
+        records = list(df.itertuples(index=False, name=None))
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        with contextlib.closing(self.connect()) as conn, conn:
+            # Checked again inside the write transaction in case another instance migrated first.
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+                return 0
+            conn.executemany(
+                "INSERT INTO stats (date, source, mismatch_count, total_upc, rate, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(d.isoformat(), str(s), int(m), int(t), float(r), now) for d, s, m, t, r in records],
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (xlsx_path,))
+        return len(records)
+
+
+# Stats store in a folder, migrating a legacy discrepancy_stats.xlsx on first use.
+def open_stats(folder: str) -> StatsStore:
+    store = StatsStore(os.path.join(folder, STATS_DB_FILENAME))
+    legacy = os.path.join(folder, LEGACY_STATS_FILENAME)
+    if os.path.exists(legacy):
+        store.migrate_excel(legacy)
+    return store
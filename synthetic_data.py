@@ -0,0 +1,220 @@
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from cancel_parser import COUNTED_SHELF_CODE
+from discrepancy_engine import DEFAULT_FILES, QTY_COLUMNS, REPORT_COLUMNS, classify
+from discrepancy_rules import RuleSet
+
+# Synthetic source exports in the layouts of docs/data_format.md, together with the
+# per-UPC quantities they encode, so the expected report is known exactly.
+#
+#   Grounding  3-row blocks (UPC / name / shelf, qty, operator, time); a UPC's
+#              quantity may be split over several blocks
+#   Cancel     3-row records (no shelf code) and 4-row records with CUSTOM0, plus
+#              4-row records on real shelves, which are not counted
+#   Export     value-add rows without Outbound SN, plus outbound rows that are ignored
+#   Inbound / Transfer  one row per transaction with a few extra columns
+#
+# Every source UPC appears on `duplication` rows on average. `discrepancy_rate` is the
+# share of UPCs whose grounding quantity is made to disagree with the inbound total.
+
+DEFAULT_COVERAGE = {"Inbound": 0.7, "Export": 0.3, "Cancel": 0.1, "Transfer": 0.2}
+EXPECTED_FILENAME = "expected_report.csv"
+# Excel's row limit, header included.
+XLSX_MAX_ROWS = 1_048_576
+CANCEL_HEADER = "Cancel Order"
+
+
+@dataclass
+class SyntheticSources:
+    # Sheets as pandas reads them back (the cancel sheet without a header row).
+    sheets: dict[str, pd.DataFrame]
+    # One row per UPC with the merged quantities the sheets add up to.
+    truth: pd.DataFrame
+
+    # Without rules: the original three checks, restated here rather than taken from
+    # discrepancy_rules, so a regression there shows up as a mismatch.
+    def expected_report(self, rules: RuleSet | None = None) -> pd.DataFrame:
+        if rules is not None:
+            return classify(self.truth.copy(), rules)
+        total, grounding = self.truth["Total Inbound Qty"], self.truth["Grounding Qty"]
+        issue = np.select(
+            [(total == 0) & (grounding > 0), (grounding == 0) & (total > 0), total != grounding],
+            ["Missing Inbound", "Missing Grounding", "Quantity Mismatch"],
+            default=None,
+        )
+        report = self.truth.assign(Issue=issue)
+        return report[pd.notna(issue)][REPORT_COLUMNS].reset_index(drop=True)
+
+
+# Row index of each row of a source: every selected UPC repeated 1 + Poisson(duplication - 1) times.
+def _rows_for(selected: np.ndarray, duplication: float, rng) -> np.ndarray:
+    repeats = 1 + rng.poisson(max(duplication - 1, 0), size=len(selected))
+    return rng.permutation(np.repeat(selected, repeats))
+
+
+def generate_sources(n_upcs: int, duplication: float = 1.5, discrepancy_rate: float = 0.05,
+                     coverage: dict[str, float] | None = None, custom_shelf_rate: float = 0.2,
+                     shelved_cancel_rate: float = 0.3, outbound_rate: float = 0.3,
+                     seed: int = 0) -> SyntheticSources:
+    rng = np.random.default_rng(seed)
+    coverage = {**DEFAULT_COVERAGE, **(coverage or {})}
+    upcs = 10**11 + rng.choice(9 * 10**11, size=n_upcs, replace=False)
+    upc_cells = upcs.astype(object)
+    names = np.array([f"Product {u}" for u in upcs], dtype=object)
+
+    sheets = {}
+    totals = {}
+    for key in ["Inbound", "Export", "Cancel", "Transfer"]:
+        selected = np.flatnonzero(rng.random(n_upcs) < coverage[key])
+        rows = _rows_for(selected, duplication, rng)
+        qty = rng.integers(1, 4, size=len(rows))
+        totals[key] = np.bincount(rows, weights=qty, minlength=n_upcs).astype("int64")
+
+        if key == "Inbound":
+            sheets[key] = pd.DataFrame({
+                "Inbound No.": [f"IN{i:08d}" for i in range(len(rows))],
+                "UPC": upcs[rows],
+                "Inbound Qty": qty,
+                "Warehouse": "WH1",
+            })
+        elif key == "Transfer":
+            sheets[key] = pd.DataFrame({
+                "Transfer No.": [f"TR{i:08d}" for i in range(len(rows))],
+                "UPC": upcs[rows],
+                "transfer Num.": qty,
+            })
+        elif key == "Export":
+            # Outbound rows carry an SN and are not counted.
+            n_out = int(len(rows) * outbound_rate)
+            out_rows = rng.integers(0, n_upcs, size=n_out)
+            order = rng.permutation(len(rows) + n_out)
+            sns = np.concatenate([np.full(len(rows), None, dtype=object),
+                                  np.array([f"SN{i:08d}" for i in range(n_out)], dtype=object)])
+            sheets[key] = pd.DataFrame({
+                "Outbound SN": sns[order],
+                "UPC after value-added": np.concatenate([upcs[rows], upcs[out_rows]])[order],
+                "Value-added Num.": np.concatenate([qty, rng.integers(1, 4, size=n_out)])[order],
+            })
+        else:
+            sheets[key] = _cancel_sheet(upc_cells, names, rows, qty, custom_shelf_rate, shelved_cancel_rate, rng)
+
+    total_inbound = totals["Inbound"] + totals["Export"] + totals["Cancel"] + totals["Transfer"]
+    grounding = _grounding_quantities(total_inbound, discrepancy_rate, rng)
+    sheets["Grounding"] = _grounding_sheet(upc_cells, names, grounding, duplication, rng)
+
+    present = (total_inbound > 0) | (grounding > 0)
+    truth = pd.DataFrame({
+        "UPC": upcs[present].astype(str).astype(object),
+        "Product Name": np.where(grounding[present] > 0, names[present], np.nan),
+        QTY_COLUMNS["Grounding"]: grounding[present],
+        **{QTY_COLUMNS[key]: totals[key][present] for key in ["Inbound", "Export", "Cancel", "Transfer"]},
+        "Total Inbound Qty": total_inbound[present],
+    })
+    return SyntheticSources(sheets=sheets, truth=truth)
+
+
+# Grounding equals the inbound total except for discrepancy_rate of the UPCs: those are
+# shifted, left ungrounded, or grounded without any inbound record.
+def _grounding_quantities(total_inbound: np.ndarray, discrepancy_rate: float, rng) -> np.ndarray:
+    grounding = total_inbound.copy()
+    n = len(grounding)
+    flagged = rng.random(n) < discrepancy_rate
+    kind = rng.integers(0, 3, size=n)
+    delta = rng.integers(1, 4, size=n) * rng.choice([-1, 1], size=n)
+
+    received = total_inbound > 0
+    shift = flagged & received & (kind == 0)
+    grounding[shift] = np.maximum(grounding[shift] + delta[shift], 0)
+    grounding[flagged & received & (kind == 1)] = 0
+    no_inbound = flagged & ~received
+    grounding[no_inbound] = rng.integers(1, 6, size=int(no_inbound.sum()))
+    return grounding
+
+
+def _grounding_sheet(upc_cells, names, grounding, duplication, rng) -> pd.DataFrame:
+    grounded = np.flatnonzero(grounding > 0)
+    qty = grounding[grounded]
+    # Split each quantity over up to qty blocks, e.g. 5 over 2 blocks -> 3 + 2.
+    blocks = np.minimum(1 + rng.poisson(max(duplication - 1, 0), size=len(grounded)), qty)
+    rows = np.repeat(np.arange(len(grounded)), blocks)
+    first = np.repeat(np.cumsum(blocks) - blocks, blocks)
+    position = np.arange(len(rows)) - first
+    block_qty = qty[rows] // blocks[rows] + (position < qty[rows] % blocks[rows])
+
+    order = rng.permutation(len(rows))
+    idx = grounded[rows][order]
+    block_qty = block_qty[order]
+    n_blocks = len(idx)
+    times = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 86400, size=n_blocks), unit="s")
+
+    none = np.full(n_blocks, None, dtype=object)
+    col0 = np.stack([upc_cells[idx], names[idx], np.array([f"A-{i % 50:02d}" for i in range(n_blocks)], dtype=object)], 1)
+    col1 = np.stack([none, none, block_qty.astype(object)], 1)
+    col2 = np.stack([none, none, np.full(n_blocks, "operator", dtype=object)], 1)
+    col3 = np.stack([none, none, times.strftime("%Y-%m-%d %H:%M:%S").to_numpy(dtype=object)], 1)
+    return pd.DataFrame({
+        "UPC": col0.ravel(),
+        "Grounding Num.": col1.ravel(),
+        "Operator": col2.ravel(),
+        "Operation Time": col3.ravel(),
+    })
+
+
+# Column 0 only: a header cell, then UPC / name / [shelf] / qty records.
+def _cancel_sheet(upc_cells, names, rows, qty, custom_shelf_rate, shelved_cancel_rate, rng) -> pd.DataFrame:
+    # Cancels put back on a real shelf (4-row records) are not counted.
+    n_shelved = int(len(rows) * shelved_cancel_rate)
+    all_rows = np.concatenate([rows, rng.integers(0, len(upc_cells), size=n_shelved)])
+    all_qty = np.concatenate([qty, rng.integers(1, 4, size=n_shelved)])
+    shelf = np.concatenate([
+        np.where(rng.random(len(rows)) < custom_shelf_rate, COUNTED_SHELF_CODE, None),
+        np.full(n_shelved, "B-02-03", dtype=object),
+    ]).astype(object)
+
+    order = rng.permutation(len(all_rows))
+    all_rows, all_qty, shelf = all_rows[order], all_qty[order], shelf[order]
+    cells = np.stack([upc_cells[all_rows], names[all_rows], shelf, all_qty.astype(object)], 1).ravel()
+    present = np.ones(len(shelf), dtype=bool)
+    keep = np.stack([present, present, pd.notna(shelf), present], 1).ravel()
+    return pd.DataFrame({0: np.concatenate([[CANCEL_HEADER], cells[keep]])})
+
+
+# Write the sheets under their default filenames, plus the expected report.
+def write_sources(sources: SyntheticSources, folder: str, rules: RuleSet | None = None):
+    too_long = [key for key, sheet in sources.sheets.items() if len(sheet) + 1 > XLSX_MAX_ROWS]
+    if too_long:
+        raise ValueError(f"{', '.join(too_long)} exceed Excel's {XLSX_MAX_ROWS} rows; use fewer UPCs.")
+    os.makedirs(folder, exist_ok=True)
+    for key, sheet in sources.sheets.items():
+        sheet.to_excel(os.path.join(folder, DEFAULT_FILES[key]), index=False, header=key != "Cancel")
+    sources.expected_report(rules).to_csv(os.path.join(folder, EXPECTED_FILENAME), index=False, encoding="utf-8-sig")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Write synthetic source exports with a known expected report.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--upcs", type=int, default=10_000, help="distinct UPCs (default 10000)")
+    parser.add_argument("--duplication", type=float, default=1.5, help="average rows per UPC in each source")
+    parser.add_argument("--discrepancy-rate", type=float, default=0.05, help="share of UPCs made to disagree")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sources = generate_sources(args.upcs, args.duplication, args.discrepancy_rate, seed=args.seed)
+    try:
+        write_sources(sources, args.output_dir)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    rows = ", ".join(f"{key}: {len(sheet)}" for key, sheet in sources.sheets.items())
+    print(f"Rows written ({rows}); {len(sources.expected_report())} expected discrepancies")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import generate_sources, write_sources  # noqa: E402
+
+
+# Small synthetic exports. The same seed with another discrepancy rate keeps the UPCs and
+# changes the quantities, like a fresh export of the same day.
+@pytest.fixture
+def sources():
+    def make(n_upcs: int = 500, discrepancy_rate: float = 0.05, seed: int = 0):
+        return generate_sources(n_upcs, discrepancy_rate=discrepancy_rate, seed=seed)
+    return make
+
+
+# Folder of synthetic exports under their default filenames.
+@pytest.fixture
+def source_folder(tmp_path, sources):
+    def make(name: str = "exports", **options) -> str:
+        folder = str(tmp_path / name)
+        write_sources(sources(**options), folder)
+        return folder
+    return make
@@ -0,0 +1,22 @@
+import os
+
+from batch_reconcile import apply_history, discover_runs, run_batch
+from discrepancy_rules import compile_rules
+from synthetic_data import write_sources
+
+
+def test_clean_rerun_replaces_the_day_in_the_ledger(tmp_path, sources):
+    folder = str(tmp_path / "runs" / "2024-05-01" / "WH1")
+    history = str(tmp_path / "historical.db")
+    rules = compile_rules()
+
+    write_sources(sources(discrepancy_rate=0.05), folder)
+    result = run_batch(discover_runs(str(tmp_path / "runs")), rules, workers=1)
+    assert len(result.report) > 0
+    assert apply_history(result, history, rules)["WH1"] == len(result.report)
+
+    write_sources(sources(discrepancy_rate=0.0), folder)
+    result = run_batch(discover_runs(str(tmp_path / "runs")), rules, workers=1)
+    assert len(result.report) == 0
+    assert apply_history(result, history, rules) == {"WH1": 0}
+    assert os.path.exists(str(tmp_path / "historical_WH1.db"))
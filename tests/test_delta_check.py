@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+
+import delta_check
+from delta_check import DeltaChecker, complete_csv_end
+from discrepancy_engine import DEFAULT_FILES, run_check
+
+
+def modes(result) -> dict[str, str]:
+    return {r["source"]: r["delta"] for r in result.metrics.stages if r["stage"] == "delta"}
+
+
+def assert_same_report(result, paths):
+    expected = run_check(paths, workers=1, run_log=False).report
+    pd.testing.assert_frame_equal(result.report.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+
+@pytest.fixture
+def exports(tmp_path, sources):
+    synthetic = sources(n_upcs=300)
+    inbound = synthetic.sheets["Inbound"].copy()
+    # A free-text column with line breaks inside quoted fields.
+    inbound["Note"] = [f"checked by\nshift {i % 3}" if i % 4 == 0 else "" for i in range(len(inbound))]
+    grounding_path = str(tmp_path / DEFAULT_FILES["Grounding"])
+    synthetic.sheets["Grounding"].to_excel(grounding_path, index=False)
+    return inbound, {"Grounding": grounding_path, "Inbound": str(tmp_path / "InboundRecordFile.csv")}
+
+
+def write_rows(path: str, rows: pd.DataFrame, tail: bytes = b""):
+    with open(path, "wb") as f:
+        f.write(rows.to_csv(index=False).encode("utf-8") + tail)
+
+
+def test_complete_csv_end_skips_quoted_newlines():
+    assert complete_csv_end(b'a,b\n1,"x\ny"\n2,"z\n') == len(b'a,b\n1,"x\ny"\n')
+    assert complete_csv_end(b'1,"say ""hi""\nthere"\n2,') == len(b'1,"say ""hi""\nthere"\n')
+    assert complete_csv_end(b'1,"open\n') == 0
+
+
+def test_appended_rows_are_parsed_alone(tmp_path, exports):
+    inbound, paths = exports
+    checker = DeltaChecker(str(tmp_path / "state.pkl"))
+    half = len(inbound) // 2
+    write_rows(paths["Inbound"], inbound.iloc[:half])
+    assert modes(checker.run(paths, run_log=False)) == {"Grounding": "new", "Inbound": "new"}
+
+    write_rows(paths["Inbound"], inbound)
+    result = checker.run(paths, run_log=False)
+    assert modes(result) == {"Grounding": "unchanged", "Inbound": "append"}
+    assert next(r["rows_in"] for r in result.metrics.stages if r.get("delta") == "append") == len(inbound) - half
+    assert_same_report(result, paths)
+
+    # State reloaded from disk, nothing changed.
+    assert modes(DeltaChecker(str(tmp_path / "state.pkl")).run(paths, run_log=False))["Inbound"] == "unchanged"
+
+
+def test_rewritten_rows_are_rebuilt(tmp_path, exports):
+    inbound, paths = exports
+    checker = DeltaChecker(str(tmp_path / "state.pkl"))
+    write_rows(paths["Inbound"], inbound.iloc[:100])
+    checker.run(paths, run_log=False)
+
+    changed = inbound.copy()
+    changed.loc[99, "Inbound Qty"] += 5
+    write_rows(paths["Inbound"], changed)
+    result = checker.run(paths, run_log=False)
+    assert modes(result)["Inbound"] == "rebuild"
+    assert_same_report(result, paths)
+
+
+def test_quoted_newline_at_a_block_end(tmp_path, exports, monkeypatch):
+    inbound, paths = exports
+    # Tiny blocks, so block ends fall inside quoted fields again and again.
+    monkeypatch.setattr(delta_check, "CSV_BLOCK_BYTES", 37)
+    checker = DeltaChecker(str(tmp_path / "state.pkl"))
+    first = inbound.iloc[:40]
+    record = inbound.iloc[40:41].to_csv(index=False, header=False).encode("utf-8")
+    assert b"\n" in record.rstrip(b"\n")
+    # Written up to just after the line break inside the next record's note.
+    write_rows(paths["Inbound"], first, record[:record.index(b"\n") + 1])
+    checker.run(paths, run_log=False)
+
+    write_rows(paths["Inbound"], inbound)
+    result = checker.run(paths, run_log=False)
+    assert modes(result)["Inbound"] == "append"
+    assert_same_report(result, paths)
@@ -0,0 +1,44 @@
+import os
+import threading
+
+import pytest
+
+from discrepancy_engine import CheckCancelled, find_default_files, run_check, stream_csv_source
+
+
+def cancel_after(stage: str):
+    cancel = threading.Event()
+
+    def progress(done, total, finished, source):
+        if finished == stage:
+            cancel.set()
+    return cancel, progress
+
+
+def test_cancel_before_history_leaves_no_side_effects(tmp_path, source_folder):
+    paths = find_default_files(source_folder())
+    history, report = str(tmp_path / "historical.db"), str(tmp_path / "report.csv")
+    cancel, progress = cancel_after("classify")
+    with pytest.raises(CheckCancelled):
+        run_check(paths, history, report, progress=progress, cancel=cancel, workers=1, run_log=False)
+    assert not os.path.exists(history)
+    assert not os.path.exists(report)
+
+
+def test_cancel_after_the_ledger_is_written_finishes_the_check(tmp_path, source_folder):
+    paths = find_default_files(source_folder())
+    history, report = str(tmp_path / "historical.db"), str(tmp_path / "report.csv")
+    cancel, progress = cancel_after("history")
+    result = run_check(paths, history, report, progress=progress, cancel=cancel, workers=1, run_log=False)
+    assert result.history_error is None
+    assert os.path.exists(report)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 100])
+def test_small_chunks_sum_like_one_chunk(tmp_path, sources, chunk_rows):
+    path = str(tmp_path / "InboundRecordFile.csv")
+    sources().sheets["Inbound"].to_csv(path, index=False)
+    whole, rows = stream_csv_source("Inbound", path, chunk_rows=10 ** 9)
+    chunked, chunked_rows = stream_csv_source("Inbound", path, chunk_rows=chunk_rows)
+    assert chunked_rows == rows
+    assert chunked.equals(whole)
@@ -0,0 +1,29 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from grounding_parser import _legacy_int, to_quantity
+
+
+def test_numbers_convert_like_int_float():
+    values = [5, "7", 2.9, -3.5, " 4 ", True, np.int64(3), None, "N/A", float("inf")]
+    assert to_quantity(values, invalid_qty=-1).tolist() == [_legacy_int(v, -1) for v in values]
+
+
+@pytest.mark.parametrize("values, expected", [
+    ([pd.Timestamp("2024-05-01"), pd.Timestamp("2024-05-02")], [-1, -1]),
+    ([datetime.datetime(2024, 5, 1), 3], [-1, 3]),
+    ([np.datetime64("2024-05-01"), 3], [-1, 3]),
+    ([datetime.timedelta(seconds=5), "N/A", 3], [-1, -1, 3]),
+    (pd.Series(pd.to_datetime(["2024-05-01", "2024-05-02"])), [-1, -1]),
+    (pd.Series(pd.to_timedelta(["5s", "1min"])), [-1, -1]),
+])
+def test_dates_and_durations_are_invalid(values, expected):
+    assert to_quantity(values, invalid_qty=-1).tolist() == expected
+
+
+def test_values_outside_int64_are_invalid():
+    with np.errstate(invalid="raise"):
+        assert to_quantity([1e20, -1e20, 9.3e18, 3], invalid_qty=-1).tolist() == [-1, -1, -1, 3]
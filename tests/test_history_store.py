@@ -0,0 +1,65 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from discrepancy_engine import DEFAULT_RULESET
+from history_store import HistoryStore
+
+DAY = datetime.date(2026, 1, 5)
+NEXT_DAY = datetime.date(2026, 1, 6)
+
+
+def same(a, b) -> bool:
+    return a.reset_index(drop=True).equals(b.reset_index(drop=True))
+
+
+@pytest.fixture
+def runs(sources):
+    return {rate: sources(discrepancy_rate=rate).expected_report() for rate in (0.05, 0.1, 0.2)}
+
+
+def test_same_run_twice_is_counted_once(tmp_path, runs):
+    store = HistoryStore(str(tmp_path / "ledger.db"))
+    first = store.apply_run(runs[0.05], DEFAULT_RULESET, DAY)
+    assert same(store.apply_run(runs[0.05], DEFAULT_RULESET, DAY), first)
+    with sqlite3.connect(store.path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 1
+
+
+def test_changed_same_day_run_replaces_the_earlier_one(tmp_path, runs):
+    store = HistoryStore(str(tmp_path / "ledger.db"))
+    store.apply_run(runs[0.05], DEFAULT_RULESET, DAY)
+    got = store.apply_run(runs[0.2], DEFAULT_RULESET, DAY)
+    assert same(got, HistoryStore(str(tmp_path / "fresh.db")).apply_run(runs[0.2], DEFAULT_RULESET, DAY))
+
+
+def test_next_day_adds_to_the_totals(tmp_path, runs):
+    store = HistoryStore(str(tmp_path / "ledger.db"))
+    store.apply_run(runs[0.05], DEFAULT_RULESET, DAY)
+    got = store.apply_run(runs[0.05], DEFAULT_RULESET, NEXT_DAY)
+    doubled = got.set_index("UPC")["Inbound Qty"]
+    once = runs[0.05].set_index("UPC")["Inbound Qty"]
+    assert (doubled.loc[once.index] == 2 * once).all()
+
+
+def test_replacing_keeps_later_runs(tmp_path, runs):
+    store = HistoryStore(str(tmp_path / "ledger.db"))
+    store.apply_run(runs[0.05], DEFAULT_RULESET, DAY)
+    store.apply_run(runs[0.1], DEFAULT_RULESET, NEXT_DAY, origin="batch")
+    got = store.apply_run(runs[0.2], DEFAULT_RULESET, DAY)
+
+    fresh = HistoryStore(str(tmp_path / "fresh.db"))
+    fresh.apply_run(runs[0.2], DEFAULT_RULESET, DAY)
+    assert same(got, fresh.apply_run(runs[0.1], DEFAULT_RULESET, NEXT_DAY, origin="batch"))
+
+
+def test_replacing_a_run_without_before_rows(tmp_path, runs):
+    store = HistoryStore(str(tmp_path / "ledger.db"))
+    store.apply_run(runs[0.05], DEFAULT_RULESET, DAY)
+    # As written before runs kept their before rows.
+    with sqlite3.connect(store.path) as conn:
+        conn.execute("UPDATE runs SET undoable = 0")
+        conn.execute("DELETE FROM before")
+    got = store.apply_run(runs[0.2], DEFAULT_RULESET, DAY)
+    assert same(got, HistoryStore(str(tmp_path / "fresh.db")).apply_run(runs[0.2], DEFAULT_RULESET, DAY))
@@ -0,0 +1,56 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from http_service import CheckService
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = CheckService(port=0, workers=1)
+    thread = threading.Thread(target=service.serve_forever, daemon=True)
+    thread.start()
+    yield service
+    service.shutdown()
+    service.server_close()
+
+
+def post(service, body: bytes, headers: dict) -> tuple[int, dict]:
+    conn = http.client.HTTPConnection("127.0.0.1", service.server_address[1], timeout=60)
+    try:
+        conn.putrequest("POST", "/check")
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.endheaders(body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def post_json(service, data: dict) -> tuple[int, dict]:
+    body = json.dumps(data).encode("utf-8")
+    return post(service, body, {"Content-Type": "application/json", "Content-Length": str(len(body))})
+
+
+def test_check_of_local_paths(service, source_folder):
+    status, data = post_json(service, {"input_dir": source_folder()})
+    assert status == 200
+    assert data["discrepancies"] == len(data["rows"]) > 0
+
+
+def test_unreadable_source_is_a_bad_request(service, tmp_path):
+    path = tmp_path / "InboundRecordFile.xlsx"
+    path.write_text("not a workbook")
+    status, data = post_json(service, {"paths": {"Inbound": str(path)}})
+    assert status == 400
+    assert data["error"].startswith("Cannot read Inbound (InboundRecordFile.xlsx)")
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length_is_a_bad_request(service, length):
+    status, data = post(service, b"{}", {"Content-Type": "application/json", "Content-Length": length})
+    assert status == 400
+    assert "Content-Length" in data["error"]
@@ -0,0 +1,127 @@
+import os
+import shutil
+import socket
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import job_queue
+from discrepancy_engine import find_default_files, run_check
+from job_queue import JobQueue, JobRequest, JobRunner
+
+
+def request_for(folder: str, **options) -> JobRequest:
+    paths = find_default_files(folder)
+    paths.pop("History", None)
+    return JobRequest(paths, **options)
+
+
+def run_once(queue: JobQueue, workers: int = 2) -> list[str]:
+    lines = []
+    JobRunner(queue, workers=workers, poll=0.1, log=lines.append).run(once=True)
+    return lines
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"))
+
+
+def test_identical_inputs_run_once(queue, source_folder, tmp_path):
+    folder = source_folder()
+    copy = shutil.copytree(folder, str(tmp_path / "copy"))
+    submissions = []
+    threads = [threading.Thread(target=lambda i=i: submissions.append(
+        queue.submit(request_for(folder), output=str(tmp_path / f"out{i}.csv")))) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    same_content = queue.submit(request_for(copy))
+
+    assert len({s.job_id for s in submissions} | {same_content.job_id}) == 1
+    assert sum(not s.duplicate for s in submissions) == 1
+    run_once(queue)
+    status = queue.status(same_content.job_id)
+    assert status["status"] == "done" and status["submissions"] == 5
+
+    expected = run_check(request_for(folder).paths, run_log=False).report
+    assert len(queue.result(same_content.job_id)) == len(expected)
+    for i in range(4):
+        assert len(pd.read_csv(tmp_path / f"out{i}.csv")) == len(expected)
+    late = queue.submit(request_for(folder), output=str(tmp_path / "late.csv"))
+    assert late.duplicate and late.written == [str(tmp_path / "late.csv")]
+
+
+def test_higher_priority_runs_first(queue, source_folder):
+    low = queue.submit(request_for(source_folder("low", seed=1))).job_id
+    high = queue.submit(request_for(source_folder("high", seed=2)), priority=5).job_id
+    lines = run_once(queue, workers=1)
+    assert lines[0].startswith(f"job {high} started") and lines[2].startswith(f"job {low} started")
+
+
+def test_interrupted_jobs_are_queued_again(queue, source_folder):
+    job_id = queue.submit(request_for(source_folder())).job_id
+    assert queue.claim().job_id == job_id
+    lines = run_once(queue)
+    assert lines[0] == "1 interrupted job(s) queued again"
+    assert queue.status(job_id)["status"] == "done"
+
+
+def test_second_runner_refuses_to_start(queue):
+    queue.acquire_lease(("elsewhere", 1))
+    with pytest.raises(RuntimeError, match="Another runner"):
+        JobRunner(queue, workers=1).run(once=True)
+    queue.release_lease(("elsewhere", 1))
+    JobRunner(queue, workers=1, log=lambda line: None).run(once=True)
+
+
+def test_expired_lease_is_taken_over(queue, monkeypatch):
+    queue.acquire_lease(("elsewhere", 1))
+    monkeypatch.setattr(job_queue, "LEASE_SECONDS", 0.0)
+    queue.acquire_lease((socket.gethostname(), os.getpid()))
+    assert not queue.renew_lease(("elsewhere", 1))
+
+
+run_job = job_queue.run_job
+
+
+def crash_on_inbound_only(paths, rules, cache_dir):
+    if set(paths) == {"Inbound"}:
+        os._exit(1)
+    return run_job(paths, rules, cache_dir)
+
+
+def test_dead_worker_does_not_stop_the_runner(queue, source_folder, monkeypatch):
+    monkeypatch.setattr(job_queue, "run_job", crash_on_inbound_only)
+    folder = source_folder()
+    crashing = queue.submit(JobRequest({"Inbound": find_default_files(folder)["Inbound"]}), priority=1).job_id
+    fine = queue.submit(request_for(folder)).job_id
+    run_once(queue, workers=1)
+    assert queue.status(crashing)["status"] == "failed"
+    assert queue.status(crashing)["retries"] == job_queue.MAX_RETRIES
+    assert queue.status(fine)["status"] == "done"
+
+
+# The other job is still running when the worker dies, so both are lost with the pool.
+def crash_next_to_a_slow_job(paths, rules, cache_dir):
+    if set(paths) == {"Inbound"}:
+        time.sleep(0.2)
+        os._exit(1)
+    time.sleep(1.0)
+    return run_job(paths, rules, cache_dir)
+
+
+def test_bystander_of_a_dead_worker_is_not_charged(queue, source_folder, monkeypatch):
+    monkeypatch.setattr(job_queue, "run_job", crash_next_to_a_slow_job)
+    folder = source_folder()
+    crashing = queue.submit(JobRequest({"Inbound": find_default_files(folder)["Inbound"]}), priority=1).job_id
+    bystander = queue.submit(request_for(folder)).job_id
+    lines = run_once(queue, workers=2)
+    assert any("to run one at a time" in line for line in lines)
+    assert queue.status(crashing)["status"] == "failed"
+    assert queue.status(crashing)["retries"] == job_queue.MAX_RETRIES
+    assert queue.status(bystander)["status"] == "done"
+    assert queue.status(bystander)["retries"] == 0
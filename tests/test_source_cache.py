@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+from discrepancy_engine import find_default_files, run_check
+from source_cache import ENTRY_SUFFIX, ENTRY_SUFFIXES, SourceCache
+
+
+def entries(folder) -> list[str]:
+    return sorted(name for name in os.listdir(folder) if name.endswith(ENTRY_SUFFIX))
+
+
+def check_paths(folder: str) -> dict[str, str]:
+    paths = find_default_files(folder)
+    paths.pop("History", None)
+    return paths
+
+
+def test_second_run_hits_every_source(tmp_path, source_folder):
+    paths = check_paths(source_folder())
+    first = run_check(paths, workers=1, cache=SourceCache(str(tmp_path / "cache")), run_log=False)
+    assert first.cache_report.startswith("0 hit, 5 miss")
+    assert len(entries(tmp_path / "cache")) == 5
+
+    second = run_check(paths, workers=1, cache=SourceCache(str(tmp_path / "cache")), run_log=False)
+    assert second.cache_report.startswith("5 hit, 0 miss")
+    assert second.report.equals(first.report)
+
+
+def test_changed_file_misses(tmp_path, source_folder, sources):
+    folder = source_folder()
+    cache = SourceCache(str(tmp_path / "cache"))
+    cache.get("Inbound", check_paths(folder)["Inbound"])
+    key, _ = cache.get("Inbound", check_paths(folder)["Inbound"])
+    cache.put(key, sources().sheets["Inbound"])
+    assert cache.get("Inbound", check_paths(folder)["Inbound"])[1] is not None
+
+    sources(discrepancy_rate=0.2, seed=1).sheets["Inbound"].to_excel(check_paths(folder)["Inbound"], index=False)
+    assert cache.get("Inbound", check_paths(folder)["Inbound"])[1] is None
+
+
+@pytest.mark.parametrize("entry_format", sorted(ENTRY_SUFFIXES))
+def test_truncated_entry_is_a_miss_and_rewritten(tmp_path, source_folder, entry_format):
+    paths = check_paths(source_folder())
+    first = run_check(paths, workers=1, cache=SourceCache(str(tmp_path / "cache"), entry_format=entry_format),
+                      run_log=False)
+    cache = SourceCache(str(tmp_path / "cache"), entry_format=entry_format)
+    entry = cache._entry_path(cache.get("Inbound", paths["Inbound"])[0])
+    size = os.path.getsize(entry)
+    with open(entry, "r+b") as f:
+        f.truncate(size // 2)
+
+    second = run_check(paths, workers=1, cache=SourceCache(str(tmp_path / "cache"), entry_format=entry_format),
+                       run_log=False)
+    assert second.cache_report.startswith("4 hit, 1 miss")
+    assert second.report.equals(first.report)
+    assert os.path.getsize(entry) == size
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, sources):
+    cache = SourceCache(str(tmp_path / "cache"))
+    frame = sources().sheets["Inbound"]
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, frame)
+        stamp = time.time() - 60 + i
+        os.utime(cache._entry_path(key), (stamp, stamp))
+    size = os.path.getsize(cache._entry_path("a"))
+
+    cache.max_bytes = 2 * size
+    cache.put("d", frame)
+    assert entries(tmp_path / "cache") == ["c" + ENTRY_SUFFIX, "d" + ENTRY_SUFFIX]
+
+
+def test_unwritable_cache_does_not_fail_the_check(tmp_path, source_folder):
+    blocked = tmp_path / "cache"
+    blocked.write_text("a file where the cache folder should be")
+    result = run_check(check_paths(source_folder()), workers=1, cache=SourceCache(str(blocked)), run_log=False)
+    assert len(result.report) > 0
+    assert "not saved: Grounding, Inbound, Export, Cancel, Transfer" in result.cache_report
@@ -0,0 +1,244 @@
+import argparse
+import os
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from batch_reconcile import counts_path_for
+from discrepancy_engine import (
+    DEFAULT_FILES, QTY_COLUMNS, REPORT_COLUMNS, SOURCE_KEYS, classify, count_source_upcs, empty_summary,
+    find_default_files, get_exe_dir, load_source, merge_sources, summarize_grounding, summarize_inbound,
+    summarize_transfer, summarize_valueadd,
+)
+from discrepancy_rules import RULES_FILENAME, RuleSet, compile_rules, load_rules
+from frame_schema import compact_summary
+from grounding_parser import parse_grounding
+from report_writers import REPORT_FORMATS, write_report
+from source_readers import SOURCE_COLUMNS, SOURCE_DTYPES, UPC_COLUMNS, is_csv, read_excel
+
+# Time-windowed reconciliation: one report per shift or per hour from the day's files.
+#
+# Windows repeat every day, either at a fixed length from midnight (--every 1h) or at
+# shift start times (--shifts 06:00 14:00 22:00, the last shift running past midnight).
+# Each grounding block is put in the window its Operation Time falls in by an as-of
+# lookup against the sorted window starts, and so are the rows of any other source
+# given a time column. The files are read and parsed once; each window is then merged
+# and classified like a normal check.
+#
+# Sources without times (Cancel Order always, the others unless --time-column names one)
+# cannot be split. Reconciling one window's grounding against a whole day of inbound
+# or cancels would flag nearly every UPC, so when any source is untimed each window is
+# reconciled cumulatively by default: on everything timed up to its end plus the
+# untimed sources. --per-window forces windows on their own (with a warning); it is
+# the default only when every selected source is timed. Rows whose time cannot be read
+# form a window of their own, without start or end.
+
+WINDOW_COLUMNS = ["Window Start", "Window End"]
+
+# Per-UPC summary of a source's rows, applied to each window's rows.
+TIMED_SUMMARIES = {
+    "Grounding": summarize_grounding,
+    "Inbound": summarize_inbound,
+    "Export": summarize_valueadd,
+    "Transfer": summarize_transfer,
+}
+
+
+@dataclass
+class WindowedResult:
+    report: pd.DataFrame
+    counts: pd.DataFrame
+    # Rows per timed source whose time could not be read.
+    untimed_rows: dict[str, int] = field(default_factory=dict)
+    # Selected sources counted in full in every window.
+    untimed_sources: list[str] = field(default_factory=list)
+    cumulative: bool = False
+
+
+# Offsets from midnight at which windows start, e.g. every="1h" or shifts=["06:00", "14:00"].
+def window_offsets(every: str | None = None, shifts: list[str] | None = None) -> list[pd.Timedelta]:
+    day = pd.Timedelta(days=1)
+    if shifts:
+        offsets = sorted({pd.Timedelta(f"{s}:00" if s.count(":") == 1 else s) for s in shifts})
+        if offsets[0] < pd.Timedelta(0) or offsets[-1] >= day:
+            raise ValueError("Shift start times must be between 00:00 and 23:59.")
+        return offsets
+    length = pd.Timedelta(every or "1h")
+    if length <= pd.Timedelta(0) or length > day:
+        raise ValueError(f"Window length must be more than 0 and at most one day, not {every}.")
+    return list(pd.timedelta_range(0, day - pd.Timedelta(1), freq=length))
+
+
+# Sorted window starts covering lo..hi, one set of offsets per day (from the day before lo,
+# so a shift that started the previous evening is included).
+def window_starts(lo: pd.Timestamp, hi: pd.Timestamp, offsets: list[pd.Timedelta]) -> pd.DatetimeIndex:
+    days = pd.date_range(lo.normalize() - pd.Timedelta(days=1), hi.normalize(), freq="D")
+    return pd.DatetimeIndex(sorted(day + offset for day in days for offset in offsets))
+
+
+# Start of the window each time falls in (NaT where the time cannot be read).
+def assign_windows(times, offsets: list[pd.Timedelta]) -> pd.Series:
+    stamps = pd.Series(pd.to_datetime(pd.Series(times, dtype=object), errors="coerce", format="mixed"))
+    out = pd.Series(pd.NaT, index=stamps.index, dtype="datetime64[ns]")
+    valid = stamps.notna().to_numpy()
+    if valid.any():
+        starts = window_starts(stamps[valid].min(), stamps[valid].max(), offsets)
+        values = stamps[valid].to_numpy(dtype="datetime64[ns]")
+        # As-of lookup: the last window start at or before each time.
+        idx = np.searchsorted(starts.to_numpy(dtype="datetime64[ns]"), values, side="right") - 1
+        out[valid] = starts.to_numpy(dtype="datetime64[ns]")[idx]
+    return out
+
+
+# Row-level frame of a timed source with its time column.
+def read_timed_rows(key: str, path: str, time_column: str | None) -> tuple[pd.DataFrame, str]:
+    if key == "Grounding":
+        return parse_grounding(read_excel(path), detailed=True), "Operation Time"
+    columns = SOURCE_COLUMNS[key] + [time_column]
+    if is_csv(path):
+        rows = pd.read_csv(path, usecols=columns, dtype={UPC_COLUMNS[key]: str, **SOURCE_DTYPES[key]},
+                           encoding="utf-8-sig")
+    else:
+        rows = read_excel(path, usecols=columns, dtype=SOURCE_DTYPES[key])
+    return rows, time_column
+
+
+# {window start: per-UPC summary} of one timed source, and the number of rows without a time.
+def summarize_by_window(key: str, rows: pd.DataFrame, time_column: str,
+                        offsets: list[pd.Timedelta]) -> tuple[dict[pd.Timestamp, pd.DataFrame], int]:
+    windows = assign_windows(rows[time_column].to_numpy(dtype=object), offsets)
+    pieces = {}
+    for window, part in rows.groupby(windows.to_numpy(), dropna=False, sort=True):
+        summary = TIMED_SUMMARIES[key](part)
+        pieces[pd.Timestamp(window)] = compact_summary(summary, QTY_COLUMNS[key]) if not summary.empty else summary
+    return pieces, int(windows.isna().sum())
+
+
+def accumulate(key: str, running: pd.DataFrame | None, piece: pd.DataFrame) -> pd.DataFrame:
+    if running is None or running.empty:
+        return piece
+    agg = {QTY_COLUMNS[key]: "sum"}
+    if key == "Grounding":
+        agg["Product Name"] = "first"
+    return pd.concat([running, piece], ignore_index=True).groupby("UPC", as_index=False, sort=False).agg(agg)
+
+
+# cumulative=None reconciles cumulatively when any selected source is untimed.
+def run_windowed_check(paths: dict[str, str], offsets: list[pd.Timedelta], time_columns: dict[str, str] | None = None,
+                       cumulative: bool | None = None, rules: RuleSet | None = None) -> WindowedResult:
+    rules = rules or compile_rules()
+    time_columns = {"Grounding": "Operation Time", **(time_columns or {})}
+    selected = [k for k in SOURCE_KEYS if k in paths]
+    timed = [k for k in selected if k in time_columns and k in TIMED_SUMMARIES]
+    if not timed:
+        raise ValueError("Windows need Grounding.xlsx or a source with --time-column.")
+    untimed_sources = [k for k in selected if k not in timed]
+    if cumulative is None:
+        cumulative = bool(untimed_sources)
+
+    untimed = {k: load_source(k, paths[k]) for k in untimed_sources}
+    pieces = {}
+    untimed_rows = {}
+    for key in timed:
+        rows, time_column = read_timed_rows(key, paths[key], time_columns[key])
+        pieces[key], untimed_rows[key] = summarize_by_window(key, rows, time_column, offsets)
+
+    windows = sorted({w for by_window in pieces.values() for w in by_window if pd.notna(w)})
+    all_starts = windows + ([pd.NaT] if any(pd.NaT in by_window for by_window in pieces.values()) else [])
+    ends = dict(zip(windows, window_ends(windows, offsets)))
+
+    reports = []
+    count_rows = []
+    running = {key: None for key in timed}
+    for start in all_starts:
+        summaries = {key: empty_summary(key) for key in SOURCE_KEYS}
+        summaries.update(untimed)
+        for key in timed:
+            piece = pieces[key].get(start, empty_summary(key))
+            if cumulative and pd.notna(start):
+                running[key] = accumulate(key, running[key], piece)
+                piece = running[key]
+            summaries[key] = piece
+        today = classify(merge_sources(summaries), rules)
+        today.insert(0, "Window End", ends.get(start, pd.NaT))
+        today.insert(0, "Window Start", start)
+        reports.append(today)
+        count_rows.append({"Window Start": start, "Window End": ends.get(start, pd.NaT),
+                           "Discrepancies": len(today), **count_source_upcs(summaries)})
+
+    report = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame(columns=WINDOW_COLUMNS + REPORT_COLUMNS)
+    return WindowedResult(report=report, counts=pd.DataFrame(count_rows), untimed_rows=untimed_rows,
+                          untimed_sources=untimed_sources, cumulative=cumulative)
+
+
+# End of each window: the next start of the daily grid.
+def window_ends(windows: list[pd.Timestamp], offsets: list[pd.Timedelta]) -> list[pd.Timestamp]:
+    if not windows:
+        return []
+    grid = window_starts(windows[0], windows[-1] + pd.Timedelta(days=1), offsets)
+    idx = np.searchsorted(grid.to_numpy(dtype="datetime64[ns]"), np.array(windows, dtype="datetime64[ns]"), side="right")
+    return list(grid[idx])
+
+
+def parse_time_columns(values: list[str]) -> dict[str, str]:
+    columns = {}
+    for value in values:
+        key, sep, column = value.partition("=")
+        if not sep or key not in TIMED_SUMMARIES or key == "Grounding":
+            raise ValueError(f"--time-column takes SOURCE=COLUMN with SOURCE one of Inbound, Export, Transfer: {value}")
+        columns[key] = column
+    return columns
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reconcile the day's files per shift or per time window.")
+    parser.add_argument("--input-dir", help="folder to search for the default export filenames")
+    for key in SOURCE_KEYS:
+        parser.add_argument(f"--{key.lower()}", help=DEFAULT_FILES[key])
+    parser.add_argument("-o", "--output", required=True,
+                        help="report of every window; per-window counts go to <name>_counts.<ext>")
+    parser.add_argument("--format", choices=REPORT_FORMATS, help="report format (default: from the output extension)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--every", help="window length from midnight, e.g. 1h, 30min, 8h (default 1h)")
+    group.add_argument("--shifts", nargs="+", metavar="HH:MM", help="shift start times, e.g. 06:00 14:00 22:00")
+    parser.add_argument("--time-column", action="append", default=[], metavar="SOURCE=COLUMN",
+                        help="split another source by a time column too, e.g. Inbound='Inbound Time'")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--cumulative", action="store_true", default=None,
+                      help="reconcile everything up to the end of each window (default when a source has no times)")
+    mode.add_argument("--per-window", dest="cumulative", action="store_false",
+                      help="reconcile each window alone (default when every source is split by time)")
+    parser.add_argument("--rules", help=f"discrepancy rule config (default: {RULES_FILENAME} next to this program, if present)")
+    args = parser.parse_args(argv)
+
+    paths = find_default_files(args.input_dir) if args.input_dir else {}
+    for key in SOURCE_KEYS:
+        value = getattr(args, key.lower())
+        if value:
+            paths[key] = value
+    paths.pop("History", None)
+
+    try:
+        rules = load_rules(args.rules or os.path.join(get_exe_dir(), RULES_FILENAME))
+        result = run_windowed_check(paths, window_offsets(args.every, args.shifts), parse_time_columns(args.time_column),
+                                    args.cumulative, rules)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    write_report(result.report, args.output, args.format)
+    write_report(result.counts, counts_path_for(args.output), args.format)
+    if result.untimed_sources and not result.cumulative:
+        print(f"Warning: {', '.join(result.untimed_sources)} have no times and count in full in every window, "
+              "so most UPCs will show as discrepancies; use --cumulative or --time-column", file=sys.stderr)
+    for key, n in result.untimed_rows.items():
+        if n:
+            print(f"{key}: {n} rows without a readable time, reported in their own window", file=sys.stderr)
+    print(f"{len(result.report)} discrepancies in {len(result.counts)} windows written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
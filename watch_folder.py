@@ -0,0 +1,255 @@
+import argparse
+import datetime
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from batch_reconcile import record_stats, run_counts
+from delta_check import DeltaChecker, state_path_for
+from discrepancy_engine import SOURCE_KEYS, default_cache_dir, default_filenames, get_exe_dir, run_check
+from discrepancy_rules import RULES_FILENAME, RuleSet, compile_rules, load_rules
+from source_cache import SourceCache
+
+# Long-running watch mode: re-check a folder whenever the WMS drops a new export.
+#
+# Changes are noticed through watchdog's file system events when it is installed,
+# otherwise by stat()ing the five default filenames every few seconds. A changed
+# file is only used once its size and mtime have been stable for the settle time
+# and it can be opened, so half-written exports are never parsed. Summaries of
+# unchanged sources are kept in memory, so a re-check only parses the files that
+# changed before merging, classifying and writing the report and stats again. With
+# --delta, only the rows appended to a changed file are parsed (see delta_check.py).
+#
+# The cumulative ledger is not updated here: the same day's exports are re-read
+# many times, and the ledger would count each version. Fold the final files in
+# with a regular check at the end of the day.
+
+DEFAULT_SETTLE_SECONDS = 3.0
+DEFAULT_POLL_SECONDS = 2.0
+# With file system events, still look every so often in case an event was missed
+# (e.g. on network shares).
+EVENT_FALLBACK_SECONDS = 60.0
+
+
+# Stands in for SourceCache in run_check(): summaries of files whose size and mtime are
+# unchanged are served from memory; anything else falls through to the disk cache, if any.
+class SummaryMemo:
+    def __init__(self, disk: SourceCache | None = None):
+        self.disk = disk
+        self.entries: dict[str, tuple[tuple, pd.DataFrame]] = {}
+        self.hits: list[str] = []
+        self.misses: list[str] = []
+
+    def get(self, source: str, path: str) -> tuple[tuple, pd.DataFrame | None]:
+        st = os.stat(path)
+        signature = (path, st.st_size, st.st_mtime_ns)
+        entry = self.entries.get(source)
+        if entry is not None and entry[0] == signature:
+            self.hits.append(source)
+            return (source, signature, None), entry[1]
+        disk_key = None
+        if self.disk is not None:
+            disk_key, df = self.disk.get(source, path)
+            if df is not None:
+                self.entries[source] = (signature, df)
+                self.hits.append(source)
+                return (source, signature, disk_key), df
+        # Keep the disk key on a miss too, so put() fills the disk cache for the next run.
+        self.misses.append(source)
+        return (source, signature, disk_key), None
+
+    def put(self, key: tuple, df: pd.DataFrame):
+        source, signature, disk_key = key
+        self.entries[source] = (signature, df)
+        if disk_key is not None:
+            self.disk.put(disk_key, df)
+
+    def report(self) -> str:
+        text = f"{len(self.hits)} reused, {len(self.misses)} parsed"
+        if self.misses:
+            text += " (" + ", ".join(self.misses) + ")"
+        self.hits, self.misses = [], []
+        return text
+
+
+# Path, size and mtime of each source file present in the folder (the xlsx export, or
+# else its CSV variant).
+def snapshot(folder: str) -> dict[str, tuple[str, int, int]]:
+    found = {}
+    for key in SOURCE_KEYS:
+        for filename in default_filenames(key):
+            path = os.path.join(folder, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found[key] = (path, st.st_size, st.st_mtime_ns)
+            break
+    return found
+
+
+# A file still held open for writing cannot be opened on Windows.
+def is_readable(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            f.read(1)
+        return True
+    except OSError:
+        return False
+
+
+class FolderWatcher:
+    def __init__(self, folder: str, output: str, rules: RuleSet | None = None, cache: SourceCache | None = None,
+                 settle: float = DEFAULT_SETTLE_SECONDS, poll: float = DEFAULT_POLL_SECONDS,
+                 stats_dir: str | None = None, site: str = "", log=print, delta: DeltaChecker | None = None):
+        self.folder = folder
+        self.output = output
+        self.rules = rules or compile_rules()
+        self.memo = SummaryMemo(cache)
+        self.settle = settle
+        self.poll = poll
+        self.stats_dir = stats_dir
+        self.site = site
+        self.log = log
+        self.delta = delta
+        self.seen: dict[str, tuple[str, int, int]] = {}
+        # key -> (signature, monotonic time the signature was first seen)
+        self.pending: dict[str, tuple[tuple[str, int, int] | None, float]] = {}
+        self.wake = threading.Event()
+
+    def start_observer(self):
+        if importlib.util.find_spec("watchdog") is None:
+            return None
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                watcher.wake.set()
+
+        observer = Observer()
+        observer.schedule(Handler(), self.folder, recursive=False)
+        observer.start()
+        return observer
+
+    # Record what changed since the last check; True when every change has settled.
+    def update_pending(self) -> bool:
+        now = time.monotonic()
+        current = snapshot(self.folder)
+        for key in set(current) | set(self.seen) | set(self.pending):
+            signature = current.get(key)
+            if signature == self.seen.get(key) and key not in self.pending:
+                continue
+            if key not in self.pending or self.pending[key][0] != signature:
+                self.pending[key] = (signature, now)
+        if not self.pending:
+            return False
+        for key, (signature, since) in self.pending.items():
+            if now - since < self.settle:
+                return False
+            if signature is not None and not is_readable(signature[0]):
+                return False
+        return True
+
+    def check(self):
+        changed = sorted(self.pending)
+        for key, (signature, _) in self.pending.items():
+            if signature is None:
+                self.seen.pop(key, None)
+            else:
+                self.seen[key] = signature
+        self.pending.clear()
+
+        paths = {key: signature[0] for key, signature in self.seen.items()}
+        stamp = datetime.datetime.now().strftime("%H:%M:%S")
+        if not paths:
+            self.log(f"{stamp} no source files left in {self.folder}")
+            return
+        start = time.perf_counter()
+        try:
+            if self.delta is not None:
+                result = self.delta.run(paths, save_path=self.output)
+            else:
+                result = run_check(paths, save_path=self.output, workers=1, cache=self.memo, rules=self.rules)
+        except Exception as e:
+            self.log(f"{stamp} changed: {', '.join(changed)}; check failed: {e}")
+            return
+        if self.stats_dir is not None:
+            record_stats(run_counts(result, datetime.date.today(), self.site), self.stats_dir)
+        self.log(f"{stamp} changed: {', '.join(changed)}; {len(result.today)} discrepancies written to "
+                 f"{self.output} in {time.perf_counter() - start:.1f} s ({result.cache_report})")
+
+    # Watch until stop is set (or forever). Between changes the thread just sleeps on an event.
+    def run(self, stop: threading.Event | None = None):
+        stop = stop or threading.Event()
+        observer = self.start_observer()
+        self.log(f"Watching {self.folder} ({'file system events' if observer else f'polling every {self.poll:g} s'})")
+        try:
+            while not stop.is_set():
+                if self.update_pending():
+                    self.check()
+                    continue
+                if self.pending:
+                    timeout = self.settle / 2
+                else:
+                    timeout = EVENT_FALLBACK_SECONDS if observer else self.poll
+                self.wake.wait(timeout)
+                self.wake.clear()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Re-check a folder whenever its exports change.")
+    parser.add_argument("--input-dir", help="folder to watch (default: next to this program)")
+    parser.add_argument("-o", "--output", required=True, help="report file rewritten after each check")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help=f"seconds a file must stay unchanged before it is read (default {DEFAULT_SETTLE_SECONDS:g})")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS,
+                        help=f"polling interval without watchdog (default {DEFAULT_POLL_SECONDS:g})")
+    parser.add_argument("--site", default="", help="site name stored with the stats records")
+    parser.add_argument("--stats-dir", help="folder of discrepancy_stats.db (default: next to this program)")
+    parser.add_argument("--no-stats", action="store_true", help="do not write the results to the stats history")
+    parser.add_argument("--cache-dir", help="parsed-source cache folder (default: source_cache next to this program)")
+    parser.add_argument("--no-cache", action="store_true", help="keep parsed sources in memory only")
+    parser.add_argument("--rules", help=f"discrepancy rule config (default: {RULES_FILENAME} next to this program, if present)")
+    parser.add_argument("--delta", action="store_true",
+                        help="parse only the rows appended since the last check (state in <report name>_delta_state.pkl)")
+    args = parser.parse_args(argv)
+
+    try:
+        rules = load_rules(args.rules or os.path.join(get_exe_dir(), RULES_FILENAME))
+        delta = DeltaChecker(state_path_for(args.output), rules) if args.delta else None
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    watcher = FolderWatcher(
+        args.input_dir or get_exe_dir(),
+        args.output,
+        rules=rules,
+        cache=None if args.no_cache else SourceCache(args.cache_dir or default_cache_dir()),
+        settle=args.settle,
+        poll=args.poll,
+        stats_dir=None if args.no_stats else (args.stats_dir or get_exe_dir()),
+        site=args.site,
+        log=lambda line: print(line, flush=True),
+        delta=delta,
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())